@@ -5,6 +5,7 @@ CORE MVP: Upload resume -> Parse -> Generate portfolio + CV -> Download
 
 import os
 import time
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
 
@@ -18,8 +19,12 @@ from utils.linkedin_scraper import get_linkedin_scraper
 from utils.portfolio_generator import get_portfolio_generator
 from utils.resume_generator import get_resume_generator
 from utils.cv_generator import get_cv_generator
-from utils.validators import FileUploadValidator
+from utils.validators import FileUploadValidator, OptimizerResult, MockInterviewQuestionSet
 from utils.groq_client import get_groq_client
+from utils.model_router import text_validator
+from utils.model_policy import get_model_policy, ModelPolicy
+from utils.llm_scheduler import llm_context
+from utils.prompt_budget import Section, assemble, prompt_budget
 
 # Page config
 st.set_page_config(
@@ -98,9 +103,18 @@ if 'career_coach_mode' not in st.session_state:
 # Q&A flow state
 if 'qa_data' not in st.session_state:
     st.session_state.qa_data = {}
-# LLM model selection
+# LLM model selection ('auto' = per-task defaults from the model policy)
 if 'selected_model' not in st.session_state:
-    st.session_state.selected_model = '70b'  # Default to best model
+    st.session_state.selected_model = 'auto'
+# Identifies this browser session to the LLM scheduler's fair queueing
+# and, until the user logs in, to per-user token accounting
+if 'llm_session_id' not in st.session_state:
+    st.session_state.llm_session_id = uuid.uuid4().hex
+
+
+def _model_policy() -> ModelPolicy:
+    """Model policy for this session, honoring the dashboard's model selector"""
+    return get_model_policy().with_model(st.session_state.selected_model)
 
 
 # ==================== LANDING PAGE ====================
@@ -459,7 +473,7 @@ def process_resume_upload(uploaded_file):
     with st.spinner("📄 Parsing your resume..."):
         try:
             file_bytes = uploaded_file.read()
-            result = resume_parser.parse_resume(file_bytes, uploaded_file.name)
+            result = resume_parser.parse_resume(file_bytes, uploaded_file.name, policy=_model_policy())
 
             if not result['success']:
                 st.error(f"❌ {result['error']}")
@@ -492,7 +506,7 @@ def process_linkedin_input(input_text):
     if url_match and len(input_text.strip()) < 200:
         with st.spinner("🔗 Trying to fetch LinkedIn profile..."):
             try:
-                result = linkedin_scraper.scrape_and_parse(linkedin_url)
+                result = linkedin_scraper.scrape_and_parse(linkedin_url, policy=_model_policy())
 
                 if result['success']:
                     st.session_state.profile_data = result['profile_data']
@@ -513,7 +527,7 @@ def process_linkedin_input(input_text):
     # Input contains text (not just URL), parse it directly
     with st.spinner("📝 Parsing your profile..."):
         try:
-            result = linkedin_scraper.parse_manual_text(input_text, linkedin_url)
+            result = linkedin_scraper.parse_manual_text(input_text, linkedin_url, policy=_model_policy())
 
             if not result['success']:
                 st.error(f"❌ {result['error']}")
@@ -542,7 +556,7 @@ def generate_assets():
         status_text.text("🎨 Generating your portfolio website...")
         progress_bar.progress(10)
 
-        portfolio_result = portfolio_gen.generate_portfolio_with_fallback(profile_data)
+        portfolio_result = portfolio_gen.generate_portfolio_with_fallback(profile_data, policy=_model_policy())
         if portfolio_result['success']:
             st.session_state.portfolio_html = portfolio_result['html_content']
             st.session_state.subdomain = portfolio_result['subdomain']
@@ -626,41 +640,37 @@ def generate_cover_letter(job_description: str, tone: str):
             else:  # technical
                 system_prompt = COVER_LETTER_TECHNICAL_PROMPT
 
-            # Prepare user profile summary
-            profile_summary = f"""
-USER PROFILE:
+            # Prepare user profile summary; a long job description is trimmed
+            # before the experience it has to be matched against
+            profile_summary = assemble([
+                Section("profile", f"""USER PROFILE:
 Name: {profile_data.get('name', 'N/A')}
 Email: {profile_data.get('email', 'N/A')}
 
 WORK EXPERIENCE:
-{_format_work_history(profile_data.get('work_history', []))}
-
-SKILLS: {', '.join(profile_data.get('skills', [])[:15])}
-
-PROJECTS:
-{_format_projects(profile_data.get('projects', []))}
-
-JOB DESCRIPTION:
-{job_description}
-"""
-
-            # Call Groq API
-            response = groq_client.call_api(
+{_format_work_history(profile_data.get('work_history', []))}""", priority=0),
+                Section("skills", f"SKILLS: {', '.join(profile_data.get('skills', [])[:15])}", priority=1),
+                Section("projects", f"PROJECTS:\n{_format_projects(profile_data.get('projects', []))}", priority=2),
+                Section("job_description", f"JOB DESCRIPTION:\n{job_description}", priority=1, min_tokens=400)
+            ], prompt_budget("cover_letter"))["text"]
+
+            # Stream from Groq API so the letter appears as it is written
+            stream = groq_client.stream_api(
                 system_prompt=system_prompt,
                 user_prompt=profile_summary,
-                model="70b",  # Use better model for cover letters
-                temperature=0.7,  # More creative
-                max_tokens=800
+                task="cover_letter",
+                **_model_policy().params("cover_letter"),
+                validator=text_validator(min_chars=400)
             )
 
-            if response.get('success'):
-                cover_letter = response['content']
+            st.markdown("---")
+            st.markdown("### Your Cover Letter")
+            st.write_stream(stream)
+
+            if stream.success:
+                cover_letter = stream.content
 
-                # Display cover letter
                 st.success("✅ Cover letter generated!")
-                st.markdown("---")
-                st.markdown("### Your Cover Letter")
-                st.markdown(cover_letter)
 
                 # Download buttons
                 st.markdown("### ⬇️ Download Options")
@@ -747,7 +757,7 @@ JOB DESCRIPTION:
                         use_container_width=True
                     )
             else:
-                st.error(f"❌ {response.get('error', 'Failed to generate cover letter')}")
+                st.error(f"❌ {stream.error or 'Failed to generate cover letter'}")
 
         except Exception as e:
             st.error(f"❌ Error generating cover letter: {str(e)}")
@@ -761,34 +771,28 @@ def analyze_resume(job_description: str):
         try:
             profile_data = st.session_state.profile_data
 
-            # Prepare resume summary
-            resume_summary = f"""
-RESUME:
+            # Prepare resume summary within the optimizer's prompt budget
+            resume_summary = assemble([
+                Section("resume", f"""RESUME:
 Name: {profile_data.get('name', 'N/A')}
 
 Work Experience:
-{_format_work_history(profile_data.get('work_history', []))}
-
-Skills: {', '.join(profile_data.get('skills', []))}
-
-Projects:
-{_format_projects(profile_data.get('projects', []))}
-
-Education:
-{_format_education(profile_data.get('education', []))}
-
-JOB DESCRIPTION:
-{job_description}
-"""
-
-            # Call Groq API
-            result = groq_client.call_api_json(
+{_format_work_history(profile_data.get('work_history', []))}""", priority=0),
+                Section("skills", f"Skills: {', '.join(profile_data.get('skills', []))}", priority=0),
+                Section("projects", f"Projects:\n{_format_projects(profile_data.get('projects', []))}", priority=2),
+                Section("education", f"Education:\n{_format_education(profile_data.get('education', []))}", priority=2),
+                Section("job_description", f"JOB DESCRIPTION:\n{job_description}", priority=1, min_tokens=400)
+            ], prompt_budget("optimizer"))["text"]
+
+            # Call Groq API (tries 8b first when model cascading is enabled)
+            response = groq_client.call_api_structured(
                 system_prompt=OPTIMIZER_PROMPT,
                 user_prompt=resume_summary,
-                model="70b",  # Use better model for analysis
-                temperature=0.3,
-                max_tokens=1500
+                schema=OptimizerResult,
+                task="optimizer",
+                **_model_policy().params("optimizer")
             )
+            result = response.get("data")
 
             if result:
                 # Display results
@@ -943,6 +947,10 @@ def dashboard_page():
     with tab5:
         career_coach_tab()
 
+    # LLM telemetry for operators (?debug=1 or PORTFOLIOAI_DEBUG=1)
+    if st.query_params.get("debug") == "1" or os.getenv("PORTFOLIOAI_DEBUG", "").lower() in ("1", "true", "yes"):
+        llm_debug_panel()
+
     # Footer
     st.markdown("<br><br>", unsafe_allow_html=True)
     st.markdown("---")
@@ -958,18 +966,75 @@ def dashboard_page():
     """, unsafe_allow_html=True)
 
 
+def llm_debug_panel():
+    """Latency, tokens, retries and fallbacks recorded by the Groq client in this process"""
+    with st.expander("🛠️ LLM Telemetry", expanded=False):
+        summary = groq_client.metrics.summary()
+
+        if summary["calls"]:
+            st.markdown("**Calls by task and model**")
+            st.dataframe(summary["calls"], use_container_width=True, hide_index=True)
+        else:
+            st.caption("No LLM calls recorded yet.")
+
+        if summary["queue"]:
+            st.markdown("**Scheduler queue by priority**")
+            st.dataframe(
+                [{"priority": name, **values} for name, values in sorted(summary["queue"].items())],
+                use_container_width=True, hide_index=True
+            )
+
+        col1, col2, col3 = st.columns(3)
+        for column, (title, name) in zip((col1, col2, col3), (
+            ("Upstream errors", "llm_upstream_errors_total"),
+            ("Retries", "llm_retries_total"),
+            ("Fallbacks", "llm_fallbacks_total")
+        )):
+            with column:
+                st.markdown(f"**{title}**")
+                st.json(summary["counters"][name] or {})
+
+        st.markdown("**Components**")
+        st.json({
+            "rate_limit_headroom": {key: groq_client.rate_limit_headroom(key) for key in groq_client.MODELS},
+            "cache": groq_client.cache_stats(),
+            "resume_cache": resume_parser.cache_stats(),
+            "pdf_extraction": resume_parser.extraction_stats(),
+            "docx_extraction": resume_parser.docx_extraction_stats(),
+            "coalescing": groq_client.coalescing_stats(),
+            "circuit_breaker": groq_client.circuit_stats(),
+            "api_keys": groq_client.key_pool_stats(),
+            "scheduler": groq_client.scheduler_stats(),
+            "usage": groq_client.usage_stats(),
+            "token_calibration": groq_client.token_calibration_stats(),
+            "quota_rejections": summary["counters"]["llm_quota_rejections_total"],
+            "hedging": groq_client.hedging_stats(),
+            "routing": groq_client.routing_stats(),
+            "max_tokens": groq_client.max_tokens_stats(),
+            "structured_output": groq_client.structured_stats(),
+            "json_repair": groq_client.json_repair_stats()
+        }, expanded=False)
+
+        if os.getenv("GROQ_METRICS_PORT"):
+            host = os.getenv('GROQ_METRICS_HOST', '127.0.0.1')
+            st.caption(f"Prometheus metrics: http://{host}:{os.getenv('GROQ_METRICS_PORT')}/metrics")
+
+
 def regenerate_portfolio():
     """Regenerate portfolio HTML with selected model"""
     if not st.session_state.profile_data:
         st.error("⚠️ No profile data found.")
         return
 
-    with st.spinner(f"🎨 Regenerating portfolio with {st.session_state.selected_model.upper()} model..."):
+    policy = _model_policy()
+    model_label = policy.model("portfolio").upper()
+
+    with st.spinner(f"🎨 Regenerating portfolio with {model_label} model..."):
         try:
             profile_data = st.session_state.profile_data
 
             # Regenerate portfolio HTML
-            portfolio_result = portfolio_gen.generate_portfolio_with_fallback(profile_data)
+            portfolio_result = portfolio_gen.generate_portfolio_with_fallback(profile_data, policy=policy)
 
             if portfolio_result['success']:
                 st.session_state.portfolio_html = portfolio_result['html_content']
@@ -986,7 +1051,7 @@ def regenerate_portfolio():
                     except Exception as e:
                         st.warning(f"⚠️ Could not save to database: {str(e)}")
 
-                st.success(f"✅ Portfolio regenerated with {st.session_state.selected_model.upper()} model!")
+                st.success(f"✅ Portfolio regenerated with {model_label} model!")
                 st.rerun()
             else:
                 st.error(f"❌ Failed to regenerate portfolio: {portfolio_result.get('error', 'Unknown error')}")
@@ -1005,14 +1070,16 @@ def overview_tab():
     with model_col1:
         selected_model = st.selectbox(
             "Select AI Model",
-            options=['8b', '70b', 'mixtral'],
+            options=['auto', '8b', '70b', 'mixtral'],
             format_func=lambda x: {
+                'auto': '🎛️ Auto (per-task defaults)',
                 '8b': '⚡ Llama 3.1 8B (Fast)',
                 '70b': '🧠 Llama 3.3 70B (Best Quality)',
                 'mixtral': '🔀 Mixtral 8x7B (Balanced)'
             }[x],
-            index=['8b', '70b', 'mixtral'].index(st.session_state.selected_model),
-            help="Choose the AI model for generation. 70B offers best quality, 8B is fastest."
+            index=['auto', '8b', '70b', 'mixtral'].index(st.session_state.selected_model),
+            help="Choose the AI model for portfolios, cover letters, the optimizer, interviews and the coach. "
+                 "70B offers best quality, 8B is several times faster."
         )
         st.session_state.selected_model = selected_model
 
@@ -1226,21 +1293,21 @@ For each question, provide:
 - Key points to cover in an ideal answer
 - Common mistakes to avoid
 
-Return as JSON array with format:
-[{{"question": "...", "key_points": ["...", "..."], "mistakes": ["...", "..."]}}]
+Return as a JSON object with format:
+{{"questions": [{{"type": "technical|behavioral|system_design", "question": "...", "key_points": ["...", "..."], "mistakes": ["...", "..."]}}]}}
 """
 
-                response = groq_client.call_api(
+                response = groq_client.call_api_structured(
                     system_prompt="You are an expert technical interviewer.",
                     user_prompt=prompt,
-                    model="70b",
-                    response_format={"type": "json_object"}
+                    schema=MockInterviewQuestionSet,
+                    task="interview_questions",
+                    **_model_policy().params("interview_questions")
                 )
 
                 if response.get('success'):
-                    import json
                     try:
-                        parsed_data = json.loads(response['content'])
+                        parsed_data = response['data']
 
                         # Handle different response structures
                         if isinstance(parsed_data, list):
@@ -1308,16 +1375,16 @@ Provide constructive feedback on:
 Be encouraging but honest."""
 
                                         with st.spinner("Analyzing your answer..."):
-                                            feedback_response = groq_client.call_api(
+                                            feedback_response = groq_client.call_api_routed(
                                                 system_prompt="You are an interview coach.",
                                                 user_prompt=feedback_prompt,
-                                                model="70b"
+                                                task="interview_feedback",
+                                                validator=text_validator(min_chars=200),
+                                                **_model_policy().params("interview_feedback")
                                             )
                                             if feedback_response.get('success'):
                                                 st.markdown("**💡 Feedback:**")
                                                 st.info(feedback_response['content'])
-                    except json.JSONDecodeError as e:
-                        st.error(f"Failed to parse response: {str(e)}")
                     except Exception as e:
                         st.error(f"Error processing questions: {str(e)}")
                 else:
@@ -1409,9 +1476,8 @@ Candidate Profile:
                             "content": starter
                         })
 
-                        # Get AI response
-                        with st.spinner("🤔 Thinking..."):
-                            response = get_career_coach_response(starter, profile_context)
+                        # Get AI response (streamed below the starters)
+                        response = get_career_coach_response(starter, profile_context)
 
                         if response:
                             st.session_state.career_coach_chat_history.append({
@@ -1464,9 +1530,8 @@ Candidate Profile:
                     "content": user_message
                 })
 
-                # Get AI response
-                with st.spinner("🤔 Career coach is thinking..."):
-                    response = get_career_coach_response(user_message, profile_context)
+                # Get AI response (streamed as it is generated)
+                response = get_career_coach_response(user_message, profile_context)
 
                 if response:
                     st.session_state.career_coach_chat_history.append({
@@ -1496,18 +1561,17 @@ Candidate Profile:
         )
 
         if st.button("💡 Get Instant Advice", use_container_width=True, type="primary"):
-            with st.spinner("Generating personalized advice..."):
-                topic_prompts = {
-                    "Career Path Recommendations": "Based on their profile, suggest 3-4 potential career paths with why it's a good fit, skills they already have, skills to develop, typical timeline, and salary expectations.",
-                    "Skill Gap Analysis": "Analyze their current skillset and identify top 5 in-demand skills they should learn, skills they have that are highly valuable, technologies that are becoming obsolete, and learning resources for each skill gap.",
-                    "Salary Negotiation Tips": "Provide salary negotiation advice including market rate for their experience level, how to research salary data, negotiation scripts and tactics, common mistakes to avoid, and when to negotiate.",
-                    "Job Search Strategy": "Create a personalized job search plan with best job boards and platforms for their profile, how to optimize their application process, networking strategies, companies that match their background, and timeline and goals.",
-                    "Personal Branding": "Help them build their personal brand with unique value proposition, content creation strategy, social media optimization, portfolio/blog ideas, and community engagement.",
-                    "Work-Life Balance": "Advice on maintaining work-life balance including time management strategies, setting boundaries, productivity techniques, avoiding burnout, and career vs personal life priorities.",
-                    "Career Transition Advice": "Guide them through a career transition with transferable skills analysis, positioning for new roles, learning roadmap, networking in new field, and resume/portfolio adjustments."
-                }
-
-                prompt = f"""{profile_context}
+            topic_prompts = {
+                "Career Path Recommendations": "Based on their profile, suggest 3-4 potential career paths with why it's a good fit, skills they already have, skills to develop, typical timeline, and salary expectations.",
+                "Skill Gap Analysis": "Analyze their current skillset and identify top 5 in-demand skills they should learn, skills they have that are highly valuable, technologies that are becoming obsolete, and learning resources for each skill gap.",
+                "Salary Negotiation Tips": "Provide salary negotiation advice including market rate for their experience level, how to research salary data, negotiation scripts and tactics, common mistakes to avoid, and when to negotiate.",
+                "Job Search Strategy": "Create a personalized job search plan with best job boards and platforms for their profile, how to optimize their application process, networking strategies, companies that match their background, and timeline and goals.",
+                "Personal Branding": "Help them build their personal brand with unique value proposition, content creation strategy, social media optimization, portfolio/blog ideas, and community engagement.",
+                "Work-Life Balance": "Advice on maintaining work-life balance including time management strategies, setting boundaries, productivity techniques, avoiding burnout, and career vs personal life priorities.",
+                "Career Transition Advice": "Guide them through a career transition with transferable skills analysis, positioning for new roles, learning roadmap, networking in new field, and resume/portfolio adjustments."
+            }
+
+            prompt = f"""{profile_context}
 
 Topic: {coaching_topic}
 
@@ -1515,20 +1579,19 @@ Topic: {coaching_topic}
 
 Provide comprehensive, actionable advice tailored to their specific situation. Be encouraging but realistic."""
 
-                response = get_career_coach_response(prompt, profile_context, use_full_prompt=True)
+            st.markdown("### 💡 Your Personalized Career Advice")
+            st.markdown("---")
+            response = get_career_coach_response(prompt, profile_context, use_full_prompt=True)
 
-                if response:
-                    st.markdown("### 💡 Your Personalized Career Advice")
-                    st.markdown("---")
-                    st.markdown(response)
-                    st.markdown("---")
-                    st.info("💡 Switch to **Chat Mode** for follow-up questions and deeper discussion!")
-                else:
-                    st.error("Failed to generate advice. Please try again.")
+            if response:
+                st.markdown("---")
+                st.info("💡 Switch to **Chat Mode** for follow-up questions and deeper discussion!")
+            else:
+                st.error("Failed to generate advice. Please try again.")
 
 
 def get_career_coach_response(user_message: str, profile_context: str, use_full_prompt: bool = False) -> str:
-    """Get response from career coach AI with conversation context"""
+    """Get response from career coach AI with conversation context, streaming it onto the page"""
     try:
         # Build conversation history for context
         conversation_context = ""
@@ -1552,23 +1615,29 @@ Keep responses conversational, concise (2-3 paragraphs unless asked for more det
         if use_full_prompt:
             user_prompt = user_message
         else:
-            user_prompt = f"""{profile_context}
-
-{conversation_context}
-
-Current question: {user_message}
-
-Provide helpful, specific advice based on their profile and conversation context."""
+            # Older turns are dropped first, then the profile; the question always fits
+            user_prompt = assemble([
+                Section("profile", profile_context.strip(), priority=1, min_tokens=100),
+                Section("history", conversation_context.strip(), priority=2, keep="tail"),
+                Section("question", f"Current question: {user_message}", priority=0),
+                Section(
+                    "instruction",
+                    "Provide helpful, specific advice based on their profile and conversation context.",
+                    priority=0
+                )
+            ], prompt_budget("career_coach"))["text"]
 
-        response = groq_client.call_api(
+        stream = groq_client.stream_api(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
-            model="70b",
-            temperature=0.7
+            task="career_coach",
+            **_model_policy().params("career_coach"),
+            validator=text_validator(min_chars=150)
         )
+        st.write_stream(stream)
 
-        if response.get('success'):
-            return response['content']
+        if stream.success:
+            return stream.content
         else:
             return None
 
@@ -1765,7 +1834,7 @@ def qa_flow_page():
             progress_bar.progress(40)
 
             # Generate portfolio
-            portfolio_result = portfolio_gen.generate_portfolio_with_fallback(profile_data)
+            portfolio_result = portfolio_gen.generate_portfolio_with_fallback(profile_data, policy=_model_policy())
             if portfolio_result['success']:
                 st.session_state.portfolio_html = portfolio_result['html_content']
             else:
@@ -2083,4 +2152,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    user_id = st.session_state.user_id
+    with llm_context(session_id=st.session_state.llm_session_id, user_id=str(user_id) if user_id else None):
+        main()
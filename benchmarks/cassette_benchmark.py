@@ -0,0 +1,174 @@
+"""
+Deterministic benchmark of the app's LLM flows using record/replay cassettes
+
+Record once (against the local stand-in by default, or the real API with
+--live), then replay as often as needed with no network or cost:
+
+    python -m benchmarks.cassette_benchmark record --cassette .cache/bench.jsonl.gz
+    python -m benchmarks.cassette_benchmark replay --cassette .cache/bench.jsonl.gz --iterations 20
+    python -m benchmarks.cassette_benchmark replay --cassette .cache/bench.jsonl.gz --latency-scale 1
+
+Flows: ResumeParser.parse_resume, PortfolioGenerator.generate_portfolio_with_fallback
+and the dashboard's optimizer, cover letter and interview question calls.
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+
+SAMPLE_RESUME = [
+    "Alex Morgan",
+    "alex.morgan@example.com | +1 555 0100 | San Francisco, CA",
+    "SUMMARY",
+    "Software engineer with four years of experience building data-heavy web applications.",
+    "EXPERIENCE",
+    "Software Engineer, Acme Corp (2022-06 to Present)",
+    "Built a React and FastAPI analytics dashboard used by 2,000 customers.",
+    "Cut PostgreSQL query latency by 60% with indexing and caching.",
+    "Junior Developer, Widget Labs (2020-01 to 2022-05)",
+    "Maintained Django services and CI pipelines on Docker and AWS.",
+    "EDUCATION",
+    "B.S. Computer Science, State University, 2019",
+    "SKILLS",
+    "Python, JavaScript, React, PostgreSQL, Docker, AWS",
+]
+
+JOB_DESCRIPTION = "Backend engineer to build Python APIs on AWS with PostgreSQL and Docker."
+
+
+def sample_docx() -> bytes:
+    document = Document()
+    for line in SAMPLE_RESUME:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def run_flows(resume_bytes: bytes, filename: str) -> dict:
+    """Run every flow once; returns {flow: seconds}"""
+    from utils.groq_client import get_groq_client
+    from utils.resume_parser import get_resume_parser
+    from utils.portfolio_generator import get_portfolio_generator
+    from utils.model_policy import get_model_policy
+    from utils.validators import OptimizerResult
+    from prompts.prompts import OPTIMIZER_PROMPT, COVER_LETTER_FORMAL_PROMPT
+
+    client = get_groq_client()
+    policy = get_model_policy()
+    generator = get_portfolio_generator()
+    timings = {}
+
+    start = time.perf_counter()
+    parsed = get_resume_parser().parse_resume(resume_bytes, filename)
+    timings["parse_resume"] = time.perf_counter() - start
+    if not parsed["success"]:
+        raise RuntimeError(f"parse_resume failed: {parsed['error']}")
+
+    profile = parsed["profile_data"]
+    profile_text = generator.format_profile_for_prompt(profile)
+
+    start = time.perf_counter()
+    generator.generate_portfolio_with_fallback(profile)
+    timings["portfolio"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.call_api_structured(
+        system_prompt=OPTIMIZER_PROMPT,
+        user_prompt=f"{profile_text}\n\nJOB DESCRIPTION:\n{JOB_DESCRIPTION}",
+        schema=OptimizerResult,
+        task="optimizer",
+        **policy.params("optimizer")
+    )
+    timings["optimizer"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stream = client.stream_api(
+        system_prompt=COVER_LETTER_FORMAL_PROMPT,
+        user_prompt=f"{profile_text}\n\nJOB DESCRIPTION:\n{JOB_DESCRIPTION}",
+        task="cover_letter",
+        **policy.params("cover_letter")
+    )
+    for _ in stream:
+        pass
+    timings["cover_letter"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.call_api(
+        system_prompt="You are an expert technical interviewer.",
+        user_prompt=f"Generate 5 interview questions for this candidate:\n\n{profile_text}",
+        response_format={"type": "json_object"},
+        task="interview_questions",
+        **policy.params("interview_questions")
+    )
+    timings["interview_questions"] = time.perf_counter() - start
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassette", default=".cache/bench_cassette.jsonl.gz")
+    parser.add_argument("--iterations", type=int, default=10, help="Replay passes over the flows")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Replay this fraction of the recorded latency (1 = original timing)")
+    parser.add_argument("--live", action="store_true", help="Record against the real Groq API instead of the stand-in")
+    parser.add_argument("--resume", help="Resume file to parse (.docx or .pdf); defaults to a generated sample")
+    args = parser.parse_args()
+
+    os.environ["GROQ_HEADLESS"] = "true"
+    os.environ["GROQ_CASSETTE_MODE"] = args.mode
+    os.environ["GROQ_CASSETTE_PATH"] = args.cassette
+    os.environ["GROQ_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    # Measure the app, not the cache or the client-side limiter
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["RESUME_CACHE_ENABLED"] = "false"
+    os.environ["GROQ_RATE_LIMIT_ENABLED"] = "false"
+
+    if args.resume:
+        with open(args.resume, "rb") as f:
+            resume_bytes = f.read()
+        filename = os.path.basename(args.resume)
+    else:
+        resume_bytes = sample_docx()
+        filename = "resume.docx"
+
+    server = None
+    if args.mode == "record":
+        if os.path.exists(args.cassette):
+            os.remove(args.cassette)
+        if not args.live:
+            from utils.groq_standin import GroqStandinServer, StandinConfig
+            server = GroqStandinServer(StandinConfig(seed=42)).start()
+            os.environ["GROQ_BASE_URL"] = server.base_url
+
+    iterations = 1 if args.mode == "record" else args.iterations
+    samples = {}
+    try:
+        for _ in range(iterations):
+            for flow, seconds in run_flows(resume_bytes, filename).items():
+                samples.setdefault(flow, []).append(seconds)
+    finally:
+        if server:
+            server.stop()
+
+    from utils.groq_client import get_groq_client
+    stats = get_groq_client().cassette_stats()
+    print(f"Cassette:      {stats['path']} ({stats['mode']}, {stats['recorded']} recorded, "
+          f"{stats['replayed']} replayed, {stats['misses']} misses)")
+    for flow, values in samples.items():
+        print(f"  {flow:<20} n={len(values):<3} mean={statistics.mean(values) * 1000:8.2f}ms "
+              f"min={min(values) * 1000:8.2f}ms max={max(values) * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
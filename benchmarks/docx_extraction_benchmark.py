@@ -0,0 +1,111 @@
+"""
+DOCX text extraction: python-docx's object model vs. streaming the package XML
+
+Generates a large CV (or uses --docx) with a header, many paragraphs and a
+table with merged cells per section, and reports milliseconds per document,
+the speedup over python-docx, and how much text each path returns (python-docx
+repeats merged cells once per grid column they span). A second section runs
+each mode once in a fresh process and reports peak RSS above the process's
+starting RSS.
+
+Usage:
+    python -m benchmarks.docx_extraction_benchmark --sections 200 --iterations 5
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.docx_extraction import extract_docx_stream, extract_python_docx
+from utils.pdf_extraction import PeakRSS
+
+
+def sample_docx(sections: int) -> bytes:
+    """A long CV: a contact header, then per section a heading, bullets and a skills table"""
+    from docx import Document
+
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Alex Morgan | alex.morgan@example.com | +1 555 0100"
+    for section in range(sections):
+        doc.add_heading(f"Senior Data Engineer, Example Corp ({2000 + section % 25})", level=2)
+        for item in range(6):
+            doc.add_paragraph(
+                f"Built ingestion pipelines in Python and Rust for project {section}.{item}, cut p95 query "
+                f"latency by {20 + item}% on PostgreSQL and DuckDB and served 2,000 customers.",
+                style="List Bullet"
+            )
+        table = doc.add_table(rows=3, cols=3)
+        for column, skill in enumerate(("Python", "SQL", "Kubernetes")):
+            table.cell(0, column).text = skill
+            table.cell(1, column).text = f"{3 + column} years"
+        table.cell(2, 0).merge(table.cell(2, 2)).text = f"Certified across the stack ({section})"
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def timed(extract, iterations: int) -> float:
+    """Median seconds per extraction"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        extract()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+MODES = {
+    "python-docx": lambda data, max_chars: extract_python_docx(data),
+    "stream": lambda data, max_chars: extract_docx_stream(data)[0],
+    "stream+budget": lambda data, max_chars: extract_docx_stream(data, max_chars)[0],
+}
+
+
+def peak_memory(mode: str, data: bytes, max_chars: int) -> dict:
+    """Peak RSS of one extraction in this (fresh) process"""
+    with PeakRSS() as rss:
+        blocks = MODES[mode](data, max_chars)
+    return {**rss.report(), "chars": sum(len(block) for block in blocks)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docx", help="DOCX to extract; defaults to a generated CV")
+    parser.add_argument("--sections", type=int, default=200, help="Job sections in the generated CV")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--max-chars", type=int, default=60000, help="Character budget of the stream+budget row")
+    args = parser.parse_args()
+
+    if args.docx:
+        with open(args.docx, "rb") as f:
+            data = f.read()
+    else:
+        data = sample_docx(args.sections)
+    print(f"DOCX:  {len(data) / 1024:.0f} KB")
+
+    baseline = None
+    for mode, extract in MODES.items():
+        seconds = timed(lambda: extract(data, args.max_chars), args.iterations)
+        blocks = extract(data, args.max_chars)
+        baseline = baseline or seconds
+        print(f"  {mode:<14} {seconds * 1000:9.1f}ms  {baseline / seconds:6.2f}x  "
+              f"{len(blocks):6d} blocks  {sum(len(block) for block in blocks):8d} chars")
+
+    print("Peak RSS:")
+    context = multiprocessing.get_context("spawn")
+    for mode in MODES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            memory = pool.submit(peak_memory, mode, data, args.max_chars).result()
+        print(f"  {mode:<14} +{memory['rss_delta_mb']:7.1f} MB  (peak {memory['peak_rss_mb']:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+End-to-end LLM throughput and retry benchmark against the local Groq stand-in
+
+Starts utils.groq_standin in-process (or uses --base-url), points GroqClient
+at it and fires a mix of the app's LLM tasks from a thread pool.
+
+Usage:
+    python -m benchmarks.llm_load_test --requests 200 --concurrency 16 --rate-limit-rate 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompts.prompts import (
+    RESUME_PARSER_PROMPT,
+    OPTIMIZER_PROMPT,
+    PORTFOLIO_GENERATOR_PROMPT,
+    COVER_LETTER_FORMAL_PROMPT
+)
+from utils.groq_standin import GroqStandinServer, StandinConfig
+
+
+SAMPLE_PROFILE = """Name: Alex Morgan
+Email: alex.morgan@example.com
+Skills: Python, React, PostgreSQL, Docker
+Experience: Software Engineer at Acme Corp (2022-06 to Present)
+"""
+
+# (task, kwargs for call_api)
+WORKLOAD = [
+    ("resume_parse", dict(system_prompt=RESUME_PARSER_PROMPT, user_prompt=f"Resume text:\n\n{SAMPLE_PROFILE}",
+                          model="8b", temperature=0.2, max_tokens=2048,
+                          response_format={"type": "json_object"})),
+    ("optimizer", dict(system_prompt=OPTIMIZER_PROMPT, user_prompt=SAMPLE_PROFILE + "\nJOB DESCRIPTION:\nBackend engineer",
+                       model="70b", temperature=0.3, max_tokens=1500,
+                       response_format={"type": "json_object"})),
+    ("cover_letter", dict(system_prompt=COVER_LETTER_FORMAL_PROMPT, user_prompt=SAMPLE_PROFILE,
+                          model="70b", temperature=0.7, max_tokens=800)),
+    ("portfolio", dict(system_prompt=PORTFOLIO_GENERATOR_PROMPT,
+                       user_prompt=f"Generate a portfolio website for:\n\n{SAMPLE_PROFILE}",
+                       model="70b", temperature=0.7, max_tokens=8000)),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-url", help="Use an already running stand-in instead of starting one")
+    parser.add_argument("--latency-median", type=float, default=0.3)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=800.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--tpm", type=int, default=0)
+    parser.add_argument("--client-timeout", type=float, default=10.0)
+    parser.add_argument("--rate-limiter", action="store_true",
+                        help="Enable the client-side RPM/TPM limiter (with --rpm/--tpm as its limits if both are set)")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = GroqStandinServer(StandinConfig(
+            latency_median=args.latency_median,
+            latency_sigma=args.latency_sigma,
+            tokens_per_second=args.tokens_per_second,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after=0.5,
+            timeout_rate=args.timeout_rate,
+            hang_seconds=args.client_timeout + 1,
+            error_rate=args.error_rate,
+            rpm=args.rpm,
+            tpm=args.tpm,
+            seed=42
+        )).start()
+        base_url = server.base_url
+
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ["GROQ_HEADLESS"] = "true"
+    os.environ["GROQ_TIMEOUT"] = str(args.client_timeout)
+    os.environ.setdefault("GROQ_SDK_MAX_RETRIES", "0")  # Measure our own retry policy
+    if args.rate_limiter:
+        os.environ["GROQ_RATE_LIMIT_ENABLED"] = "true"
+        if args.rpm and args.tpm:
+            os.environ.setdefault("GROQ_RATE_LIMITS", ",".join(f"{key}={args.rpm}/{args.tpm}" for key in ("8b", "70b")))
+
+    from utils.groq_client import GroqClient
+    client = GroqClient()
+
+    def run(index):
+        task, kwargs = WORKLOAD[index % len(WORKLOAD)]
+        # Unique prompt per request so caching/coalescing don't hide load
+        kwargs = {**kwargs, "user_prompt": f"{kwargs['user_prompt']}\n[request {index}]"}
+        start = time.perf_counter()
+        response = client.call_api(task=task, retry_delay=0.5, **kwargs)
+        return task, time.perf_counter() - start, response
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(run, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency, response in results if response.get("success")]
+    errors = Counter(response.get("error_type", "unknown") for _, _, response in results if not response.get("success"))
+    retries = sum(max(0, response.get("attempts", 1) - 1) for _, _, response in results)
+    tokens = sum((response.get("usage") or {}).get("completion_tokens", 0) for _, _, response in results)
+
+    print(f"Requests:      {args.requests} ({args.concurrency} concurrent)")
+    print(f"Wall time:     {elapsed:.2f}s")
+    print(f"Throughput:    {args.requests / elapsed:.1f} req/s, {tokens / elapsed:.0f} completion tokens/s")
+    print(f"Succeeded:     {len(latencies)}")
+    print(f"Failed:        {sum(errors.values())} {dict(errors)}")
+    print(f"Retries:       {retries}")
+    if latencies:
+        print(f"Latency (s):   p50={percentile(latencies, 50):.2f} p95={percentile(latencies, 95):.2f} "
+              f"p99={percentile(latencies, 99):.2f} mean={statistics.mean(latencies):.2f}")
+
+    per_task = {}
+    for task, latency, response in results:
+        per_task.setdefault(task, []).append(latency)
+    for task, values in sorted(per_task.items()):
+        print(f"  {task:<14} n={len(values):<4} p50={percentile(values, 50):.2f}s p95={percentile(values, 95):.2f}s")
+
+    if server:
+        stats = server.stats()
+        print(f"Server:        {stats['requests']} requests, {stats['rate_limited']} rate-limited, "
+              f"{stats['timeouts']} timeouts, {stats['errors']} errors")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
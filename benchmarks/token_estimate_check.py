@@ -0,0 +1,142 @@
+"""
+Error of the offline token estimate against the prompt_tokens Groq reports
+
+utils/token_estimate.py is not Llama 3's tokenizer, so its error has to be
+measured. This sends a fixed set of prompts (résumés, the app's own
+prompts, URLs, contact details, code) with max_tokens=1 and compares, per
+prompt, the offline estimate and plain len/4 with the reported
+prompt_tokens.
+
+Only counts from the real API mean anything: the local stand-in counts
+len/4 itself, so without --live or a cassette recorded with --live this
+only exercises the tool. Record once against Groq, then re-check offline
+after changing the estimator or its vocabulary:
+
+    python -m benchmarks.token_estimate_check --live --record .cache/token_check.jsonl.gz
+    python -m benchmarks.token_estimate_check --replay .cache/token_check.jsonl.gz --max-error 0.15
+"""
+
+import os
+import sys
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cassette_benchmark import SAMPLE_RESUME, JOB_DESCRIPTION
+from prompts.prompts import (
+    RESUME_PARSER_PROMPT,
+    OPTIMIZER_PROMPT,
+    PORTFOLIO_GENERATOR_PROMPT,
+    COVER_LETTER_FORMAL_PROMPT
+)
+
+
+SYSTEM_PROMPT = "Reply with OK."
+
+
+def long_resume(jobs: int = 40) -> str:
+    """A long CV in the shape of extracted résumé text (about 22k characters at 40 jobs)"""
+    lines = SAMPLE_RESUME[:4]
+    for job in range(jobs):
+        lines.append(f"Senior Data Engineer, Example Corp {job} ({2000 + job % 25}-01 to {2001 + job % 25}-06)")
+        lines.append(f"Built ingestion pipelines in Python and Rust for project {job}, cut p95 query latency "
+                     f"by {20 + job % 30}% on PostgreSQL and DuckDB, and served 2,000 customers.")
+        lines.append(f"Led migration of {job + 3} services to Kubernetes (EKS) with Terraform and ArgoCD.")
+    return "\n".join(lines + SAMPLE_RESUME[-4:])
+
+
+def samples() -> dict:
+    """Prompt name -> user message"""
+    return {
+        "resume_short": "\n".join(SAMPLE_RESUME),
+        "resume_long": long_resume(),
+        "resume_parser_prompt": RESUME_PARSER_PROMPT,
+        "optimizer_prompt": OPTIMIZER_PROMPT,
+        "portfolio_prompt": PORTFOLIO_GENERATOR_PROMPT,
+        "cover_letter_prompt": COVER_LETTER_FORMAL_PROMPT,
+        "job_description": JOB_DESCRIPTION,
+        "urls": "\n".join([
+            "https://www.linkedin.com/in/alex-morgan-0a1b2c3d/?originalSubdomain=uk&trk=public_profile",
+            "https://github.com/alexmorgan/realtime-analytics-dashboard/tree/main/services/ingest",
+            "https://alexmorgan.dev/blog/2023/cutting-postgres-latency-with-partial-indexes",
+        ]),
+        "contact": "Alex Morgan | alex.morgan@example.com | +1 (555) 010-0199 | 221B Baker St, London NW1 6XE",
+        "code": open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "utils", "prompt_budget.py"), encoding="utf-8").read()[:6000],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Ask the real Groq API instead of the stand-in")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--record", metavar="CASSETTE", help="Also record the responses to this cassette")
+    source.add_argument("--replay", metavar="CASSETTE", help="Use counts recorded earlier; no network")
+    parser.add_argument("--model", default="8b")
+    parser.add_argument("--max-error", type=float,
+                        help="Exit with status 1 if the mean absolute relative error exceeds this (e.g. 0.15)")
+    args = parser.parse_args()
+
+    os.environ["GROQ_HEADLESS"] = "true"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["GROQ_USAGE_TRACKING"] = "false"
+    if args.record or args.replay:
+        os.environ["GROQ_CASSETTE_MODE"] = "record" if args.record else "replay"
+        os.environ["GROQ_CASSETTE_PATH"] = args.record or args.replay
+        if args.record and os.path.exists(args.record):
+            os.remove(args.record)
+
+    server = None
+    if not (args.live or args.replay):
+        from utils.groq_standin import GroqStandinServer, StandinConfig
+        server = GroqStandinServer(StandinConfig(latency_median=0.01, seed=42)).start()
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        print("Stand-in counts are len/4, not Groq's: this run only exercises the check (use --live)")
+
+    from utils.groq_client import GroqClient
+    from utils.token_estimate import TokenCalibration, get_token_calibration
+    client = GroqClient()
+    calibration = get_token_calibration()
+
+    def baseline(contents):
+        return (sum(len(text) // 4 + TokenCalibration.MESSAGE_OVERHEAD for text in contents)
+                + TokenCalibration.REQUEST_OVERHEAD)
+
+    rows = []
+    try:
+        for name, text in samples().items():
+            response = client.call_api(
+                SYSTEM_PROMPT, text, model=args.model, temperature=0.0, max_tokens=1, use_cache=False
+            )
+            actual = (response.get("usage") or {}).get("prompt_tokens")
+            if not response["success"] or not actual:
+                print(f"  {name:<22} failed: {response.get('error') or 'no prompt_tokens reported'}")
+                continue
+            contents = [SYSTEM_PROMPT, text]
+            rows.append((name, len(text), actual, calibration.estimate_messages(contents), baseline(contents)))
+    finally:
+        if server:
+            server.stop()
+
+    if not rows:
+        sys.exit("No prompt_tokens were reported")
+
+    print(f"{'prompt':<22} {'chars':>7} {'actual':>7} {'estimate':>9} {'error':>7} {'len/4':>7} {'error':>7}")
+    for name, chars, actual, estimate, quarter in rows:
+        print(f"{name:<22} {chars:7d} {actual:7d} {estimate:9d} {(estimate - actual) / actual:+7.1%} "
+              f"{quarter:7d} {(quarter - actual) / actual:+7.1%}")
+
+    estimate_error = statistics.mean(abs(estimate - actual) / actual for _, _, actual, estimate, _ in rows)
+    quarter_error = statistics.mean(abs(quarter - actual) / actual for _, _, actual, _, quarter in rows)
+    worst = max(actual / estimate for _, _, actual, estimate, _ in rows)
+    print(f"Mean |error|:  estimate {estimate_error:.1%}, len/4 {quarter_error:.1%}")
+    print(f"Worst undercount: actual = {worst:.2f}x estimate "
+          f"({'covered' if worst <= calibration.margin else 'NOT covered'} by the {calibration.margin} safety margin)")
+
+    if args.max_error is not None and estimate_error > args.max_error:
+        sys.exit(f"Estimate error {estimate_error:.1%} exceeds --max-error {args.max_error:.1%}")
+
+
+if __name__ == "__main__":
+    main()
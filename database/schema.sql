@@ -122,6 +122,17 @@ CREATE TABLE IF NOT EXISTS analytics_events (
   created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- LLM token usage per user per UTC day (mirrored from the app's local counters)
+CREATE TABLE IF NOT EXISTS llm_usage (
+  user_id TEXT NOT NULL, -- auth user id, or the browser session id for anonymous use
+  day DATE NOT NULL,
+  prompt_tokens BIGINT NOT NULL DEFAULT 0,
+  completion_tokens BIGINT NOT NULL DEFAULT 0,
+  requests INT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (user_id, day)
+);
+
 -- ========================================
 -- INDEXES
 -- ========================================
@@ -135,6 +146,7 @@ CREATE INDEX IF NOT EXISTS idx_mock_interviews_user_id ON mock_interviews(user_i
 CREATE INDEX IF NOT EXISTS idx_optimizer_runs_user_id ON optimizer_runs(user_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_events_user_id ON analytics_events(user_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_events_type_created ON analytics_events(event_type, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_day ON llm_usage(day);
 CREATE INDEX IF NOT EXISTS idx_users_subdomain ON users(subdomain);
 CREATE INDEX IF NOT EXISTS idx_portfolios_subdomain ON portfolios(subdomain);
 
@@ -152,6 +164,7 @@ ALTER TABLE job_alerts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE mock_interviews ENABLE ROW LEVEL SECURITY;
 ALTER TABLE optimizer_runs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE analytics_events ENABLE ROW LEVEL SECURITY;
+ALTER TABLE llm_usage ENABLE ROW LEVEL SECURITY;
 
 -- Users policies
 CREATE POLICY "Users can view own profile"
@@ -270,6 +283,11 @@ CREATE POLICY "Users can view own analytics events"
   ON analytics_events FOR SELECT
   USING (auth.uid() = user_id);
 
+-- LLM usage policies (writes go through increment_llm_usage)
+CREATE POLICY "Users can view own LLM usage"
+  ON llm_usage FOR SELECT
+  USING (auth.uid()::text = user_id);
+
 -- ========================================
 -- STORAGE BUCKETS
 -- ========================================
@@ -326,6 +344,26 @@ CREATE TRIGGER on_auth_user_created
   FOR EACH ROW
   EXECUTE FUNCTION handle_new_user();
 
+-- Add a batch of LLM token usage to a user's daily totals
+-- (server-side only: called by the app with the service role key)
+CREATE OR REPLACE FUNCTION increment_llm_usage(
+  p_user_id TEXT, p_day DATE, p_prompt_tokens BIGINT, p_completion_tokens BIGINT, p_requests INT
+)
+RETURNS VOID AS $$
+BEGIN
+  IF p_prompt_tokens < 0 OR p_completion_tokens < 0 OR p_requests < 0 THEN
+    RAISE EXCEPTION 'LLM usage deltas must not be negative';
+  END IF;
+  INSERT INTO llm_usage (user_id, day, prompt_tokens, completion_tokens, requests, updated_at)
+  VALUES (p_user_id, p_day, p_prompt_tokens, p_completion_tokens, p_requests, NOW())
+  ON CONFLICT (user_id, day) DO UPDATE SET
+    prompt_tokens = llm_usage.prompt_tokens + EXCLUDED.prompt_tokens,
+    completion_tokens = llm_usage.completion_tokens + EXCLUDED.completion_tokens,
+    requests = llm_usage.requests + EXCLUDED.requests,
+    updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
 -- ========================================
 -- SAMPLE DATA (for testing)
 -- ========================================
@@ -376,6 +414,9 @@ GRANT ALL ON ALL SEQUENCES IN SCHEMA public TO authenticated;
 -- Grant access to anon (for unauthenticated access - be careful!)
 GRANT USAGE ON SCHEMA public TO anon;
 GRANT SELECT, INSERT ON analytics_events TO anon;
+-- LLM usage is written by the app server only (SECURITY DEFINER bypasses RLS)
+REVOKE EXECUTE ON FUNCTION increment_llm_usage(TEXT, DATE, BIGINT, BIGINT, INT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION increment_llm_usage(TEXT, DATE, BIGINT, BIGINT, INT) TO service_role;
 
 -- ========================================
 -- NOTES
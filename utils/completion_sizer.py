@@ -0,0 +1,134 @@
+"""
+Adaptive max_tokens sizing from observed completion lengths
+"""
+
+import os
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class CompletionSizer:
+    """
+    Per-task histograms of completion_tokens
+
+    Groq reserves the full max_tokens budget against TPM, so a portfolio call
+    asking for 8000 tokens that typically uses 2500 blocks capacity other
+    requests could use. Once a task has enough samples, size() returns a high
+    percentile of what it actually produced plus a safety margin, never more
+    than the caller asked for. Responses cut off by the smaller budget are
+    completed by GroqClient with a one-shot continuation.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        margin: float = 0.2,
+        min_samples: int = 20,
+        floor: int = 256,
+        window: int = 500
+    ):
+        """
+        Args:
+            enabled: Apply sizing; when False, lengths are still recorded
+            percentile: Percentile of observed completion_tokens to size to
+            margin: Extra fraction added on top of the percentile
+            min_samples: Samples needed before a task is sized
+            floor: Never size below this many tokens
+            window: Recent samples kept per task
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.floor = floor
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, task: str, name: str, amount: int = 1) -> None:
+        counters = self._counters.setdefault(
+            task, {"sized": 0, "tokens_saved": 0, "continuations": 0, "refetches": 0}
+        )
+        counters[name] += amount
+
+    def observe(self, task: str, completion_tokens: int) -> None:
+        """Record how many tokens a completed response used"""
+        with self._lock:
+            samples = self._samples.get(task)
+            if samples is None:
+                samples = self._samples[task] = deque(maxlen=self.window)
+            samples.append(completion_tokens)
+
+    def _percentile(self, samples: deque) -> int:
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return ordered[max(0, index)]
+
+    def size(self, task: str, requested: int) -> int:
+        """
+        Budget to send for a request that asked for `requested` tokens
+
+        Returns `requested` unchanged while disabled or still learning.
+        """
+        if not self.enabled:
+            return requested
+
+        with self._lock:
+            samples = self._samples.get(task)
+            if not samples or len(samples) < self.min_samples:
+                return requested
+
+            budget = int(self._percentile(samples) * (1 + self.margin))
+            budget = min(requested, max(self.floor, budget))
+            if budget < requested:
+                self._count(task, "sized")
+                self._count(task, "tokens_saved", requested - budget)
+            return budget
+
+    def record_continuation(self, task: str, refetch: bool = False) -> None:
+        """Note that a sized response was cut off and had to be completed"""
+        with self._lock:
+            self._count(task, "refetches" if refetch else "continuations")
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-task sample counts, percentiles and savings"""
+        with self._lock:
+            result = {}
+            for task, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[task] = {
+                    "samples": len(ordered),
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": self._percentile(samples),
+                    "max": ordered[-1],
+                    **self._counters.get(
+                        task, {"sized": 0, "tokens_saved": 0, "continuations": 0, "refetches": 0}
+                    )
+                }
+            return result
+
+
+# Singleton instance
+_completion_sizer = None
+
+
+def get_completion_sizer() -> CompletionSizer:
+    """
+    Get or create the process-wide sizer
+
+    Sizing is opt-in via GROQ_ADAPTIVE_MAX_TOKENS; histograms are always kept.
+    """
+    global _completion_sizer
+    if _completion_sizer is None:
+        _completion_sizer = CompletionSizer(
+            enabled=os.getenv("GROQ_ADAPTIVE_MAX_TOKENS", "").lower() in ("1", "true", "yes"),
+            percentile=float(os.getenv("GROQ_ADAPTIVE_PERCENTILE", 95)),
+            margin=float(os.getenv("GROQ_ADAPTIVE_MARGIN", 0.2)),
+            min_samples=int(os.getenv("GROQ_ADAPTIVE_MIN_SAMPLES", 20)),
+            floor=int(os.getenv("GROQ_ADAPTIVE_FLOOR", 256))
+        )
+    return _completion_sizer
@@ -0,0 +1,91 @@
+"""
+Concurrency primitives shared across threads and event loops
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Any
+
+
+class ConcurrencyLimiter:
+    """
+    Process-wide cap on in-flight async requests
+
+    Unlike asyncio.Semaphore this is not bound to a single event loop, so
+    Streamlit sessions (each running their own asyncio.run on their own
+    script thread) share one limit. Waiters are served first-in, first-out.
+    """
+
+    def __init__(self, limit: int = 4):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()  # (loop, future) pairs
+        self.peak_active = 0
+        self.total_acquired = 0
+
+    async def acquire(self) -> None:
+        """Wait for a free slot"""
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._take_slot()
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        future = waiter[1]
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over just as we were cancelled: give it back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it directly to the oldest waiter if any"""
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if loop.is_closed():
+                    continue
+                self.total_acquired += 1
+                loop.call_soon_threadsafe(self._wake, future)
+                return
+            self._active -= 1
+
+    def _take_slot(self) -> None:
+        self._active += 1
+        self.total_acquired += 1
+        self.peak_active = max(self.peak_active, self._active)
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current and peak in-flight counts"""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "active": self._active,
+                "waiting": len(self._waiters),
+                "peak_active": self.peak_active,
+                "total_acquired": self.total_acquired
+            }
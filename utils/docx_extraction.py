@@ -0,0 +1,296 @@
+"""
+Streaming DOCX text extraction straight from the package XML
+
+python-docx builds an object model of the whole document before any text
+can be read, and walking `doc.paragraphs` then `doc.tables` loses document
+order (every table lands after the last paragraph). A DOCX is a zip of XML
+parts, so word/document.xml is iterparsed directly from the archive
+instead: paragraphs, tables, text boxes and nested tables come out in the
+order they appear, header parts come first and footer parts last, and
+parsing stops as soon as the character budget is reached.
+
+python-docx stays as the fallback for packages the streaming reader can't
+handle.
+"""
+
+import io
+import os
+import re
+import time
+import zipfile
+import posixpath
+import threading
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Tuple
+
+
+# Transitional and Strict OOXML use different WordprocessingML namespaces
+_W_NAMESPACES = (
+    "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "http://purl.oclc.org/ooxml/wordprocessingml/main",
+)
+_MC_NAMESPACE = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+_RELS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
+_HEADER_FOOTER = re.compile(r"/(header|footer)$")
+
+
+def _w(name: str) -> Tuple[str, ...]:
+    return tuple(f"{{{namespace}}}{name}" for namespace in _W_NAMESPACES)
+
+
+_P, _T, _TAB, _BR, _CR = _w("p"), _w("t"), _w("tab"), _w("br"), _w("cr")
+_TBL, _TR, _TC = _w("tbl"), _w("tr"), _w("tc")
+# Subtrees whose text is not document text: text boxes are stored twice, as
+# DrawingML under mc:Choice and as VML under mc:Fallback for older readers
+# (only the first copy is read), and paragraph properties hold w:tab tab
+# stops that aren't tab characters
+_SKIP = (f"{{{_MC_NAMESPACE}}}Fallback",) + _w("pPr")
+
+
+class _Budget:
+    """Characters read so far from one part, against an optional limit"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.chars = 0
+
+    def add(self, text: str) -> None:
+        self.chars += len(text)
+
+    @property
+    def spent(self) -> bool:
+        return bool(self.max_chars) and self.chars >= self.max_chars
+
+
+def _row_text(cells: List[str]) -> str:
+    """One line per row when every cell is a single line, else one cell after another"""
+    cells = [cell for cell in cells if cell]
+    if any("\n" in cell for cell in cells):
+        return "\n".join(cells)
+    return " | ".join(cells)
+
+
+def _iter_part(stream, budget: _Budget) -> List[str]:
+    """
+    Paragraph and table-row text of one WordprocessingML part, in document order
+
+    A stack of sinks tracks where text goes: the part itself, or the table
+    cell being read. Merged cells need no special handling: a vertically
+    merged continuation cell is empty in the XML and a horizontal span is
+    a single w:tc, so nothing is emitted twice.
+    """
+    blocks: List[str] = []
+    sinks: List[List[str]] = [blocks]
+    rows: List[List[str]] = []
+    runs: List[List[str]] = []
+    skip_depth = 0
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag in _SKIP:
+                skip_depth += 1
+            elif skip_depth:
+                continue
+            elif tag in _P:
+                runs.append([])
+            elif tag in _TR:
+                rows.append([])
+            elif tag in _TC:
+                sinks.append([])
+            continue
+
+        if tag in _SKIP:
+            skip_depth -= 1
+            elem.clear()
+            continue
+        if skip_depth:
+            continue
+
+        if tag in _T:
+            if runs and elem.text:
+                runs[-1].append(elem.text)
+        elif tag in _TAB:
+            if runs:
+                runs[-1].append("\t")
+        elif tag in _BR or tag in _CR:
+            if runs:
+                runs[-1].append("\n")
+        elif tag in _P:
+            text = "".join(runs.pop()).strip()
+            if text:
+                sinks[-1].append(text)
+                budget.add(text)
+            elem.clear()
+        elif tag in _TC:
+            cell = sinks.pop()
+            if rows:
+                rows[-1].append("\n".join(cell))
+        elif tag in _TR:
+            text = _row_text(rows.pop())
+            if text:
+                sinks[-1].append(text)
+        elif tag in _TBL:
+            elem.clear()
+
+        # Stop only between top-level blocks so a table is never cut mid-row
+        if budget.spent and len(sinks) == 1 and not rows and not runs:
+            break
+    return blocks
+
+
+def _header_footer_parts(archive: zipfile.ZipFile) -> Dict[str, List[str]]:
+    """Header and footer part names referenced by the main document, in part-name order"""
+    parts: Dict[str, List[str]] = {"header": [], "footer": []}
+    try:
+        rels = archive.read("word/_rels/document.xml.rels")
+    except KeyError:
+        return parts
+    for rel in ET.fromstring(rels).iter(f"{{{_RELS_NAMESPACE}}}Relationship"):
+        kind = _HEADER_FOOTER.search(rel.get("Type", ""))
+        if kind and rel.get("TargetMode") != "External":
+            name = posixpath.normpath(posixpath.join("word", rel.get("Target", "")))
+            if name in archive.namelist():
+                parts[kind.group(1)].append(name)
+    # header1.xml before header10.xml
+    key = lambda name: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+    return {kind: sorted(names, key=key) for kind, names in parts.items()}
+
+
+def _read_parts(archive: zipfile.ZipFile, names: List[str]) -> List[str]:
+    blocks: List[str] = []
+    for name in names:
+        with archive.open(name) as stream:
+            for text in _iter_part(stream, _Budget(0)):
+                # First-page, even and default headers often repeat each other
+                if text not in blocks:
+                    blocks.append(text)
+    return blocks
+
+
+def extract_docx_stream(file_bytes: bytes, max_chars: int = 0) -> Tuple[List[str], bool]:
+    """
+    Text blocks of a DOCX (paragraphs and table rows) read straight from the
+    zip: headers, then the body in document order, then footers
+
+    Args:
+        max_chars: Stop reading the body once about this many characters
+            are read (0 = no limit); headers and footers are always read
+
+    Returns:
+        (text blocks, whether the budget cut the document short)
+    """
+    budget = _Budget(max_chars)
+    with zipfile.ZipFile(io.BytesIO(file_bytes)) as archive:
+        parts = _header_footer_parts(archive)
+        blocks = _read_parts(archive, parts["header"])
+        with archive.open("word/document.xml") as stream:
+            blocks.extend(_iter_part(stream, budget))
+        truncated = budget.spent
+        blocks.extend(_read_parts(archive, parts["footer"]))
+    return blocks, truncated
+
+
+def extract_python_docx(file_bytes: bytes) -> List[str]:
+    """Paragraph text, then table cell text, via python-docx's object model"""
+    from docx import Document
+
+    doc = Document(io.BytesIO(file_bytes))
+    blocks = [paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip()]
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                if cell.text.strip():
+                    blocks.append(cell.text)
+    return blocks
+
+
+class DOCXExtractor:
+    """
+    Streaming DOCX extraction with python-docx as the fallback
+
+    Counts documents, seconds and characters per method, fallbacks and
+    budget truncations.
+    """
+
+    def __init__(self, streaming: bool = True, max_chars: int = 0):
+        """
+        Args:
+            streaming: Iterparse the package XML; if False, always use python-docx
+            max_chars: Stop the streaming reader once about this many
+                characters are read (0 = no limit)
+        """
+        self.streaming = streaming
+        self.max_chars = max(0, max_chars)
+        self._lock = threading.Lock()
+        self._methods = {method: {"runs": 0, "seconds": 0.0, "chars": 0} for method in ("stream", "python-docx")}
+        self._fallbacks = 0
+        self._truncated = 0
+
+    def extract(self, file_bytes: bytes) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Text blocks of the document
+
+        Returns:
+            (text blocks, {"method": 'stream' or 'python-docx', "seconds": float,
+             "truncated": bool, "error": str or None})
+        """
+        report: Dict[str, Any] = {"method": None, "seconds": None, "truncated": False, "error": None}
+        if self.streaming:
+            start = time.perf_counter()
+            try:
+                blocks, truncated = extract_docx_stream(file_bytes, self.max_chars)
+            except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+                report["error"] = f"{type(e).__name__}: {e}"
+                with self._lock:
+                    self._fallbacks += 1
+            else:
+                report.update(truncated=truncated)
+                self._record(report, "stream", blocks, time.perf_counter() - start)
+                return blocks, report
+
+        start = time.perf_counter()
+        blocks = extract_python_docx(file_bytes)
+        self._record(report, "python-docx", blocks, time.perf_counter() - start)
+        return blocks, report
+
+    def _record(self, report: Dict[str, Any], method: str, blocks: List[str], seconds: float) -> None:
+        report.update(method=method, seconds=seconds)
+        with self._lock:
+            counts = self._methods[method]
+            counts["runs"] += 1
+            counts["seconds"] += seconds
+            counts["chars"] += sum(len(block) for block in blocks)
+            self._truncated += report["truncated"]
+
+    def stats(self) -> Dict[str, Any]:
+        """Runs, seconds and characters per method, ms per document, fallbacks and truncations"""
+        with self._lock:
+            return {
+                "methods": {
+                    method: {
+                        **counts,
+                        "ms_per_document": 1000 * counts["seconds"] / counts["runs"] if counts["runs"] else None
+                    }
+                    for method, counts in self._methods.items()
+                },
+                "streaming": self.streaming,
+                "max_chars": self.max_chars,
+                "fallbacks": self._fallbacks,
+                "truncated": self._truncated
+            }
+
+
+# Singleton instance
+_docx_extractor = None
+
+
+def get_docx_extractor() -> DOCXExtractor:
+    """Get or create the DOCX extractor (DOCX_STREAMING, DOCX_MAX_CHARS)"""
+    global _docx_extractor
+    if _docx_extractor is None:
+        _docx_extractor = DOCXExtractor(
+            streaming=os.getenv("DOCX_STREAMING", "true").lower() not in ("0", "false", "no"),
+            max_chars=int(os.getenv("DOCX_MAX_CHARS", 60000))
+        )
+    return _docx_extractor
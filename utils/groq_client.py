@@ -3,146 +3,1787 @@ Groq AI client wrapper with retry logic
 """
 
 import os
+import re
 import json
 import time
-from typing import Optional, Dict, Any, List
-from groq import Groq
-import streamlit as st
+import queue
+import asyncio
+import threading
+import weakref
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Awaitable, Iterator
+from groq import Groq, AsyncGroq, BadRequestError
+
+from utils.llm_cache import get_llm_cache, make_cache_key
+from utils.concurrency import ConcurrencyLimiter
+from utils.rate_limiter import get_rate_limiter, Reservation
+from utils.key_pool import KeyPool, APIKey, parse_api_keys
+from utils.singleflight import SingleFlight
+from utils.llm_events import EventSink, LoggingEventSink, StreamlitEventSink
+from utils.llm_metrics import get_metrics_registry
+from utils.token_estimate import estimate_token_count, get_token_calibration
+from utils.prompt_budget import Section, assemble
+from utils.llm_scheduler import get_scheduler, task_priority, current_session, Ticket
+from utils.usage_accounting import get_usage_tracker, current_account, UsageHold
+from utils.llm_cassette import get_cassette
+from utils.completion_sizer import get_completion_sizer
+from utils.model_router import get_model_router, Validator
+from utils.hedging import get_hedger
+from utils.structured_output import IncrementalJSONParser, schema_instructions, validate_schema
+from utils.retry_policy import (
+    get_retry_policy, get_circuit_breaker, classify, retry_after, RETRYABLE, UNHEALTHY
+)
+
+
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _close_json(text: str, closers: List[str]) -> str:
+    """Drop a dangling comma, key or colon and close the open containers"""
+    text = text.rstrip()
+    while True:
+        trimmed = text.rstrip(",").rstrip()
+        if closers and closers[-1] == "}":
+            # A key without its value: {"a": 1, "b"   or   {"a": 1, "b":
+            trimmed = re.sub(r'(?<=[{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', "", trimmed).rstrip()
+        if trimmed == text:
+            break
+        text = trimmed
+    return text + "".join(reversed(closers))
+
+
+def repair_json(text: str) -> Tuple[Optional[Any], List[str]]:
+    """
+    Recover a JSON object or array from malformed LLM output
+
+    Handles prose or code fences around the JSON, output cut off mid-string
+    or mid-object (open strings and containers are closed), trailing commas,
+    single-quoted strings, Python literals (True/None), unquoted keys and
+    raw newlines inside strings. A value cut off part-way (half a string
+    or number) is dropped rather than kept truncated, and if the result
+    still doesn't parse, the largest prefix ending at a complete value is
+    kept. Input that recovers to nothing but an empty object or array
+    counts as unrepairable.
+
+    Returns:
+        (parsed value or None, names of the fixes applied)
+    """
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return None, []
+    start = min(starts)
+
+    fixes = []
+    if text[:start].strip():
+        fixes.append("wrapper")
+
+    out: List[str] = []
+    closers: List[str] = []
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []  # (output length, open containers) after complete values
+    in_string = False
+    quote = '"'
+    escape = False
+    index = start
+
+    while index < len(text):
+        char = text[index]
+        index += 1
+
+        if in_string:
+            if escape:
+                escape = False
+                out.append(char)
+            elif char == "\\":
+                escape = True
+                out.append(char)
+            elif char == quote:
+                in_string = False
+                out.append('"')
+            elif char == '"':
+                out.append('\\"')  # Inside a single-quoted string
+            elif char in "\n\r\t":
+                fixes.append("control_chars")
+                out.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char])
+            else:
+                out.append(char)
+            continue
+
+        if char in "\"'":
+            if char == "'":
+                fixes.append("single_quotes")
+            in_string, quote = True, char
+            out.append('"')
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            if not closers:
+                break
+            if char != closers[-1]:
+                fixes.append("mismatched_brackets")
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                fixes.append("trailing_comma")
+            out.append(closers.pop())
+            if not closers:
+                break
+            cuts.append((len(out), tuple(closers)))
+        elif char == ",":
+            cuts.append((len(out), tuple(closers)))
+            out.append(char)
+        elif char.isalpha() or char == "_":
+            end = index
+            while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[index - 1:end]
+            index = end
+            if word in _PYTHON_LITERALS:
+                fixes.append("python_literals")
+                word = _PYTHON_LITERALS[word]
+            elif word not in ("true", "false", "null") and text[end:].lstrip().startswith(":"):
+                fixes.append("unquoted_keys")
+                word = f'"{word}"'
+            out.append(word)
+        else:
+            out.append(char)
+
+    if text[index:].strip() and not closers:
+        fixes.append("wrapper")
+
+    candidates = []
+    if closers:
+        fixes.append("truncated")
+        tail = "".join(out).rstrip()[-1:]
+        # Keep the last value only if it ended before the cut
+        if not in_string and not (tail.isalnum() or tail in ".-+"):
+            candidates.append(_close_json("".join(out), closers))
+    else:
+        candidates.append("".join(out))
+    candidates += [_close_json("".join(out[:length]), list(stack)) for length, stack in reversed(cuts[-20:])]
+
+    # An empty object or array only counts if the input really was empty;
+    # otherwise nothing was recovered
+    had_content = any(not char.isspace() and char not in "{}[]," for char in out)
+    for attempt, candidate in enumerate(candidates):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if not value and had_content:
+            continue
+        if attempt and "truncated" not in fixes:
+            fixes.append("prefix")
+        return value, list(dict.fromkeys(fixes))
+    return None, list(dict.fromkeys(fixes))
+
+
+class SizedParams(dict):
+    """
+    Request params with an adapted max_tokens that remember the caller's
+
+    The adaptive budget depends on completions seen so far, so anything
+    that must match across runs (cassette keys) uses `requested` instead.
+    """
+
+    def __init__(self, requested: Dict[str, Any], **changes: Any):
+        super().__init__(requested, **changes)
+        self.requested = requested
+
+
+def requested_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """The params the caller asked for, before adaptive sizing"""
+    return getattr(params, "requested", params)
+
+
+def with_model(params: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """`params` sent to another model, keeping the caller's params if sized"""
+    if isinstance(params, SizedParams):
+        return SizedParams({**params.requested, "model": model}, max_tokens=params["max_tokens"])
+    return {**params, "model": model}
+
+
+# Every GroqClient, so run_concurrently can close their async clients
+_live_clients: "weakref.WeakSet[GroqClient]" = weakref.WeakSet()
 
 
 class GroqClient:
     """Wrapper for Groq AI API operations"""
 
-    # Model configurations
-    MODELS = {
-        "8b": "llama-3.1-8b-instant",  # Fast, for speed tasks
-        "70b": "llama-3.3-70b-versatile",  # Quality, for nuanced tasks (updated from 3.1 to 3.3)
-        "mixtral": "mixtral-8x7b-32768"  # Alternative
-    }
+    # Model configurations
+    MODELS = {
+        "8b": "llama-3.1-8b-instant",  # Fast, for speed tasks
+        "70b": "llama-3.3-70b-versatile",  # Quality, for nuanced tasks (updated from 3.1 to 3.3)
+        "mixtral": "mixtral-8x7b-32768"  # Alternative
+    }
+
+    def __init__(self, event_sink: Optional[EventSink] = None, headless: Optional[bool] = None):
+        """
+        Initialize Groq client
+
+        Args:
+            event_sink: Where retries, errors and rate-limit waits are reported
+            headless: Never touch Streamlit (default from GROQ_HEADLESS); events
+                go to logging unless an event_sink is given
+        """
+        if headless is None:
+            headless = os.getenv("GROQ_HEADLESS", "").lower() in ("1", "true", "yes")
+        self.headless = headless
+        self.events = event_sink or (LoggingEventSink() if headless else StreamlitEventSink())
+
+        # Latency/token/retry metrics (Prometheus endpoint if GROQ_METRICS_PORT is set)
+        self.metrics = get_metrics_registry()
+
+        # Offline token counts vs. Groq's usage.prompt_tokens (GROQ_TOKEN_SAFETY_MARGIN)
+        self.token_calibration = get_token_calibration()
+        self._calibration_warned = False
+
+        # Record or replay completions (GROQ_CASSETTE_MODE); replay needs no network
+        self.cassette = get_cassette()
+
+        # GROQ_BASE_URL points the client at a compatible server, e.g. the
+        # local stand-in (python -m utils.groq_standin), which needs no key
+        self.base_url = os.getenv("GROQ_BASE_URL") or None
+        api_keys = parse_api_keys(os.getenv("GROQ_API_KEYS", ""), os.getenv("GROQ_API_KEY"))
+        if not api_keys:
+            if not self.base_url and not (self.cassette and self.cassette.replaying):
+                raise ValueError("Missing GROQ_API_KEY. Check .env file.")
+            api_keys = ["standin"]
+
+        # Each request goes to the key with the most quota left (GROQ_API_KEYS)
+        self.key_pool = KeyPool(
+            api_keys,
+            quarantine_seconds=float(os.getenv("GROQ_KEY_QUARANTINE", 60)),
+            max_strikes=int(os.getenv("GROQ_KEY_MAX_429", 3))
+        )
+        self._client_options = {
+            "base_url": self.base_url,
+            "timeout": float(os.getenv("GROQ_TIMEOUT", 60)),
+            "max_retries": int(os.getenv("GROQ_SDK_MAX_RETRIES", 2))
+        }
+        self._clients = {key: Groq(api_key=key, **self._client_options) for key in api_keys}
+        self.client = self._clients[api_keys[0]]
+        self.default_model = self.MODELS["8b"]  # Fast by default
+        self.cache = get_llm_cache()  # None unless LLM_CACHE_ENABLED is set
+
+        # Async clients are created lazily, one set per event loop, and
+        # closed by aclose() before that loop ends
+        self._async_clients = weakref.WeakKeyDictionary()
+        _live_clients.add(self)
+        self.concurrency = ConcurrencyLimiter(int(os.getenv("GROQ_MAX_CONCURRENCY", 4)))
+
+        # Proactive RPM/TPM limiting, shared by every session in the process
+        self.rate_limiter = get_rate_limiter(self.MODELS, scale=len(api_keys))
+        self.max_queue_wait = float(os.getenv("GROQ_MAX_QUEUE_WAIT", 60))
+
+        # Interactive calls before blocking before background, fair across sessions
+        self.scheduler = get_scheduler()
+        if self.scheduler:
+            scheduler = self.scheduler
+            self.metrics.register_gauge(
+                "llm_queue_depth",
+                lambda: [({"priority": name}, depth) for name, depth in scheduler.depths().items()]
+            )
+
+        # Per-user token accounting and budgets (GROQ_USER_TPM, GROQ_USER_DAILY_TOKENS)
+        self.usage_tracker = get_usage_tracker()
+
+        # Share results between identical concurrent requests
+        self.single_flight = None
+        if os.getenv("GROQ_SINGLE_FLIGHT", "true").lower() not in ("0", "false", "no"):
+            self.single_flight = SingleFlight()
+
+        # TTFT / throughput of recent streaming calls
+        self.stream_stats = deque(maxlen=200)
+
+        # Outcomes of recent schema-constrained calls (see call_api_structured)
+        self.structured_outcomes = deque(maxlen=200)
+
+        # Malformed JSON responses rescued by repair_json instead of a re-call
+        self._repair_lock = threading.Lock()
+        self._repair_counts = {"attempted": 0, "repaired": 0, "fixes": {}}
+
+        # Per-task completion lengths; sizes max_tokens if GROQ_ADAPTIVE_MAX_TOKENS is set
+        self.sizer = get_completion_sizer()
+
+        # Fast-model-first cascades per task (None unless GROQ_MODEL_CASCADE is set)
+        self.router = get_model_router()
+
+        # Backup requests for calls slower than their usual latency (GROQ_HEDGE_ENABLED)
+        self.hedger = get_hedger(self.MODELS)
+
+        # Jittered backoff and per-model fail-fast while Groq is unhealthy
+        self.retry_policy = get_retry_policy()
+        self.circuit_breaker = get_circuit_breaker()
+        self._hedge_loop = None
+        self._hedge_loop_lock = threading.Lock()
+
+    def call_api(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "8b",
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        response_format: Optional[Dict] = None,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,  # Increased from 1.0 to 2.0 seconds
+        task: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Call Groq API with retry logic
+
+        Args:
+            system_prompt: System instructions
+            user_prompt: User input
+            model: Model key ('8b', '70b', or 'mixtral')
+            temperature: Sampling temperature (0-2)
+            max_tokens: Maximum tokens in response
+            response_format: Force JSON output if {"type": "json_object"}
+            max_retries: Number of retry attempts
+            retry_delay: Delay between retries (seconds)
+            task: Task name (e.g. 'resume_parse') for cache bypass rules
+            use_cache: Set False to skip the response cache for this call
+
+        Returns:
+            {
+                "success": bool,
+                "content": str,  # Response text
+                "usage": dict,   # Token usage stats
+                "cached": bool,  # True if served from the response cache
+                "coalesced": bool,  # Present if shared with an identical in-flight call
+                "attempts": int, # Number of requests sent
+                "error": str,    # Error message if failed
+                "error_type": str  # 'rate_limit', 'timeout', 'server_error', 'unavailable',
+                                   # 'busy', 'api_error', ...
+            }
+        """
+        start = time.perf_counter()
+        params = self._build_params(
+            system_prompt, user_prompt, model, temperature, max_tokens, response_format
+        )
+
+        request_key = make_cache_key(**params)
+
+        # Serve repeat deterministic requests from the cache
+        cache_key, cached = self._cache_lookup(request_key, params, task, use_cache)
+        if cached is not None:
+            self.events.emit("cache_hit", "debug", "Served from response cache", task=task, model=params["model"])
+            return self._observe_call(task, params, start, cached)
+
+        response = self._call_with_retries(request_key, params, cache_key, max_retries, retry_delay, task)
+        return self._observe_call(task, params, start, response)
+
+    def _call_with_retries(
+        self,
+        request_key: str,
+        params: Dict[str, Any],
+        cache_key: Optional[str],
+        max_retries: int,
+        retry_delay: float,
+        task: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        _send_with_retries within the caller's token budget
+
+        The budget check and hold are per caller, outside single-flight:
+        a call that shares an identical in-flight request, even another
+        user's, is still checked against and billed to its own account.
+        """
+        hold, failure = self._reserve_usage(params, task)
+        if failure:
+            return failure
+        response = None
+        try:
+            if not self.single_flight:
+                response = self._send_with_retries(params, cache_key, max_retries, retry_delay, task)
+                return response
+
+            # Identical request already in flight (double click, rerun): share its result
+            response, shared = self.single_flight.do(
+                request_key,
+                lambda: self._send_with_retries(params, cache_key, max_retries, retry_delay, task)
+            )
+            if shared:
+                response = {**response, "coalesced": True}
+            return response
+        finally:
+            self._settle_usage(hold, response)
+
+    def _send_with_retries(
+        self,
+        params: Dict[str, Any],
+        cache_key: Optional[str],
+        max_retries: int,
+        retry_delay: float,
+        task: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Send a request, retrying on rate limits, timeouts and server errors"""
+        sized = self._size_params(params, task)
+        wait_time = None
+
+        for attempt in range(max_retries):
+            model_name = sized["model"]
+            failure = self._check_circuit(model_name)
+            if failure:
+                return failure
+            # Set once the attempt recorded a health verdict; otherwise a
+            # half-open probe taken above is handed back in `finally`
+            judged = False
+            try:
+                ticket, failure = self._admit(sized, task)
+                if failure:
+                    return failure
+                reservation, failure = self._reserve_capacity(sized)
+                if failure:
+                    self._release(ticket)
+                    return failure
+                if reservation and reservation.delay:
+                    self._emit_wait(reservation)
+                    time.sleep(reservation.delay)
+
+                try:
+                    result = self._send_hedged(sized, task)
+                except Exception as e:
+                    self._release(ticket)
+                    self._settle_capacity(reservation, None)
+                    if sized is not params and self._cut_off_by_budget(e, sized):
+                        # JSON mode rejects output cut off by the tighter budget
+                        self.sizer.record_continuation(self._size_key(params, task), refetch=True)
+                        sized = params
+                        continue
+                    judged = True
+                    wait_time, failure = self._retry_decision(
+                        e, attempt, max_retries, retry_delay, params["model"], wait_time
+                    )
+                    if failure:
+                        return failure
+                    time.sleep(wait_time)
+                    continue
+
+                self._release(ticket)
+                self._record_healthy(model_name)
+                judged = True
+                self._calibrate(sized, result["usage"])
+                self._settle_capacity(reservation, result)
+                if sized is not params and result["finish_reason"] == "length":
+                    result = self._complete_truncated(params, result, task)
+                self.sizer.observe(self._size_key(params, task), result["usage"]["completion_tokens"])
+                # A sized reply that couldn't be completed must not be replayed from the cache
+                cache_key = None if result.get("cut_off") else cache_key
+                return {**self._success_response(result, cache_key), "attempts": attempt + 1}
+            finally:
+                if not judged:
+                    self._release_probe(model_name)
+
+        return self._failure("max_retries", "Max retries exceeded")
+
+    async def acall_api(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "8b",
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        response_format: Optional[Dict] = None,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,
+        task: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of call_api
+
+        In-flight requests are capped process-wide by GROQ_MAX_CONCURRENCY,
+        so callers can gather many of these without flooding the API.
+        Returns the same dict as call_api.
+        """
+        start = time.perf_counter()
+        params = self._build_params(
+            system_prompt, user_prompt, model, temperature, max_tokens, response_format
+        )
+
+        request_key = make_cache_key(**params)
+
+        cache_key, cached = self._cache_lookup(request_key, params, task, use_cache)
+        if cached is not None:
+            self.events.emit("cache_hit", "debug", "Served from response cache", task=task, model=params["model"])
+            return self._observe_call(task, params, start, cached)
+
+        response = await self._acall_with_retries(request_key, params, cache_key, max_retries, retry_delay, task)
+        return self._observe_call(task, params, start, response)
+
+    async def _acall_with_retries(
+        self,
+        request_key: str,
+        params: Dict[str, Any],
+        cache_key: Optional[str],
+        max_retries: int,
+        retry_delay: float,
+        task: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async version of _call_with_retries"""
+        hold, failure = self._reserve_usage(params, task)
+        if failure:
+            return failure
+        response = None
+        try:
+            if not self.single_flight:
+                response = await self._asend_with_retries(params, cache_key, max_retries, retry_delay, task)
+                return response
+
+            response, shared = await self.single_flight.ado(
+                request_key,
+                lambda: self._asend_with_retries(params, cache_key, max_retries, retry_delay, task)
+            )
+            if shared:
+                response = {**response, "coalesced": True}
+            return response
+        finally:
+            self._settle_usage(hold, response)
+
+    async def _asend_with_retries(
+        self,
+        params: Dict[str, Any],
+        cache_key: Optional[str],
+        max_retries: int,
+        retry_delay: float,
+        task: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async version of _send_with_retries"""
+        sized = self._size_params(params, task)
+        wait_time = None
+
+        for attempt in range(max_retries):
+            model_name = sized["model"]
+            failure = self._check_circuit(model_name)
+            if failure:
+                return failure
+            judged = False
+            try:
+                ticket, failure = await self._aadmit(sized, task)
+                if failure:
+                    return failure
+                reservation, failure = self._reserve_capacity(sized)
+                if failure:
+                    self._release(ticket)
+                    return failure
+                if reservation and reservation.delay:
+                    self._emit_wait(reservation)
+                    await asyncio.sleep(reservation.delay)
+
+                try:
+                    async with self.concurrency:
+                        result = await self._asend_hedged(sized, task)
+                except Exception as e:
+                    self._release(ticket)
+                    self._settle_capacity(reservation, None)
+                    if sized is not params and self._cut_off_by_budget(e, sized):
+                        self.sizer.record_continuation(self._size_key(params, task), refetch=True)
+                        sized = params
+                        continue
+                    judged = True
+                    wait_time, failure = self._retry_decision(
+                        e, attempt, max_retries, retry_delay, params["model"], wait_time
+                    )
+                    if failure:
+                        return failure
+                    await asyncio.sleep(wait_time)
+                    continue
+
+                self._release(ticket)
+                self._record_healthy(model_name)
+                judged = True
+                self._calibrate(sized, result["usage"])
+                self._settle_capacity(reservation, result)
+                if sized is not params and result["finish_reason"] == "length":
+                    result = await self._acomplete_truncated(params, result, task)
+                self.sizer.observe(self._size_key(params, task), result["usage"]["completion_tokens"])
+                # A sized reply that couldn't be completed must not be replayed from the cache
+                cache_key = None if result.get("cut_off") else cache_key
+                return {**self._success_response(result, cache_key), "attempts": attempt + 1}
+            finally:
+                if not judged:
+                    self._release_probe(model_name)
+
+        return self._failure("max_retries", "Max retries exceeded")
+
+    def stream_api(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "70b",
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,
+        task: Optional[str] = None,
+        validator: Optional[Validator] = None
+    ) -> "CompletionStream":
+        """
+        Stream a completion token by token
+
+        Text that has been shown can't be taken back, so a cascaded task
+        streams from the first model its route allows and the finished
+        text is only validated for the router's stats (which move the task
+        to the stronger model when the fast one keeps failing).
+
+        Returns:
+            CompletionStream - iterate it for text deltas (e.g. pass it to
+            st.write_stream); content, usage, ttft and tokens_per_second are
+            filled in once it is exhausted
+        """
+        if self.router:
+            model = self.router.route(task, model)[0]
+        params = self._build_params(
+            system_prompt, user_prompt, model, temperature, max_tokens, None
+        )
+        return CompletionStream(self, params, task, max_retries, retry_delay, model_key=model, validator=validator)
+
+    def call_api_routed(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        task: str,
+        model: str = "70b",
+        validator: Optional[Validator] = None,
+        json_mode: bool = False,
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        max_retries: int = 3,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Call the API through the task's model cascade
+
+        Each model in the route is tried in turn until one succeeds and its
+        output passes validation (JSON parsing in json_mode, then
+        `validator`). Without a router this is a single call to `model`.
+
+        Args:
+            task: Task name; selects the cascade
+            model: Strongest model the caller is willing to use
+            validator: Receives the parsed JSON (json_mode) or the text and
+                returns an error message, or None if acceptable
+            json_mode: Request and parse a JSON object
+
+        Returns:
+            call_api's response dict (plus "data" in json_mode) from the last
+            model tried, with "model" (key used), "escalations" (list of
+            {"model", "reason"}) and "validation_error" if even the last
+            model's output failed validation
+        """
+        models = self.router.route(task, model) if self.router else [model]
+        escalations = []
+
+        for index, key in enumerate(models):
+            response = self.call_api(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                model=key,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"} if json_mode else None,
+                max_retries=max_retries,
+                task=task,
+                use_cache=use_cache
+            )
+            response, error = self._validate_routed(response, validator, json_mode, task, key)
+
+            if error is None or index == len(models) - 1 or response.get("error_type") == "quota_exceeded":
+                break
+            escalations.append({"model": key, "reason": error})
+            self._emit_escalation(task, key, models[index + 1], error)
+
+        return self._routed_response(response, key, escalations, error)
+
+    async def acall_api_routed(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        task: str,
+        model: str = "70b",
+        validator: Optional[Validator] = None,
+        json_mode: bool = False,
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        max_retries: int = 3,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Async counterpart of call_api_routed"""
+        models = self.router.route(task, model) if self.router else [model]
+        escalations = []
+
+        for index, key in enumerate(models):
+            response = await self.acall_api(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                model=key,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"} if json_mode else None,
+                max_retries=max_retries,
+                task=task,
+                use_cache=use_cache
+            )
+            response, error = self._validate_routed(response, validator, json_mode, task, key)
+
+            if error is None or index == len(models) - 1 or response.get("error_type") == "quota_exceeded":
+                break
+            escalations.append({"model": key, "reason": error})
+            self._emit_escalation(task, key, models[index + 1], error)
+
+        return self._routed_response(response, key, escalations, error)
+
+    def _validate_routed(
+        self,
+        response: Dict[str, Any],
+        validator: Optional[Validator],
+        json_mode: bool,
+        task: str,
+        model: str
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Parse and validate one model's output; returns (response, error or None)"""
+        if json_mode:
+            response = self._json_result(response)
+
+        if not response.get("success"):
+            error = response.get("error") or "Request failed"
+        elif validator:
+            error = validator(response["data"] if json_mode else response["content"])
+        else:
+            error = None
+
+        if self.router:
+            self.router.record(task, model, error)
+        return response, error
+
+    def _emit_escalation(self, task: str, from_model: str, to_model: str, reason: str) -> None:
+        self.record_fallback("escalation", task)
+        self.events.emit(
+            "model_escalation", "debug", f"{task}: {from_model} output rejected ({reason}); trying {to_model}",
+            task=task, model=from_model, escalate_to=to_model, reason=reason
+        )
+
+    @staticmethod
+    def _routed_response(
+        response: Dict[str, Any],
+        model: str,
+        escalations: List[Dict[str, str]],
+        error: Optional[str]
+    ) -> Dict[str, Any]:
+        routed = {**response, "model": model, "escalations": escalations}
+        if error and response.get("success"):
+            routed["validation_error"] = error
+        return routed
+
+    def _observe_call(
+        self,
+        task: Optional[str],
+        params: Dict[str, Any],
+        start: float,
+        response: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Record one finished call in the metrics registry; returns `response`"""
+        if response.get("cached"):
+            outcome = "cached"
+        elif response.get("success"):
+            outcome = "success"
+        else:
+            outcome = response.get("error_type") or "api_error"
+        labels = {"task": task or "", "model": params["model"]}
+        self.metrics.inc("llm_requests_total", outcome=outcome, **labels)
+
+        if outcome != "cached":
+            self.metrics.observe("llm_request_duration_seconds", time.perf_counter() - start, **labels)
+        # Cached and coalesced results were paid for by another call
+        usage = response.get("usage")
+        if usage and outcome != "cached" and not response.get("coalesced"):
+            self._observe_tokens(labels, usage)
+        return response
+
+    def _observe_tokens(self, labels: Dict[str, str], usage: Dict[str, int]) -> None:
+        self.metrics.inc("llm_prompt_tokens_total", usage.get("prompt_tokens") or 0, **labels)
+        self.metrics.inc("llm_completion_tokens_total", usage.get("completion_tokens") or 0, **labels)
+
+    def record_fallback(self, kind: str, task: Optional[str] = None) -> None:
+        """
+        Count a degraded path taken instead of the normal answer
+
+        Args:
+            kind: e.g. 'escalation', 'hedge', 'json_repair', 'schema_abort', 'template'
+        """
+        self.metrics.inc("llm_fallbacks_total", kind=kind, task=task or "")
+
+    def _build_params(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[Dict]
+    ) -> Dict[str, Any]:
+        """Build chat completion parameters"""
+        model_name = self.MODELS.get(model, self.default_model)
+
+        # Prepare messages
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+        # API call parameters
+        params = {
+            "model": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+        # Add JSON format if requested
+        if response_format:
+            params["response_format"] = response_format
+
+        return params
+
+    @staticmethod
+    def _size_key(params: Dict[str, Any], task: Optional[str]) -> str:
+        """Histogram key: the task, or the model for untagged calls"""
+        return task or params["model"]
+
+    def _size_params(self, params: Dict[str, Any], task: Optional[str]) -> Dict[str, Any]:
+        """
+        Apply the adaptive max_tokens budget
+
+        Returns `params` itself when the budget is unchanged, so callers can
+        test `sized is not params` to know a cut-off needs completing.
+        """
+        budget = self.sizer.size(self._size_key(params, task), params["max_tokens"])
+        if budget >= params["max_tokens"]:
+            return params
+        return SizedParams(params, max_tokens=budget)
+
+    def _follow_up_params(self, params: Dict[str, Any], partial: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Request that finishes a response cut off by a sized budget
+
+        Plain text is continued by prefilling the partial answer as the
+        assistant turn. A truncated JSON object can't be continued in JSON
+        mode, so it is fetched again at the caller's full budget.
+        """
+        if "response_format" in params:
+            return params
+
+        remaining = params["max_tokens"] - partial["usage"]["completion_tokens"]
+        if remaining <= 0:
+            return None
+        return {
+            **params,
+            "messages": params["messages"] + [{"role": "assistant", "content": partial["content"]}],
+            "max_tokens": remaining
+        }
+
+    @staticmethod
+    def _merge_follow_up(
+        params: Dict[str, Any],
+        partial: Dict[str, Any],
+        extra: Dict[str, Any],
+        refetch: bool
+    ) -> Dict[str, Any]:
+        """Combine a cut-off response with its continuation or refetch"""
+        usage = {
+            key: partial["usage"][key] + extra["usage"][key]
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+        content = extra["content"] if refetch else partial["content"] + extra["content"]
+        return {"content": content, "usage": usage, "finish_reason": extra["finish_reason"]}
+
+    def _complete_truncated(
+        self,
+        params: Dict[str, Any],
+        partial: Dict[str, Any],
+        task: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        One-shot continuation of a response cut off by a sized budget
+
+        If the continuation can't be sent, the request is fetched once more
+        at the caller's full budget. If that fails too, the partial is
+        returned marked `cut_off` so it never reaches the response cache.
+        """
+        follow_up = self._follow_up_params(params, partial)
+        if follow_up is not None:
+            self.sizer.record_continuation(self._size_key(params, task), refetch=follow_up is params)
+            extra = self._send_follow_up(follow_up, task)
+            if extra is not None:
+                return self._merge_follow_up(params, partial, extra, refetch=follow_up is params)
+        if follow_up is not params:
+            self.sizer.record_continuation(self._size_key(params, task), refetch=True)
+            extra = self._send_follow_up(params, task)
+            if extra is not None:
+                return self._merge_follow_up(params, partial, extra, refetch=True)
+        return {**partial, "cut_off": True}
+
+    def _send_follow_up(self, follow_up: Dict[str, Any], task: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Send a continuation or refetch; None if it couldn't get capacity or failed"""
+        reservation, failure = self._reserve_capacity(follow_up)
+        if failure:
+            return None
+        if reservation and reservation.delay:
+            self._emit_wait(reservation)
+            time.sleep(reservation.delay)
+
+        try:
+            extra = self._send(follow_up)
+        except Exception as e:
+            self._settle_capacity(reservation, None)
+            self.events.emit(
+                "continuation_error", "debug", f"Could not complete truncated response: {e}",
+                model=follow_up["model"], task=task
+            )
+            return None
+
+        self._settle_capacity(reservation, extra)
+        return extra
+
+    async def _acomplete_truncated(
+        self,
+        params: Dict[str, Any],
+        partial: Dict[str, Any],
+        task: Optional[str]
+    ) -> Dict[str, Any]:
+        """Async version of _complete_truncated"""
+        follow_up = self._follow_up_params(params, partial)
+        if follow_up is not None:
+            self.sizer.record_continuation(self._size_key(params, task), refetch=follow_up is params)
+            extra = await self._asend_follow_up(follow_up, task)
+            if extra is not None:
+                return self._merge_follow_up(params, partial, extra, refetch=follow_up is params)
+        if follow_up is not params:
+            self.sizer.record_continuation(self._size_key(params, task), refetch=True)
+            extra = await self._asend_follow_up(params, task)
+            if extra is not None:
+                return self._merge_follow_up(params, partial, extra, refetch=True)
+        return {**partial, "cut_off": True}
+
+    async def _asend_follow_up(self, follow_up: Dict[str, Any], task: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Async version of _send_follow_up"""
+        reservation, failure = self._reserve_capacity(follow_up)
+        if failure:
+            return None
+        if reservation and reservation.delay:
+            self._emit_wait(reservation)
+            await asyncio.sleep(reservation.delay)
+
+        try:
+            async with self.concurrency:
+                extra = await self._asend(follow_up)
+        except Exception as e:
+            self._settle_capacity(reservation, None)
+            self.events.emit(
+                "continuation_error", "debug", f"Could not complete truncated response: {e}",
+                model=follow_up["model"], task=task
+            )
+            return None
+
+        self._settle_capacity(reservation, extra)
+        return extra
+
+    def _cache_lookup(
+        self,
+        request_key: str,
+        params: Dict[str, Any],
+        task: Optional[str],
+        use_cache: bool
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up a request in the response cache
+
+        Returns:
+            (cache_key or None if not cacheable, cached response or None)
+        """
+        if not (use_cache and self.cache and self.cache.is_cacheable(params["temperature"], task)):
+            return None, None
+
+        cached = self.cache.get(request_key)
+        if cached is not None:
+            return request_key, {**cached, "cached": True}
+        return request_key, None
+
+    def _success_response(self, result: Dict[str, Any], cache_key: Optional[str]) -> Dict[str, Any]:
+        """Wrap a completion result and store it in the cache if applicable"""
+        if cache_key:
+            self.cache.set(cache_key, {
+                "success": True,
+                "content": result["content"],
+                "usage": result["usage"]
+            })
+
+        return {
+            "success": True,
+            "content": result["content"],
+            "usage": result["usage"],
+            "cached": False
+        }
+
+    def _reserve_capacity(
+        self,
+        params: Dict[str, Any]
+    ) -> Tuple[Optional[Reservation], Optional[Dict[str, Any]]]:
+        """
+        Reserve RPM/TPM capacity for a request (prompt estimate + max_tokens)
+
+        Returns:
+            (reservation or None, failure response if the queue is too long)
+        """
+        if not self.rate_limiter:
+            return None, None
+
+        reservation = self.rate_limiter.reserve(params["model"], self._estimated_tokens(params))
+
+        if reservation and reservation.delay > self.max_queue_wait:
+            self.rate_limiter.cancel(reservation)
+            return None, self._failure(
+                "busy",
+                f"⚠️ Groq is busy right now. Please try again in {reservation.delay:.0f}s.",
+                retry_after=reservation.delay
+            )
+
+        return reservation, None
+
+    def _estimated_tokens(self, params: Dict[str, Any]) -> int:
+        """Tokens a request may use: prompt estimate (with the calibrated safety factor) + max_tokens"""
+        prompt = self.token_calibration.estimate_messages([message["content"] for message in params["messages"]])
+        return int(prompt * self.token_calibration.factor) + params["max_tokens"]
+
+    def _calibrate(self, params: Dict[str, Any], usage: Optional[Dict[str, int]]) -> None:
+        """Compare the offline prompt count with the prompt_tokens Groq reported"""
+        actual = (usage or {}).get("prompt_tokens")
+        if not actual:
+            return
+        calibration = self.token_calibration
+        calibration.observe(calibration.estimate_messages([m["content"] for m in params["messages"]]), actual)
+        stats = calibration.stats()
+        if stats["margin_covers_p95"] is False and not self._calibration_warned:
+            self._calibration_warned = True
+            self.events.emit(
+                "token_calibration", "warning",
+                f"Offline token counts run {stats['ratio_p95']:.2f}x low at p95 (margin {stats['margin']}); "
+                "raise GROQ_TOKEN_SAFETY_MARGIN so prompts stay within budget",
+                **stats
+            )
+
+    def _admit(
+        self,
+        params: Dict[str, Any],
+        task: Optional[str],
+        priority: Optional[str] = None,
+        session: Optional[str] = None
+    ) -> Tuple[Optional[Ticket], Optional[Dict[str, Any]]]:
+        """
+        Wait for a scheduler slot for this request's priority class
+
+        Returns:
+            (ticket to release after sending or None, failure response if
+            the request waited longer than GROQ_MAX_QUEUE_WAIT)
+        """
+        if not self.scheduler:
+            return None, None
+
+        priority = priority or task_priority(task)
+        model = params["model"]
+        estimated = self._estimated_tokens(params)
+        has_capacity = None
+        if self.rate_limiter:
+            def has_capacity() -> bool:
+                headroom = self.rate_limiter.headroom(model)
+                return headroom is None or (
+                    headroom["requests"] >= 1 and headroom["tokens"] >= min(estimated, headroom["tpm"])
+                )
+
+        start = time.monotonic()
+        ticket = self.scheduler.acquire(
+            priority, session or current_session(), model, estimated,
+            has_capacity=has_capacity, timeout=self.max_queue_wait
+        )
+        waited = time.monotonic() - start
+        self.metrics.observe("llm_queue_wait_seconds", waited, priority=priority)
+        if ticket is None:
+            return None, self._failure(
+                "busy",
+                "⚠️ Groq is busy right now. Please try again in a minute.",
+                retry_after=self.max_queue_wait
+            )
+        if waited >= 0.1:
+            self.events.emit(
+                "scheduler_wait", "debug",
+                f"Queued {waited:.1f}s for a {priority} slot",
+                model=model, task=task, priority=priority, wait=waited
+            )
+        return ticket, None
+
+    async def _aadmit(
+        self,
+        params: Dict[str, Any],
+        task: Optional[str]
+    ) -> Tuple[Optional[Ticket], Optional[Dict[str, Any]]]:
+        """_admit without blocking the event loop"""
+        if not self.scheduler:
+            return None, None
+        # Resolved here: executor threads don't inherit the caller's context
+        priority, session = task_priority(task), current_session()
+        future = asyncio.get_running_loop().run_in_executor(
+            None, lambda: self._admit(params, task, priority, session)
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The slot may still be granted after we stop waiting; hand it back
+            future.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or self._release(done.result()[0])
+            )
+            raise
+
+    def _reserve_usage(
+        self,
+        params: Dict[str, Any],
+        task: Optional[str]
+    ) -> Tuple[Optional[UsageHold], Optional[Dict[str, Any]]]:
+        """
+        Hold the request's estimated tokens against the current user's budgets
+
+        Returns:
+            (hold to settle after the call or None, failure response if the
+            user is over their per-minute or daily budget)
+        """
+        if not self.usage_tracker:
+            return None, None
+
+        hold, denial = self.usage_tracker.reserve(current_account(), self._estimated_tokens(params))
+        if denial is None:
+            return hold, None
+
+        retry = denial["retry_after"]
+        if denial["scope"] == "day":
+            message = (f"⚠️ You've used today's AI budget ({denial['limit']:,} tokens). "
+                       f"It resets in {retry / 3600:.1f}h.")
+        else:
+            message = f"⚠️ You're sending requests faster than your share of AI capacity. Please try again in {retry:.0f}s."
+        self.metrics.inc("llm_quota_rejections_total", scope=denial["scope"], task=task or "")
+        self.events.emit(
+            "quota_exceeded", "debug", message,
+            task=task, model=params["model"], scope=denial["scope"], retry_after=retry
+        )
+        return None, self._failure("quota_exceeded", message, retry_after=retry, quota=denial)
+
+    def _settle_usage(self, hold: Optional[UsageHold], response: Optional[Dict[str, Any]]) -> None:
+        """Bill the tokens a call used to the user who held them"""
+        if self.usage_tracker and hold:
+            self.usage_tracker.settle(hold, (response or {}).get("usage"))
+
+    def _release(self, ticket: Optional[Ticket]) -> None:
+        if self.scheduler and ticket:
+            self.scheduler.release(ticket)
+
+    def _emit_wait(self, reservation: Reservation) -> None:
+        self.events.emit(
+            "rate_limit_wait", "debug",
+            f"Queued {reservation.delay:.1f}s for {reservation.model} capacity",
+            model=reservation.model, wait=reservation.delay
+        )
+
+    def _failure(self, error_type: str, message: str, **fields: Any) -> Dict[str, Any]:
+        """Build a failed call_api response"""
+        return {
+            "success": False,
+            "content": "",
+            "error": message,
+            "error_type": error_type,
+            **fields
+        }
+
+    def _settle_capacity(self, reservation: Optional[Reservation], result: Optional[Dict[str, Any]]) -> None:
+        """Refund reserved tokens that the request did not use"""
+        if self.rate_limiter and reservation:
+            used = result["usage"]["total_tokens"] if result else 0
+            self.rate_limiter.settle(reservation, used)
+
+    def _retry_decision(
+        self,
+        error: Exception,
+        attempt: int,
+        max_retries: int,
+        retry_delay: float,
+        model_name: str,
+        previous_wait: Optional[float] = None
+    ) -> Tuple[Optional[float], Optional[Dict[str, Any]]]:
+        """
+        Decide how to handle a failed attempt
+
+        Errors are classified by SDK exception type. Rate limits wait for
+        the server's Retry-After (or x-ratelimit-reset-*) hint; everything
+        retryable backs off with decorrelated jitter from `retry_delay`.
+        Timeouts, connection errors and 5xx count towards the model's
+        circuit breaker.
+
+        Returns:
+            (seconds to wait before retrying, failure response if giving up)
+        """
+        kind = classify(error)
+        self._record_unhealthy(model_name, kind)
+        self.metrics.inc("llm_upstream_errors_total", model=model_name, kind=kind)
+
+        if kind not in RETRYABLE:
+            if (getattr(error, "status_code", None) in (401, 403) and attempt < max_retries - 1
+                    and len(self.key_pool) > 1 and self.key_pool.has_headroom(model_name)):
+                # That key was taken out of rotation; another may work
+                self.metrics.inc("llm_retries_total", model=model_name, kind="key_rotation")
+                return 0.0, None
+            return None, self._failure("api_error", f"API error: {error}", **self._failed_generation(error))
+
+        hint = retry_after(error)
+        wait_time = None
+        if attempt < max_retries - 1:
+            wait_time = self.retry_policy.next_delay(retry_delay, previous_wait, hint)
+
+        if kind == "rate_limit":
+            if attempt < max_retries - 1 and len(self.key_pool) > 1 and self.key_pool.has_headroom(model_name):
+                # Another key still has quota: retry on it right away
+                self.metrics.inc("llm_retries_total", model=model_name, kind="key_rotation")
+                self.events.emit(
+                    "api_key_rotated", "debug", "Rate limit on one API key; retrying on another",
+                    model=model_name, attempt=attempt + 1
+                )
+                return 0.0, None
+            if wait_time is None:
+                return None, self._failure(
+                    "rate_limit", "⚠️ Groq API rate limit exceeded. Please wait a minute and try again.",
+                    retry_after=hint
+                )
+            if self.rate_limiter:
+                # Hold back every session on this model, not just this call
+                self.rate_limiter.penalize(model_name, wait_time)
+            self.metrics.inc("llm_retries_total", model=model_name, kind=kind)
+            self.events.emit(
+                "rate_limit_retry", "warning",
+                f"⏳ Rate limit hit. Waiting {wait_time:.0f}s before retry...",
+                model=model_name, attempt=attempt + 1, wait=wait_time, retry_after=hint
+            )
+            return wait_time, None
+
+        # Don't keep retrying into an outage once the breaker has tripped
+        if self.circuit_breaker and not self.circuit_breaker.available(model_name):
+            return None, self._unavailable(model_name)
+
+        if wait_time is None:
+            if kind == "timeout":
+                return None, self._failure("timeout", "API timeout. Please try again.")
+            return None, self._failure(
+                "server_error", f"⚠️ Groq is having trouble right now ({error}). Please try again shortly."
+            )
+
+        self.metrics.inc("llm_retries_total", model=model_name, kind=kind)
+        self.events.emit(
+            f"{kind}_retry", "debug", f"{kind.replace('_', ' ').capitalize()}. Retrying in {wait_time:.1f}s",
+            model=model_name, attempt=attempt + 1, wait=wait_time
+        )
+        return wait_time, None
+
+    def _cut_off_by_budget(self, error: Exception, sized: Dict[str, Any]) -> bool:
+        """
+        True if a 400 on sized params was caused by the tighter max_tokens
+
+        JSON mode rejects output cut off at max_tokens (json_validate_failed
+        with a failed_generation that isn't valid JSON and fills the budget).
+        Other 400s (bad response_format, context too long, a complete but
+        invalid object) fail unsized too, so they aren't refetched.
+        """
+        if not isinstance(error, BadRequestError):
+            return False
+        body = getattr(error, "body", None)
+        if isinstance(body, dict):
+            body = body.get("error", body)
+        body = body if isinstance(body, dict) else {}
+
+        message = str(body.get("message") or error).lower()
+        if "context" not in message and re.search(r"max_(?:completion_)?tokens|cut off|truncated", message):
+            return True
+
+        generation = body.get("failed_generation")
+        if body.get("code") != "json_validate_failed" or not generation:
+            return False
+        try:
+            json.loads(generation)
+            return False
+        except ValueError:
+            return self.estimate_tokens(generation) >= 0.8 * sized["max_tokens"]
+
+    @staticmethod
+    def _failed_generation(error: Exception) -> Dict[str, str]:
+        """The rejected output Groq returns with a json_validate_failed 400, if any"""
+        body = getattr(error, "body", None)
+        if isinstance(body, dict):
+            body = body.get("error", body)
+        generation = body.get("failed_generation") if isinstance(body, dict) else None
+        return {"failed_generation": generation} if generation else {}
+
+    def _check_circuit(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Failure response if the model's circuit is open, else None"""
+        if not self.circuit_breaker:
+            return None
+        allowed, _ = self.circuit_breaker.allow(model_name)
+        return None if allowed else self._unavailable(model_name)
+
+    def _unavailable(self, model_name: str) -> Dict[str, Any]:
+        return self._failure(
+            "unavailable",
+            f"⚠️ Groq ({model_name}) is temporarily unavailable. Please try again shortly.",
+            model=model_name
+        )
+
+    def _record_healthy(self, model_name: str) -> None:
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success(model_name)
+
+    def _release_probe(self, model_name: str) -> None:
+        """The attempt ended without a health verdict; let another probe through if this was one"""
+        if self.circuit_breaker:
+            self.circuit_breaker.release_probe(model_name)
+
+    def _record_unhealthy(self, model_name: str, kind: str) -> None:
+        """Feed a failure into the circuit breaker"""
+        if not self.circuit_breaker:
+            return
+        if kind not in UNHEALTHY:
+            # Not a health signal; let another probe through if this was one
+            self.circuit_breaker.release_probe(model_name)
+            return
+        if self.circuit_breaker.record_failure(model_name):
+            self.events.emit(
+                "circuit_open", "warning",
+                f"⚠️ Groq ({model_name}) looks unhealthy; pausing requests to it for a while.",
+                model=model_name
+            )
+
+    def model_available(self, model: str) -> bool:
+        """False while a model key's circuit breaker is open"""
+        if not self.circuit_breaker:
+            return True
+        return self.circuit_breaker.available(self.MODELS.get(model, self.default_model))
+
+    def _send(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make a single completion request
+
+        Returns:
+            {"content": str, "usage": dict, "finish_reason": str}
+        """
+        if self.cassette and self.cassette.replaying:
+            return self.cassette.replay(requested_params(params))
+
+        start = time.perf_counter()
+        api_key = self.key_pool.acquire(params["model"])
+        try:
+            raw = self._clients[api_key.key].chat.completions.with_raw_response.create(**params)
+            response = raw.parse()
+        except Exception as e:
+            self._release_key(api_key, params["model"], e)
+            raise
+        self.key_pool.observe(api_key, params["model"], raw.headers)
+        self._release_key(api_key, params["model"])
+        result = self._completion_result(response)
+
+        if self.cassette:
+            self.cassette.record(requested_params(params), result, time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    def _completion_result(response) -> Dict[str, Any]:
+        """Reduce an SDK ChatCompletion to the dict _send returns"""
+        return {
+            "content": response.choices[0].message.content,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            },
+            "finish_reason": response.choices[0].finish_reason
+        }
+
+    def _send_stream(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Make a single streaming completion request
+
+        Yields:
+            {"delta": str} for each text chunk, then a final
+            {"usage": dict or None, "finish_reason": str}
+        """
+        if self.cassette and self.cassette.replaying:
+            yield from self.cassette.replay_stream(requested_params(params))
+            return
+
+        if not self.cassette:
+            yield from self._open_stream(params)
+            return
+
+        start = time.perf_counter()
+        ttft = None
+        parts = []
+        for event in self._open_stream(params):
+            if "delta" in event:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(event["delta"])
+            else:
+                content = "".join(parts)
+                usage = event["usage"] or {
+                    "prompt_tokens": 0,
+                    "completion_tokens": self.estimate_tokens(content),
+                    "total_tokens": self.estimate_tokens(content)
+                }
+                self.cassette.record(
+                    requested_params(params),
+                    {"content": content, "usage": usage, "finish_reason": event["finish_reason"]},
+                    time.perf_counter() - start,
+                    ttft=ttft
+                )
+            yield event
+
+    def _open_stream(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Stream events straight from the API"""
+        api_key = self.key_pool.acquire(params["model"])
+        try:
+            raw = self._clients[api_key.key].chat.completions.with_raw_response.create(**params, stream=True)
+            stream = raw.parse()
+        except Exception as e:
+            self._release_key(api_key, params["model"], e)
+            raise
+        self.key_pool.observe(api_key, params["model"], raw.headers)
+
+        usage = None
+        finish_reason = None
+        try:
+            for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                    usage = {
+                        "prompt_tokens": x_groq.usage.prompt_tokens,
+                        "completion_tokens": x_groq.usage.completion_tokens,
+                        "total_tokens": x_groq.usage.total_tokens
+                    }
+
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                if choice.delta and choice.delta.content:
+                    yield {"delta": choice.delta.content}
+        finally:
+            # Release the connection even if the consumer stops early
+            stream.close()
+            self._release_key(api_key, params["model"])
+
+        yield {"usage": usage, "finish_reason": finish_reason}
+
+    async def _asend(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of _send"""
+        if self.cassette and self.cassette.replaying:
+            return await self.cassette.areplay(requested_params(params))
+
+        start = time.perf_counter()
+        api_key = self.key_pool.acquire(params["model"])
+        try:
+            raw = await self._get_async_client(api_key.key).chat.completions.with_raw_response.create(**params)
+            response = await raw.parse()
+        except BaseException as e:
+            # Also cancellation (a hedge race lost): the key is no longer in flight
+            self._release_key(api_key, params["model"], e if isinstance(e, Exception) else None)
+            raise
+        self.key_pool.observe(api_key, params["model"], raw.headers)
+        self._release_key(api_key, params["model"])
+        result = self._completion_result(response)
+
+        if self.cassette:
+            self.cassette.record(requested_params(params), result, time.perf_counter() - start)
+        return result
 
-    def __init__(self):
-        """Initialize Groq client"""
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("Missing GROQ_API_KEY. Check .env file.")
+    def _hedge_key(self, params: Dict[str, Any], task: Optional[str]) -> str:
+        return f"{task or 'default'}:{params['model']}"
 
-        self.client = Groq(api_key=api_key)
-        self.default_model = self.MODELS["8b"]  # Fast by default
+    def _backup_params(self, params: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Reservation]]:
+        """
+        Params and reserved capacity for a backup request
 
-    def call_api(
-        self,
-        system_prompt: str,
-        user_prompt: str,
-        model: str = "8b",
-        temperature: float = 0.3,
-        max_tokens: int = 2048,
-        response_format: Optional[Dict] = None,
-        max_retries: int = 3,
-        retry_delay: float = 2.0  # Increased from 1.0 to 2.0 seconds
-    ) -> Dict[str, Any]:
+        Returns (None, None) if the hedge budget is spent or the backup
+        would have to queue for rate-limit capacity.
         """
-        Call Groq API with retry logic
+        backup = with_model(params, self.hedger.backup_model(params["model"]))
+        reservation, failure = self._reserve_capacity(backup)
+        if failure:
+            return None, None
+        if reservation and reservation.delay:
+            self.rate_limiter.cancel(reservation)
+            return None, None
+        if not self.hedger.try_hedge():
+            if reservation:
+                self.rate_limiter.cancel(reservation)
+            return None, None
+        return backup, reservation
 
-        Args:
-            system_prompt: System instructions
-            user_prompt: User input
-            model: Model key ('8b', '70b', or 'mixtral')
-            temperature: Sampling temperature (0-2)
-            max_tokens: Maximum tokens in response
-            response_format: Force JSON output if {"type": "json_object"}
-            max_retries: Number of retry attempts
-            retry_delay: Delay between retries (seconds)
+    def _emit_hedge(self, params: Dict[str, Any], backup: Dict[str, Any], delay: float, task: Optional[str]) -> None:
+        self.record_fallback("hedge", task)
+        self.events.emit(
+            "hedge_fired", "debug",
+            f"No response from {params['model']} after {delay:.1f}s; sending backup to {backup['model']}",
+            task=task, model=params["model"], backup_model=backup["model"], wait=delay
+        )
 
-        Returns:
-            {
-                "success": bool,
-                "content": str,  # Response text
-                "usage": dict,   # Token usage stats
-                "error": str     # Error message if failed
-            }
+    def _send_hedged(self, params: Dict[str, Any], task: Optional[str]) -> Dict[str, Any]:
         """
-        model_name = self.MODELS.get(model, self.default_model)
+        _send with hedging
 
-        for attempt in range(max_retries):
-            try:
-                # Prepare messages
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-
-                # API call parameters
-                params = {
-                    "model": model_name,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                }
+        Once the task has latency history, the race runs on a background
+        event loop so the losing request can actually be cancelled.
+        """
+        if not self.hedger:
+            return self._send(params)
 
-                # Add JSON format if requested
-                if response_format:
-                    params["response_format"] = response_format
+        key = self._hedge_key(params, task)
+        delay = self.hedger.delay_for(key)
+        if delay is None:
+            start = time.perf_counter()
+            result = self._send(params)
+            self.hedger.observe(key, time.perf_counter() - start)
+            return result
 
-                # Make API call
-                response = self.client.chat.completions.create(**params)
+        race = self._race(params, key, delay, task)
+        return asyncio.run_coroutine_threadsafe(race, self._get_hedge_loop()).result()
 
-                # Extract response
-                content = response.choices[0].message.content
-                usage = {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
+    async def _asend_hedged(self, params: Dict[str, Any], task: Optional[str]) -> Dict[str, Any]:
+        """Async version of _send_hedged"""
+        if not self.hedger:
+            return await self._asend(params)
 
-                return {
-                    "success": True,
-                    "content": content,
-                    "usage": usage
-                }
+        key = self._hedge_key(params, task)
+        delay = self.hedger.delay_for(key)
+        if delay is None:
+            start = time.perf_counter()
+            result = await self._asend(params)
+            self.hedger.observe(key, time.perf_counter() - start)
+            return result
 
-            except Exception as e:
-                error_msg = str(e)
+        return await self._race(params, key, delay, task)
 
-                # Check for rate limit
-                if "rate_limit" in error_msg.lower() or "429" in error_msg:
-                    if attempt < max_retries - 1:
-                        # Exponential backoff with longer delays for rate limits
-                        wait_time = retry_delay * (3 ** attempt)  # More aggressive backoff
-                        st.warning(f"⏳ Rate limit hit. Waiting {wait_time:.0f}s before retry...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        return {
-                            "success": False,
-                            "content": "",
-                            "error": "⚠️ Groq API rate limit exceeded. Please wait a minute and try again."
-                        }
-
-                # Check for timeout
-                elif "timeout" in error_msg.lower():
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        continue
-                    else:
-                        return {
-                            "success": False,
-                            "content": "",
-                            "error": "API timeout. Please try again."
-                        }
-
-                # Other errors
-                else:
-                    return {
-                        "success": False,
-                        "content": "",
-                        "error": f"API error: {error_msg}"
-                    }
+    async def _race(self, params: Dict[str, Any], key: str, delay: float, task: Optional[str]) -> Dict[str, Any]:
+        """Send `params`; if it takes longer than `delay`, race a backup and cancel the loser"""
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self._asend(params))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
 
-        return {
-            "success": False,
-            "content": "",
-            "error": "Max retries exceeded"
-        }
+        backup_params, reservation = (None, None) if done else self._backup_params(params)
+        if backup_params is None:
+            result = await primary
+            self.hedger.observe(key, time.perf_counter() - start)
+            return result
+
+        self._emit_hedge(params, backup_params, delay, task)
+        backup = asyncio.ensure_future(self._asend(backup_params))
+
+        pending = {primary, backup}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for contender in done:
+                    if contender.exception() is None and winner is None:
+                        winner = contender
+        finally:
+            for contender in pending:
+                contender.cancel()
+
+        if reservation:
+            # A cancelled backup may still have been billed, so only refund a winner
+            if winner is backup:
+                self._settle_capacity(reservation, backup.result())
+            else:
+                self.rate_limiter.settle(reservation, reservation.tokens)
+
+        if winner is None:
+            raise primary.exception() or backup.exception()
+
+        self.hedger.record_winner(winner is backup)
+        self.hedger.observe(key, time.perf_counter() - start)
+        return winner.result()
+
+    def _send_stream_hedged(self, params: Dict[str, Any], task: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """_send_stream with hedging on time to first token"""
+        if not self.hedger:
+            yield from self._send_stream(params)
+            return
+
+        key = self._hedge_key(params, task) + ":ttft"
+        delay = self.hedger.delay_for(key)
+        start = time.perf_counter()
+
+        if delay is None:
+            first = True
+            for event in self._send_stream(params):
+                if first:
+                    self.hedger.observe(key, time.perf_counter() - start)
+                    first = False
+                yield event
+            return
+
+        yield from self._race_stream(params, key, delay, task, start)
+
+    def _race_stream(
+        self,
+        params: Dict[str, Any],
+        key: str,
+        delay: float,
+        task: Optional[str],
+        start: float
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream `params`; if no token arrives within `delay`, open a backup
+        stream and keep whichever produces output first
+
+        Each stream is pumped by a thread into a shared queue; the loser is
+        told to stop and closes its connection at its next chunk.
+        """
+        events = queue.Queue()
+        stops = []
+
+        def pump(index: int, stream_params: Dict[str, Any]) -> None:
+            stop = threading.Event()
+            stops.append(stop)
+
+            def run():
+                stream = self._send_stream(stream_params)
+                try:
+                    for event in stream:
+                        if stop.is_set():
+                            break
+                        events.put((index, event, None))
+                    events.put((index, None, None))
+                except Exception as e:
+                    events.put((index, None, e))
+                finally:
+                    stream.close()
+
+            threading.Thread(target=run, name=f"groq-hedge-stream-{index}", daemon=True).start()
+
+        pump(0, params)
+        live = {0}
+        errors = {}
+        hedged = False
+        winner = None
+        first_event = None
+
+        try:
+            while winner is None:
+                timeout = None if hedged else max(0.0, start + delay - time.perf_counter())
+                try:
+                    index, event, error = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedged = True
+                    backup_params, reservation = self._backup_params(params)
+                    if backup_params:
+                        if reservation:
+                            # Streams can't be cancelled server-side; keep the backup's reservation
+                            self.rate_limiter.settle(reservation, reservation.tokens)
+                        self._emit_hedge(params, backup_params, delay, task)
+                        pump(1, backup_params)
+                        live.add(1)
+                    continue
+
+                if event is None:
+                    # A contender ended before producing anything
+                    if error is not None:
+                        errors[index] = error
+                    live.discard(index)
+                    if not live:
+                        if errors:
+                            raise errors.get(0) or errors.get(1)
+                        return
+                    continue
+
+                winner, first_event = index, event
+
+            for index, stop in enumerate(stops):
+                if index != winner:
+                    stop.set()
+            self.hedger.record_winner(winner == 1)
+            self.hedger.observe(key, time.perf_counter() - start)
+
+            yield first_event
+            while True:
+                index, event, error = events.get()
+                if index != winner:
+                    continue
+                if error is not None:
+                    raise error
+                if event is None:
+                    return
+                yield event
+        finally:
+            for stop in stops:
+                stop.set()
+
+    def _get_hedge_loop(self) -> asyncio.AbstractEventLoop:
+        """Background event loop that runs hedged races for sync callers"""
+        with self._hedge_loop_lock:
+            if self._hedge_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="groq-hedge", daemon=True).start()
+                self._hedge_loop = loop
+            return self._hedge_loop
+
+    def _get_async_client(self, api_key: str) -> AsyncGroq:
+        """
+        Get the AsyncGroq client for `api_key` on the running event loop
+
+        httpx async connections are bound to the loop that opened them, and
+        Streamlit reruns create a fresh loop per asyncio.run(), so keep one
+        client per key per loop; aclose() releases them.
+        """
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = clients[api_key] = AsyncGroq(api_key=api_key, **self._client_options)
+        return client
+
+    async def aclose(self) -> None:
+        """
+        Close the AsyncGroq clients of the running event loop
+
+        run_concurrently does this itself; code that drives acall_api with
+        its own asyncio.run() should await it before the loop ends, or the
+        loop's pooled connections are never closed.
+        """
+        clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        await asyncio.gather(*(client.close() for client in clients.values()), return_exceptions=True)
+
+    def _release_key(self, api_key: APIKey, model: str, error: Optional[Exception] = None) -> None:
+        """Return a key to the pool, reporting it if the error took it out of rotation"""
+        change = self.key_pool.release(api_key, model, error)
+        if change == "disabled":
+            self.events.emit(
+                "api_key_disabled", "warning",
+                f"Groq API key {api_key.name} was rejected ({api_key.last_error}); it will not be used again",
+                key=api_key.name
+            )
+        elif change == "quarantined":
+            self.events.emit(
+                "api_key_quarantined", "warning",
+                f"Groq API key {api_key.name} keeps hitting rate limits on {model}; skipping it for that model for a while",
+                key=api_key.name, model=model
+            )
 
     def parse_json_response(self, response: Dict[str, Any]) -> Optional[Dict]:
         """
@@ -154,9 +1795,8 @@ class GroqClient:
         if not response.get("success"):
             return None
 
+        content = response["content"]
         try:
-            content = response["content"]
-
             # Try direct JSON parse
             try:
                 return json.loads(content)
@@ -174,8 +1814,33 @@ class GroqClient:
                     return json.loads(cleaned)
 
         except Exception as e:
-            st.error(f"Failed to parse JSON response: {e}")
-            return None
+            data = self._repair(content)
+            if data is None:
+                self.events.emit("json_parse_error", "error", f"Failed to parse JSON response: {e}")
+            return data
+
+    def _repair(self, content: str) -> Optional[Any]:
+        """
+        Run repair_json on a response that failed to parse
+
+        Returns the recovered dict/list, or None; every success is a
+        re-run of the whole LLM call that the user didn't have to make.
+        """
+        data, fixes = repair_json(content)
+        if not isinstance(data, (dict, list)):
+            data = None
+
+        with self._repair_lock:
+            self._repair_counts["attempted"] += 1
+            if data is not None:
+                self._repair_counts["repaired"] += 1
+                for fix in fixes:
+                    self._repair_counts["fixes"][fix] = self._repair_counts["fixes"].get(fix, 0) + 1
+
+        if data is not None:
+            self.record_fallback("json_repair")
+            self.events.emit("json_repaired", "debug", f"Repaired JSON response ({', '.join(fixes)})", fixes=fixes)
+        return data
 
     def call_api_json(
         self,
@@ -184,7 +1849,9 @@ class GroqClient:
         model: str = "8b",
         temperature: float = 0.3,
         max_tokens: int = 2048,
-        max_retries: int = 3
+        max_retries: int = 3,
+        task: Optional[str] = None,
+        use_cache: bool = True
     ) -> Optional[Dict]:
         """
         Call API and parse JSON response
@@ -199,22 +1866,340 @@ class GroqClient:
             temperature=temperature,
             max_tokens=max_tokens,
             response_format={"type": "json_object"},
-            max_retries=max_retries
+            max_retries=max_retries,
+            task=task,
+            use_cache=use_cache
+        )
+
+        return self._json_result(response)["data"]
+
+    async def acall_api_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "8b",
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        max_retries: int = 3,
+        task: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Optional[Dict]:
+        """
+        Async counterpart of call_api_json
+
+        Returns:
+            Parsed JSON dict or None if failed
+        """
+        response = await self.acall_api(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            max_retries=max_retries,
+            task=task,
+            use_cache=use_cache
+        )
+
+        return self._json_result(response)["data"]
+
+    def call_api_json_result(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "8b",
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        max_retries: int = 3,
+        task: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Call API and parse JSON, returning a structured result
+
+        Returns:
+            call_api's response dict plus "data" (parsed JSON or None);
+            "success" is False and "error_type" is "json_parse" if the
+            call worked but its content was not valid JSON
+        """
+        response = self.call_api(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            max_retries=max_retries,
+            task=task,
+            use_cache=use_cache
         )
 
+        return self._json_result(response)
+
+    def _json_result(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach parsed JSON to a call_api response"""
+        if not response.get("success") and response.get("failed_generation"):
+            # JSON mode rejected the output (e.g. cut off at max_tokens); salvage it
+            data = self._repair(response["failed_generation"])
+            if data is not None:
+                return {
+                    "success": True,
+                    "content": json.dumps(data),
+                    "usage": response.get("usage"),
+                    "cached": False,
+                    "repaired": True,
+                    "data": data
+                }
+
         if not response.get("success"):
-            st.error(f"API call failed: {response.get('error')}")
-            return None
+            self.events.emit(
+                "api_error", "error", f"API call failed: {response.get('error')}",
+                error_type=response.get("error_type")
+            )
+            return {**response, "data": None}
 
-        return self.parse_json_response(response)
+        data = self.parse_json_response(response)
+        if data is None:
+            return {
+                **response,
+                "success": False,
+                "data": None,
+                "error": "Failed to parse JSON response",
+                "error_type": "json_parse"
+            }
+        return {**response, "data": data}
 
-    def estimate_tokens(self, text: str) -> int:
+    def call_api_structured(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: type,
+        model: str = "8b",
+        temperature: float = 0.3,
+        max_tokens: int = 2048,
+        max_retries: int = 3,
+        task: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Call the API for a JSON object matching a Pydantic schema
+
+        The schema is sent to the model as an extra system message and the
+        response is streamed through an IncrementalJSONParser, so output
+        that goes off the rails (prose instead of JSON, text where a number
+        belongs) is cut off right there instead of being paid for in full.
+        With model cascading enabled, diverging or invalid output escalates
+        to the next model as in call_api_routed.
+
+        Args:
+            schema: Pydantic model the object must satisfy
+
+        Returns:
+            call_api's response dict plus "data" (parsed object, extra keys
+            kept), "parsed" (validated schema instance or None), "model",
+            "escalations" and "validation_error" if the object is well-formed
+            but fails the schema; "error_type" is "schema_mismatch" if the
+            output diverged and was aborted
         """
-        Estimate token count (rough approximation)
+        models = self.router.route(task, model) if self.router else [model]
+        escalations = []
+
+        for index, key in enumerate(models):
+            response, error = self._structured_attempt(
+                system_prompt, user_prompt, schema, key, temperature, max_tokens, max_retries, task, use_cache
+            )
+            if self.router:
+                self.router.record(task, key, error)
+
+            if error is None or index == len(models) - 1 or response.get("error_type") == "quota_exceeded":
+                break
+            escalations.append({"model": key, "reason": error})
+            self._emit_escalation(task, key, models[index + 1], error)
+
+        return self._routed_response(response, key, escalations, error)
+
+    def _structured_attempt(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: type,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        max_retries: int,
+        task: Optional[str],
+        use_cache: bool
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """One model's structured call; returns (response, error or None)"""
+        params = self._build_params(
+            system_prompt, user_prompt, model, temperature, max_tokens, {"type": "json_object"}
+        )
+        params["messages"].insert(1, {"role": "system", "content": schema_instructions(schema)})
+        parser = IncrementalJSONParser(schema)
+
+        cache_key, cached = self._cache_lookup(make_cache_key(**params), params, task, use_cache)
+        if cached is not None:
+            self.events.emit("cache_hit", "debug", "Served from response cache", task=task, model=params["model"])
+            self._observe_call(task, params, time.perf_counter(), cached)
+            parser.feed(cached["content"])
+            data, parsed, error = parser.result()
+            if data is not None:
+                return {**cached, "data": data, "parsed": parsed}, error
+
+        stream = CompletionStream(self, params, task, max_retries, 2.0)
+        for delta in stream:
+            if parser.feed(delta):
+                stream.close(parser.error)
+                break
+
+        if stream.aborted:
+            self._record_structured(task, params, schema, stream.usage, aborted=True)
+            self.record_fallback("schema_abort", task)
+            self.events.emit(
+                "schema_abort", "debug",
+                f"Stopped {params['model']} after {stream.usage['completion_tokens']} tokens: {parser.error}",
+                task=task, model=params["model"], reason=parser.error
+            )
+            failure = self._failure(
+                "schema_mismatch", f"Response diverged from {schema.__name__}: {parser.error}",
+                usage=stream.usage
+            )
+            return {**failure, "data": None, "parsed": None}, parser.error
+
+        if stream.success:
+            data, parsed, error = parser.result()
+            content = stream.content
+        elif stream.failed_generation:
+            # JSON mode rejected the output (e.g. cut off at max_tokens)
+            data, content = None, stream.failed_generation
+        else:
+            failure = self._failure(stream.error_type or "api_error", stream.error or "Request failed")
+            self.events.emit(
+                "api_error", "error", f"API call failed: {failure['error']}", error_type=failure["error_type"]
+            )
+            return {**failure, "data": None, "parsed": None}, failure["error"]
+
+        usage = stream.usage or stream._estimate_usage(params, content)
+        self._record_structured(task, params, schema, usage, aborted=False)
 
-        Rule of thumb: ~4 characters = 1 token for English text
+        if data is not None:
+            response = self._success_response({"content": content, "usage": usage}, cache_key)
+        else:
+            data = self._repair(content)
+            if not isinstance(data, dict):
+                self.events.emit("json_parse_error", "error", "Failed to parse JSON response")
+                failure = self._failure("json_parse", "Failed to parse JSON response", usage=usage)
+                return {**failure, "data": None, "parsed": None}, failure["error"]
+            # Salvaged output is not cached, so the next identical call gets a fresh answer
+            parsed, error = validate_schema(schema, data)
+            response = {"success": True, "content": json.dumps(data), "usage": usage, "cached": False, "repaired": True}
+
+        if parser.warnings:
+            response = {**response, "field_warnings": dict(parser.warnings)}
+        return {**response, "data": data, "parsed": parsed}, error
+
+    def _record_structured(
+        self,
+        task: Optional[str],
+        params: Dict[str, Any],
+        schema: type,
+        usage: Dict[str, int],
+        aborted: bool
+    ) -> None:
+        self.structured_outcomes.append({
+            "task": task,
+            "model": params["model"],
+            "schema": schema.__name__,
+            "aborted": aborted,
+            "completion_tokens": usage["completion_tokens"],
+            "max_tokens": params["max_tokens"]
+        })
+
+    def estimate_tokens(self, text: str) -> int:
+        """Offline token estimate (see utils/token_estimate.py)"""
+        return estimate_token_count(text)
+
+    def token_calibration_stats(self) -> Dict[str, Any]:
+        """Offline vs. reported prompt token ratios and the safety factor in use"""
+        return self.token_calibration.stats()
+
+    def rate_limit_headroom(self, model: str = "8b") -> Optional[Dict[str, float]]:
+        """Available requests/tokens for a model key (None if limiting is disabled)"""
+        if not self.rate_limiter:
+            return None
+        return self.rate_limiter.headroom(self.MODELS.get(model, self.default_model))
+
+    def coalescing_stats(self) -> Optional[Dict[str, Any]]:
+        """How many calls were coalesced onto an identical in-flight call"""
+        return self.single_flight.stats() if self.single_flight else None
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Response cache hit/miss counters (None if caching is disabled)"""
+        return self.cache.stats() if self.cache else None
+
+    def circuit_stats(self) -> Optional[Dict[str, Any]]:
+        """Circuit breaker state per model (None if GROQ_CIRCUIT_BREAKER is off)"""
+        return self.circuit_breaker.stats() if self.circuit_breaker else None
+
+    def hedging_stats(self) -> Optional[Dict[str, Any]]:
+        """Hedge rate, backup wins and latency thresholds (None unless GROQ_HEDGE_ENABLED is set)"""
+        return self.hedger.stats() if self.hedger else None
+
+    def scheduler_stats(self) -> Optional[Dict[str, Any]]:
+        """Slots, queue depth and wait per priority class (None if GROQ_SCHEDULER_ENABLED is off)"""
+        return self.scheduler.stats() if self.scheduler else None
+
+    def usage_stats(self, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
-        return len(text) // 4
+        Budgets, rejections and today's heaviest users, or one user's usage
+        (None if GROQ_USAGE_TRACKING is off)
+        """
+        if not self.usage_tracker:
+            return None
+        return self.usage_tracker.usage(user_id) if user_id else self.usage_tracker.stats()
+
+    def key_pool_stats(self) -> Dict[str, Any]:
+        """Quota headroom, state and 429 counts per API key"""
+        return self.key_pool.stats()
+
+    def routing_stats(self) -> Optional[Dict[str, Any]]:
+        """Per-task cascade escalation rates (None unless GROQ_MODEL_CASCADE is set)"""
+        return self.router.stats() if self.router else None
+
+    def max_tokens_stats(self) -> Dict[str, Any]:
+        """Observed completion lengths and adaptive sizing savings per task"""
+        return self.sizer.stats()
+
+    def json_repair_stats(self) -> Dict[str, Any]:
+        """Malformed JSON responses repaired (= LLM re-calls saved) and the fixes that did it"""
+        with self._repair_lock:
+            counts = self._repair_counts
+            return {
+                "attempted": counts["attempted"],
+                "repaired": counts["repaired"],
+                "recalls_saved": counts["repaired"],
+                "repair_rate": counts["repaired"] / counts["attempted"] if counts["attempted"] else 0.0,
+                "fixes": dict(counts["fixes"])
+            }
+
+    def structured_stats(self) -> Dict[str, Any]:
+        """Abort rate of recent schema-constrained calls and the token budget it left unspent"""
+        outcomes = list(self.structured_outcomes)
+        aborted = [outcome for outcome in outcomes if outcome["aborted"]]
+        return {
+            "calls": len(outcomes),
+            "aborted": len(aborted),
+            "abort_rate": len(aborted) / len(outcomes) if outcomes else 0.0,
+            "tokens_before_abort": sum(outcome["completion_tokens"] for outcome in aborted),
+            "budget_unspent": sum(
+                max(0, outcome["max_tokens"] - outcome["completion_tokens"]) for outcome in aborted
+            )
+        }
+
+    def cassette_stats(self) -> Optional[Dict[str, Any]]:
+        """Record/replay counters (None unless GROQ_CASSETTE_MODE is set)"""
+        return self.cassette.stats() if self.cassette else None
 
     def check_token_limit(self, text: str, max_tokens: int = 32000) -> bool:
         """Check if text is within token limit"""
@@ -222,14 +2207,277 @@ class GroqClient:
         return estimated < max_tokens
 
     def truncate_to_token_limit(self, text: str, max_tokens: int = 32000) -> str:
-        """Truncate text to fit within token limit"""
-        estimated = self.estimate_tokens(text)
-        if estimated <= max_tokens:
-            return text
+        """Truncate text at a line boundary to fit within token limit"""
+        return assemble([Section("text", text)], max_tokens)["text"]
+
+
+class CompletionStream:
+    """Iterable of text deltas from a streaming completion"""
+
+    def __init__(
+        self,
+        client: GroqClient,
+        params: Dict[str, Any],
+        task: Optional[str],
+        max_retries: int,
+        retry_delay: float,
+        model_key: Optional[str] = None,
+        validator: Optional[Validator] = None
+    ):
+        self._client = client
+        self._model_key = model_key
+        self._validator = validator
+        self._requested = params
+        # A cut-off JSON object can't be continued, so JSON streams keep their budget
+        self._params = params if "response_format" in params else client._size_params(params, task)
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._parts: List[str] = []
+        self._iterator: Optional[Iterator[str]] = None
+        self._started = False
+        self._finished = False
+        self.aborted = False
+
+        self.task = task
+        self.model = params["model"]
+        self.usage: Optional[Dict[str, int]] = None
+        self.finish_reason: Optional[str] = None
+        self.error: Optional[str] = None
+        self.error_type: Optional[str] = None
+        self.failed_generation: Optional[str] = None  # Output rejected by JSON mode, if any
+        self.ttft: Optional[float] = None  # Seconds until first token (incl. queueing)
+        self.duration: Optional[float] = None
+        self.tokens_per_second: Optional[float] = None
+        self._usage_hold: Optional[UsageHold] = None
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def success(self) -> bool:
+        return self._finished and self.error is None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._started:
+            raise RuntimeError("CompletionStream can only be iterated once")
+        self._started = True
+        self._iterator = self._observed()
+        return self._iterator
+
+    def close(self, reason: str) -> None:
+        """
+        Stop a stream mid-generation (e.g. its output has diverged from the
+        expected schema); the upstream request is closed and no more tokens
+        are paid for
+        """
+        if self._iterator is None or self._finished:
+            return
+        self.aborted = True
+        self.error = reason
+        self._iterator.close()
+
+    def _observed(self) -> Iterator[str]:
+        """_generate, recording the call in the client's metrics however it ends"""
+        start = time.perf_counter()
+        try:
+            yield from self._generate()
+        finally:
+            if self.aborted:
+                outcome = "aborted"
+            elif self.success:
+                outcome = "success"
+            else:
+                outcome = self.error_type or "api_error"
+            labels = {"task": self.task or "", "model": self.model}
+            metrics = self._client.metrics
+            metrics.inc("llm_requests_total", outcome=outcome, **labels)
+            metrics.observe("llm_request_duration_seconds", time.perf_counter() - start, **labels)
+            if self.ttft is not None:
+                metrics.observe("llm_ttft_seconds", self.ttft, **labels)
+            if self.usage:
+                self._client._observe_tokens(labels, self.usage)
+            self._client._settle_usage(self._usage_hold, {"usage": self.usage})
+
+    def _fail(self, failure: Dict[str, Any]) -> None:
+        self.error = failure["error"]
+        self.error_type = failure["error_type"]
+        self.failed_generation = failure.get("failed_generation")
+
+    def _estimate_usage(self, params: Dict[str, Any], content: str) -> Dict[str, int]:
+        """Token usage for a stream that ended without a usage chunk"""
+        completion_tokens = self._client.estimate_tokens(content)
+        prompt_tokens = self._client.estimate_tokens(
+            "".join(message["content"] for message in params["messages"])
+        )
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    def _generate(self) -> Iterator[str]:
+        client = self._client
+        start = time.monotonic()
+        first_token_at = None
+        wait_time = None
+
+        self._usage_hold, failure = client._reserve_usage(self._params, self.task)
+        if failure:
+            self._fail(failure)
+            return
+
+        for attempt in range(self._max_retries):
+            failure = client._check_circuit(self.model)
+            if failure:
+                self._fail(failure)
+                return
+            # Hand back a half-open probe if the attempt ends without a verdict
+            judged = False
+            try:
+                ticket, failure = client._admit(self._params, self.task)
+                if failure:
+                    self._fail(failure)
+                    return
+                reservation, failure = client._reserve_capacity(self._params)
+                if failure:
+                    client._release(ticket)
+                    self._fail(failure)
+                    return
+                if reservation and reservation.delay:
+                    time.sleep(reservation.delay)
 
-        # Truncate with buffer
-        target_chars = max_tokens * 4 * 0.9  # 90% of limit for safety
-        return text[:int(target_chars)] + "\n\n[Text truncated due to length]"
+                events = client._send_stream_hedged(self._params, self.task)
+                try:
+                    for event in events:
+                        if "delta" in event:
+                            if first_token_at is None:
+                                first_token_at = time.monotonic()
+                                self.ttft = first_token_at - start
+                            self._parts.append(event["delta"])
+                            yield event["delta"]
+                        else:
+                            self.usage = event["usage"]
+                            self.finish_reason = event["finish_reason"]
+                except GeneratorExit:
+                    # Closed by the consumer: hang up and pay only for what was streamed
+                    events.close()
+                    client._release(ticket)
+                    self.usage = self._estimate_usage(self._params, self.content)
+                    client._record_healthy(self.model)
+                    judged = True
+                    client._settle_capacity(reservation, {"usage": self.usage})
+                    self.duration = time.monotonic() - start
+                    raise
+                except Exception as e:
+                    client._release(ticket)
+                    client._settle_capacity(reservation, None)
+                    if self._parts:
+                        # Text has already been shown; a retry would duplicate it
+                        self.error = f"Stream interrupted: {e}"
+                        self.error_type = "api_error"
+                        client.events.emit("stream_error", "error", self.error, model=self.model, task=self.task)
+                        return
+                    judged = True
+                    wait_time, failure = client._retry_decision(
+                        e, attempt, self._max_retries, self._retry_delay, self.model, wait_time
+                    )
+                    if failure:
+                        self._fail(failure)
+                        return
+                    time.sleep(wait_time)
+                    continue
+
+                client._release(ticket)
+                if self.usage is None:
+                    self.usage = self._estimate_usage(self._params, self.content)
+                else:
+                    client._calibrate(self._params, self.usage)
+                client._record_healthy(self.model)
+                judged = True
+                client._settle_capacity(reservation, {"usage": self.usage})
+                if self._params is not self._requested and self.finish_reason == "length":
+                    yield from self._continue()
+                client.sizer.observe(client._size_key(self._params, self.task), self.usage["completion_tokens"])
+                self._finish(start, first_token_at)
+                return
+            finally:
+                if not judged:
+                    client._release_probe(self.model)
+
+        self.error = "Max retries exceeded"
+        self.error_type = "max_retries"
+        client.events.emit("stream_error", "debug", self.error, model=self.model, task=self.task)
+
+    def _continue(self) -> Iterator[str]:
+        """Stream the rest of a response cut off by a sized budget"""
+        client = self._client
+        follow_up = client._follow_up_params(
+            self._requested, {"content": self.content, "usage": self.usage}
+        )
+        if follow_up is None:
+            return
+        client.sizer.record_continuation(client._size_key(self._params, self.task))
+
+        reservation, failure = client._reserve_capacity(follow_up)
+        if failure:
+            return
+        if reservation and reservation.delay:
+            time.sleep(reservation.delay)
+
+        start_length = len(self.content)
+        usage = None
+        try:
+            for event in client._send_stream(follow_up):
+                if "delta" in event:
+                    self._parts.append(event["delta"])
+                    yield event["delta"]
+                else:
+                    usage = event["usage"]
+                    self.finish_reason = event["finish_reason"]
+        except Exception as e:
+            client._settle_capacity(reservation, None)
+            client.events.emit(
+                "continuation_error", "debug", f"Could not complete truncated response: {e}",
+                model=self.model, task=self.task
+            )
+            return
+
+        if usage is None:
+            usage = self._estimate_usage(follow_up, self.content[start_length:])
+        client._settle_capacity(reservation, {"usage": usage})
+        self.usage = {key: self.usage[key] + usage[key] for key in self.usage}
+
+    def _finish(self, start: float, first_token_at: Optional[float]) -> None:
+        end = time.monotonic()
+        self._finished = True
+        self.duration = end - start
+
+        router = self._client.router
+        if router and self._model_key:
+            error = None
+            if self.finish_reason == "length":
+                error = "Response cut off at max_tokens"
+            elif self._validator:
+                error = self._validator(self.content)
+            router.record(self.task, self._model_key, error)
+
+        generation_time = end - (first_token_at or start)
+        if generation_time > 0:
+            self.tokens_per_second = self.usage["completion_tokens"] / generation_time
+
+        self._client.stream_stats.append(self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        """Timing summary for this call"""
+        return {
+            "task": self.task,
+            "model": self.model,
+            "ttft": self.ttft,
+            "duration": self.duration,
+            "tokens_per_second": self.tokens_per_second,
+            "completion_tokens": (self.usage or {}).get("completion_tokens")
+        }
 
 
 # Singleton instance
@@ -259,16 +2507,58 @@ def quick_generate_text(system_prompt: str, user_prompt: str, model: str = "8b")
     if response.get("success"):
         return response["content"]
     else:
-        st.error(f"Generation failed: {response.get('error')}")
+        client.events.emit("api_error", "error", f"Generation failed: {response.get('error')}")
         return None
 
 
-def stream_response(system_prompt: str, user_prompt: str, model: str = "70b"):
+def run_concurrently(*calls: Awaitable) -> List[Any]:
+    """
+    Run several async LLM calls together and return their results in order
+
+    Meant for the Streamlit script thread, e.g.:
+        formal, friendly = run_concurrently(
+            client.acall_api(FORMAL_PROMPT, profile, model="70b"),
+            client.acall_api(FRIENDLY_PROMPT, profile, model="70b"),
+        )
+    """
+    async def _gather():
+        try:
+            return await asyncio.gather(*calls)
+        finally:
+            # The loop ends with this coroutine; close the connections opened on it
+            await asyncio.gather(*(client.aclose() for client in list(_live_clients)))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_gather())
+
+    # Already inside an event loop (e.g. a notebook): run on a helper thread
+    outcome = {}
+
+    def _run():
+        try:
+            outcome["result"] = asyncio.run(_gather())
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=_run)
+    worker.start()
+    worker.join()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def stream_response(system_prompt: str, user_prompt: str, model: str = "70b") -> CompletionStream:
     """
     Stream API response for chat interfaces
 
-    Note: Groq SDK supports streaming, but we'll use simple non-streaming for MVP
-    Can add streaming in post-MVP for career coach chat
+    Usage:
+        stream = stream_response(system_prompt, user_prompt)
+        st.write_stream(stream)
+        full_text = stream.content
     """
-    # For MVP, just use regular call and display
-    return quick_generate_text(system_prompt, user_prompt, model=model)
+    client = get_groq_client()
+    return client.stream_api(system_prompt, user_prompt, model=model)
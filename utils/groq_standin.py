@@ -0,0 +1,543 @@
+"""
+Local Groq/OpenAI-compatible stand-in server for load tests and benchmarks
+
+Serves canned, template-driven completions for every prompt in
+prompts/prompts.py (and the inline prompts in app.py) with tunable
+latency, token throughput and rate-limit/timeout/error injection.
+Quotas (--rpm/--tpm) are enforced per API key and reported in Groq's
+x-ratelimit-* headers; --revoked-keys answers those keys with 401.
+
+Usage:
+    python -m utils.groq_standin --port 8787 --latency-median 0.8 --rate-limit-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8787 streamlit run app.py
+"""
+
+import re
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, Tuple
+
+from prompts import prompts
+
+
+@dataclass
+class StandinConfig:
+    """Latency model and fault injection settings"""
+    latency_median: float = 0.5       # Seconds to first token (log-normal median)
+    latency_sigma: float = 0.5        # Log-normal shape; larger = heavier tail
+    tokens_per_second: float = 400.0  # Completion throughput after first token
+    rate_limit_rate: float = 0.0      # Probability of an injected 429
+    retry_after: float = 2.0          # Retry-After seconds sent with 429s
+    timeout_rate: float = 0.0         # Probability of hanging the request
+    hang_seconds: float = 30.0        # How long a "timed out" request hangs
+    error_rate: float = 0.0           # Probability of an injected 500
+    rpm: int = 0                      # Enforced requests/minute per API key and model (0 = unlimited)
+    tpm: int = 0                      # Enforced tokens/minute per API key and model (0 = unlimited)
+    revoked_keys: str = ""            # Comma-separated API keys answered with 401
+    seed: Optional[int] = None
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# ========================================
+# CANNED RESPONSES
+# ========================================
+
+def _field(user_prompt: str, label: str, default: str) -> str:
+    match = re.search(rf"^\s*{label}:\s*(.+)$", user_prompt, re.MULTILINE | re.IGNORECASE)
+    return match.group(1).strip() if match else default
+
+
+def _profile_json(user_prompt: str) -> str:
+    email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", user_prompt)
+    lines = [line.strip() for line in user_prompt.splitlines() if line.strip()]
+    name = lines[1] if len(lines) > 1 and len(lines[1]) < 60 else "Alex Morgan"
+    return json.dumps({
+        "name": name,
+        "email": email.group(0) if email else "alex.morgan@example.com",
+        "phone": "+1-555-010-2030",
+        "linkedin_url": None,
+        "work_history": [
+            {
+                "title": "Software Engineer",
+                "company": "Acme Corp",
+                "dates": "2022-06 to Present",
+                "bullets": [
+                    "Built REST APIs in Python serving 2M requests/day",
+                    "Cut CI pipeline time by 35% by parallelizing test suites"
+                ]
+            },
+            {
+                "title": "Software Engineering Intern",
+                "company": "Globex",
+                "dates": "2021-06 to 2021-09",
+                "bullets": ["Shipped React dashboard used by 40 internal analysts"]
+            }
+        ],
+        "skills": ["Python", "JavaScript", "React", "PostgreSQL", "Docker", "AWS"],
+        "education": [
+            {"degree": "B.S. Computer Science", "institution": "State University", "year": "2022"}
+        ],
+        "projects": [
+            {
+                "name": "Weather Dashboard",
+                "description": "Real-time weather dashboard with city search and charts",
+                "technologies": ["React", "Node.js"],
+                "link": "https://github.com/example/weather"
+            }
+        ]
+    })
+
+
+def _portfolio_html(user_prompt: str) -> str:
+    name = _field(user_prompt, "Name", "Alex Morgan")
+    sections = "\n".join(
+        f'    <section class="section"><h2>{title}</h2><p>{title} details for {name}.</p></section>'
+        for title in ("About", "Experience", "Projects", "Skills", "Contact")
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{name} - Portfolio</title>
+    <style>
+        body {{ font-family: sans-serif; background: #0f172a; color: #f1f5f9; margin: 0; }}
+        .hero {{ padding: 80px 20px; text-align: center; background: linear-gradient(135deg, #6366f1, #8b5cf6); }}
+        .section {{ max-width: 960px; margin: 48px auto; padding: 0 20px; }}
+    </style>
+</head>
+<body>
+    <header class="hero"><h1>{name}</h1><p>Software Engineer</p></header>
+{sections}
+</body>
+</html>"""
+
+
+def _optimizer_json(user_prompt: str) -> str:
+    return json.dumps({
+        "score": 72,
+        "strengths": ["Relevant Python experience", "Quantified achievements", "Clear structure"],
+        "missing_keywords": ["Kubernetes", "GraphQL", "CI/CD"],
+        "suggestions": [
+            {"section": "Skills", "recommendation": "Add Kubernetes if you have used it"},
+            {"section": "Experience", "recommendation": "Mention CI/CD ownership explicitly"}
+        ]
+    })
+
+
+def _interview_questions_json(user_prompt: str) -> str:
+    match = re.search(r"Generate (\d+)", user_prompt)
+    count = int(match.group(1)) if match else 5
+    return json.dumps({
+        "questions": [
+            {
+                "type": "behavioral",
+                "question": f"Question {i}: describe a time you debugged a hard production issue.",
+                "key_points": ["Context", "Approach", "Result"],
+                "mistakes": ["Being vague", "Skipping the outcome"]
+            }
+            for i in range(1, count + 1)
+        ]
+    })
+
+
+def _cover_letter(user_prompt: str) -> str:
+    name = _field(user_prompt, "Name", "Alex Morgan")
+    return (
+        "Dear Hiring Manager,\n\n"
+        "I am excited to apply for this role. In my current position I have built and operated "
+        "production services in Python and React, and I enjoy turning ambiguous requirements into "
+        "reliable software.\n\n"
+        "The responsibilities in your posting match my recent work closely, and I would welcome the "
+        "chance to bring that experience to your team.\n\n"
+        f"Sincerely,\n{name}"
+    )
+
+
+def _coach_text(user_prompt: str) -> str:
+    return (
+        "Based on your background, focus on deepening one area where you already have traction "
+        "rather than spreading across many. Pick a target role, list the three skills that appear "
+        "most often in its job descriptions, and build one small public project that demonstrates "
+        "each.\n\n"
+        "In parallel, reach out to two people a week who hold that role today. Short, specific "
+        "questions get answered far more often than generic requests for advice."
+    )
+
+
+def _feedback_text(user_prompt: str) -> str:
+    return (
+        "Strengths: clear structure and a concrete example.\n"
+        "Improvements: quantify the impact and explain trade-offs you considered.\n"
+        "Rating: 4/5"
+    )
+
+
+# (matcher, kind, responder)
+RESPONDERS = [
+    (lambda s: s == prompts.RESUME_PARSER_PROMPT, "resume_parse", _profile_json),
+    (lambda s: s == prompts.LINKEDIN_PARSER_PROMPT, "linkedin_parse", _profile_json),
+    (lambda s: s == prompts.PORTFOLIO_GENERATOR_PROMPT, "portfolio", _portfolio_html),
+    (lambda s: s == prompts.OPTIMIZER_PROMPT, "optimizer", _optimizer_json),
+    (lambda s: s in (prompts.COVER_LETTER_FORMAL_PROMPT,
+                     prompts.COVER_LETTER_FRIENDLY_PROMPT,
+                     prompts.COVER_LETTER_TECHNICAL_PROMPT), "cover_letter", _cover_letter),
+    (lambda s: s.startswith("You are an expert technical interviewer")
+        or s.startswith("You are a technical interviewer"), "interview_questions", _interview_questions_json),
+    (lambda s: s.startswith("You are an interview coach"), "interview_feedback", _feedback_text),
+    (lambda s: "career coach" in s.lower(), "career_coach", _coach_text),
+]
+
+
+def canned_response(system_prompt: str, user_prompt: str, json_mode: bool) -> Tuple[str, str]:
+    """
+    Pick a canned completion for a request
+
+    Returns:
+        (kind, content)
+    """
+    for matcher, kind, responder in RESPONDERS:
+        if matcher(system_prompt):
+            return kind, responder(user_prompt)
+
+    if json_mode:
+        return "generic_json", json.dumps({"result": "ok"})
+    return "generic", "This is a canned response from the local Groq stand-in server."
+
+
+# ========================================
+# SERVER
+# ========================================
+
+class _SlidingWindow:
+    """Requests/tokens seen in the last 60 seconds"""
+
+    def __init__(self):
+        self.events = deque()
+
+    def usage(self, now: float) -> Tuple[int, int]:
+        while self.events and now - self.events[0][0] > 60:
+            self.events.popleft()
+        return len(self.events), sum(tokens for _, tokens in self.events)
+
+    def add(self, now: float, tokens: int) -> None:
+        self.events.append((now, tokens))
+
+
+class GroqStandinServer:
+    """Threaded HTTP server speaking the Groq chat completions API"""
+
+    def __init__(self, config: Optional[StandinConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StandinConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[str, str], _SlidingWindow] = {}
+        self._revoked = {key.strip() for key in self.config.revoked_keys.split(",") if key.strip()}
+        self.counters = {
+            "requests": 0,
+            "completed": 0,
+            "streamed": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "completion_tokens": 0
+        }
+        self.by_kind: Dict[str, int] = {}
+        self.by_key: Dict[str, int] = {}
+
+        server = self
+
+        class Handler(_StandinHandler):
+            standin = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GroqStandinServer":
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "by_kind": dict(self.by_kind),
+                "by_key": dict(self.by_key),
+                "config": asdict(self.config)
+            }
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += amount
+
+    def _roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < probability
+
+    def _first_token_delay(self) -> float:
+        with self._lock:
+            return self._random.lognormvariate(math.log(max(self.config.latency_median, 1e-3)),
+                                               self.config.latency_sigma)
+
+    def _check_quota(self, api_key: str, model: str, tokens: int) -> Tuple[Optional[float], Dict[str, str]]:
+        """
+        Enforce rpm/tpm per API key and model
+
+        Returns:
+            (seconds to wait if over the limit or None, x-ratelimit-* headers)
+        """
+        if not (self.config.rpm or self.config.tpm):
+            return None, {}
+        now = time.time()
+        with self._lock:
+            window = self._windows.setdefault((api_key, model), _SlidingWindow())
+            requests, used = window.usage(now)
+            over_rpm = self.config.rpm and requests + 1 > self.config.rpm
+            over_tpm = self.config.tpm and used + tokens > self.config.tpm
+            wait = None
+            if over_rpm or over_tpm:
+                oldest = window.events[0][0] if window.events else now
+                wait = max(0.1, 60 - (now - oldest))
+            else:
+                window.add(now, tokens)
+                requests, used = requests + 1, used + tokens
+            reset = max(0.0, 60 - (now - window.events[0][0])) if window.events else 0.0
+
+        headers = {}
+        # Like Groq: limit, remaining and time until the window frees up
+        for name, limit, spent in (("requests", self.config.rpm, requests), ("tokens", self.config.tpm, used)):
+            if limit:
+                headers[f"x-ratelimit-limit-{name}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{name}"] = str(max(0, limit - spent))
+                headers[f"x-ratelimit-reset-{name}"] = f"{reset:.2f}s"
+        return wait, headers
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    standin: GroqStandinServer
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.standin.stats())
+        elif self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in (
+                "llama-3.1-8b-instant", "llama-3.3-70b-versatile", "mixtral-8x7b-32768")]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        try:
+            self._handle_completion()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (e.g. its timeout fired during an injected hang)
+
+    def _handle_completion(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        standin = self.standin
+        config = standin.config
+        standin._count("requests")
+
+        model = body.get("model", "llama-3.1-8b-instant")
+        messages = body.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user_prompt = "\n".join(m["content"] for m in messages if m.get("role") == "user")
+        # A trailing assistant message is a prefill the model continues from
+        prefill = messages[-1]["content"] if messages and messages[-1].get("role") == "assistant" else ""
+        prompt_tokens = estimate_tokens(system_prompt + user_prompt + prefill)
+        max_tokens = int(body.get("max_tokens") or 1024)
+
+        auth = self.headers.get("Authorization", "")
+        api_key = auth[len("Bearer "):] if auth.startswith("Bearer ") else auth
+        label = f"…{api_key[-4:]}" if len(api_key) > 8 else api_key
+        with standin._lock:
+            standin.by_key[label] = standin.by_key.get(label, 0) + 1
+        if api_key in standin._revoked:
+            self._send_json(401, {"error": {
+                "message": "Invalid API Key",
+                "type": "invalid_request_error",
+                "code": "invalid_api_key"
+            }})
+            return
+
+        # Fault injection
+        wait, quota_headers = standin._check_quota(api_key, model, prompt_tokens + max_tokens)
+        if wait is None and standin._roll(config.rate_limit_rate):
+            wait = config.retry_after
+        if wait is not None:
+            standin._count("rate_limited")
+            self._send_json(429, {"error": {
+                "message": f"Rate limit reached for model `{model}`. Please try again in {wait:.2f}s.",
+                "type": "requests",
+                "code": "rate_limit_exceeded"
+            }}, headers={**quota_headers, "retry-after": f"{wait:.2f}"})
+            return
+
+        if standin._roll(config.timeout_rate):
+            standin._count("timeouts")
+            time.sleep(config.hang_seconds)
+            self._send_json(504, {"error": {"message": "Gateway timeout"}})
+            return
+
+        if standin._roll(config.error_rate):
+            standin._count("errors")
+            self._send_json(500, {"error": {"message": "Internal server error", "type": "internal_server_error"}})
+            return
+
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        kind, content = canned_response(system_prompt, user_prompt, json_mode)
+        with standin._lock:
+            standin.by_kind[kind] = standin.by_kind.get(kind, 0) + 1
+
+        if prefill and content.startswith(prefill):
+            content = content[len(prefill):]
+
+        finish_reason = "stop"
+        if estimate_tokens(content) > max_tokens:
+            if json_mode:
+                # Like Groq, JSON mode refuses to return a cut-off object
+                self._send_json(400, {"error": {
+                    "message": "Failed to generate JSON. Please adjust your prompt.",
+                    "type": "invalid_request_error",
+                    "code": "json_validate_failed",
+                    "failed_generation": content[:max_tokens * 4]
+                }})
+                return
+            content = content[:max_tokens * 4]
+            finish_reason = "length"
+
+        completion_tokens = estimate_tokens(content)
+        first_token = standin._first_token_delay()
+        generation = completion_tokens / config.tokens_per_second
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_time": 0.0,
+            "completion_time": generation,
+            "total_time": first_token + generation,
+            "queue_time": first_token
+        }
+        standin._count("completion_tokens", completion_tokens)
+
+        if body.get("stream"):
+            self._stream(model, content, finish_reason, usage, first_token, generation, quota_headers)
+            standin._count("streamed")
+        else:
+            time.sleep(first_token + generation)
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "system_fingerprint": "fp_standin",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "logprobs": None,
+                    "finish_reason": finish_reason
+                }],
+                "usage": usage
+            }, headers=quota_headers)
+        standin._count("completed")
+
+    def _stream(self, model: str, content: str, finish_reason: str, usage: Dict[str, Any],
+                first_token: float, generation: float, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        pieces = re.findall(r"\S+\s*|\s+", content) or [""]
+        delay = generation / len(pieces)
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None, extra: Optional[Dict] = None) -> None:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "system_fingerprint": "fp_standin",
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}]
+            }
+            if extra:
+                payload.update(extra)
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(first_token)
+        chunk({"role": "assistant", "content": ""})
+        for piece in pieces:
+            chunk({"content": piece})
+            time.sleep(delay)
+        chunk({}, finish_reason, {"x_groq": {"id": completion_id, "usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    defaults = StandinConfig()
+    for name, value in asdict(defaults).items():
+        flag = "--" + name.replace("_", "-")
+        parser.add_argument(flag, type=type(value) if value is not None else int, default=value)
+    args = parser.parse_args()
+
+    config = StandinConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+    server = GroqStandinServer(config, host=args.host, port=args.port)
+    print(f"Groq stand-in listening on {server.base_url} (set GROQ_BASE_URL to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Hedged requests: fire a backup when a call runs past its usual latency
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+def parse_alternates(spec: str) -> Dict[str, str]:
+    """Parse GROQ_HEDGE_ALTERNATES, e.g. "70b=8b,mixtral=70b" (model keys)"""
+    alternates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            primary, backup = (part.strip() for part in item.split("=", 1))
+            if primary and backup:
+                alternates[primary] = backup
+    return alternates
+
+
+class Hedger:
+    """
+    Decides when to hedge and tracks latency per task/model
+
+    A request that has not answered (or streamed its first token) within
+    the given percentile of recent latencies gets a backup request, and the
+    first to finish wins. Every request earns `max_rate` of a hedge and a
+    hedge spends one, so at most that fraction of traffic is duplicated.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        max_rate: float = 0.05,
+        min_delay: float = 0.5,
+        window: int = 200,
+        alternates: Optional[Dict[str, str]] = None
+    ):
+        """
+        Args:
+            percentile: Latency percentile after which a backup is sent
+            min_samples: Latencies needed before a key is hedged
+            max_rate: Max fraction of requests that may be hedged
+            min_delay: Never hedge sooner than this many seconds
+            window: Recent latencies kept per key
+            alternates: Model name -> model name to use for the backup
+                (same model if absent)
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self.window = window
+        self.alternates = alternates or {}
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._budget = 1.0
+        self.requests = 0
+        self.hedges = 0
+        self.backup_wins = 0
+        self.skipped = 0
+
+    def observe(self, key: str, seconds: float) -> None:
+        """Record the latency (or time to first token) of a finished request"""
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay_for(self, key: str) -> Optional[float]:
+        """
+        Seconds to wait before hedging a new request for `key`
+
+        Also earns hedge budget for the request. Returns None if the key
+        doesn't have enough history yet.
+        """
+        with self._lock:
+            self.requests += 1
+            self._budget = min(1.0 + self.max_rate, self._budget + self.max_rate)
+
+            latencies = self._latencies.get(key)
+            if not latencies or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+            index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+            return max(self.min_delay, ordered[max(0, index)])
+
+    def try_hedge(self) -> bool:
+        """Spend one hedge from the budget; False if over the rate cap"""
+        with self._lock:
+            if self._budget < 1.0:
+                self.skipped += 1
+                return False
+            self._budget -= 1.0
+            self.hedges += 1
+            return True
+
+    def record_winner(self, backup_won: bool) -> None:
+        if backup_won:
+            with self._lock:
+                self.backup_wins += 1
+
+    def backup_model(self, model_name: str) -> str:
+        return self.alternates.get(model_name, model_name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedge rate, backup win rate and current thresholds per key"""
+        with self._lock:
+            thresholds = {}
+            for key, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+                thresholds[key] = {"samples": len(ordered), "threshold": ordered[max(0, index)]}
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "backup_wins": self.backup_wins,
+                "skipped_over_budget": self.skipped,
+                "thresholds": thresholds
+            }
+
+
+# Singleton instance
+_hedger = None
+
+
+def get_hedger(models: Dict[str, str]) -> Optional[Hedger]:
+    """
+    Get or create the process-wide hedger
+
+    Args:
+        models: GroqClient.MODELS mapping of model key -> model name
+
+    Returns None unless GROQ_HEDGE_ENABLED is set (hedging is opt-in).
+    """
+    global _hedger
+    if os.getenv("GROQ_HEDGE_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return None
+
+    if _hedger is None:
+        alternates = parse_alternates(os.getenv("GROQ_HEDGE_ALTERNATES", ""))
+        _hedger = Hedger(
+            percentile=float(os.getenv("GROQ_HEDGE_PERCENTILE", 95)),
+            min_samples=int(os.getenv("GROQ_HEDGE_MIN_SAMPLES", 20)),
+            max_rate=float(os.getenv("GROQ_HEDGE_MAX_RATE", 0.05)),
+            min_delay=float(os.getenv("GROQ_HEDGE_MIN_DELAY", 0.5)),
+            alternates={
+                models[primary]: models[backup]
+                for primary, backup in alternates.items()
+                if primary in models and backup in models
+            }
+        )
+    return _hedger
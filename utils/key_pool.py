@@ -0,0 +1,252 @@
+"""
+Pool of Groq API keys: per-(key, model) quota tracking, headroom-based routing and quarantine
+"""
+
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+from groq import APIStatusError
+
+from utils.retry_policy import classify, retry_after, parse_duration
+
+
+def parse_api_keys(spec: str, single: Optional[str] = None) -> List[str]:
+    """
+    Keys from GROQ_API_KEYS (comma- or newline-separated) plus GROQ_API_KEY
+
+    Duplicates are dropped and order is kept.
+    """
+    keys = []
+    for item in spec.replace("\n", ",").split(",") + [single or ""]:
+        key = item.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+@dataclass
+class ModelQuota:
+    """What a key's last responses for one model said about its quota
+
+    Groq limits each model separately, so a 429 on one model says nothing
+    about the key's quota on another.
+    """
+    limit_requests: Optional[int] = None
+    limit_tokens: Optional[int] = None
+    remaining_requests: Optional[float] = None
+    remaining_tokens: Optional[float] = None
+    reset_requests_at: Optional[float] = None
+    reset_tokens_at: Optional[float] = None
+    in_flight: int = 0
+    requests: int = 0
+    rate_limited: int = 0
+    strikes: int = 0
+    quarantined_until: float = 0.0
+    last_used: float = 0.0
+
+    def headroom(self, now: float) -> float:
+        """
+        Fraction of the quota still free (1.0 if unknown)
+
+        Counts requests already in flight; a remaining count is forgotten
+        once its reset time has passed.
+        """
+        fractions = [1.0]
+        requests = self.remaining_requests
+        if requests is not None and self.reset_requests_at is not None and now >= self.reset_requests_at:
+            requests = None
+        if requests is not None or self.limit_requests:
+            limit = self.limit_requests or max(requests, 1)
+            available = (limit if requests is None else requests) - self.in_flight
+            fractions.append(available / limit)
+        tokens = self.remaining_tokens
+        if tokens is not None and self.reset_tokens_at is not None and now >= self.reset_tokens_at:
+            tokens = None
+        if tokens is not None and self.limit_tokens:
+            fractions.append(tokens / self.limit_tokens)
+        return max(0.0, min(fractions))
+
+
+@dataclass
+class APIKey:
+    """One key, whether it is still accepted, and its quota per model"""
+    key: str
+    name: str
+    quotas: Dict[str, ModelQuota] = field(default_factory=dict)
+    disabled: bool = False
+    last_error: Optional[str] = None
+
+    def quota(self, model: str) -> ModelQuota:
+        quota = self.quotas.get(model)
+        if quota is None:
+            quota = self.quotas[model] = ModelQuota()
+        return quota
+
+    def usable(self, model: str, now: float) -> bool:
+        return not self.disabled and now >= self.quota(model).quarantined_until
+
+
+class KeyPool:
+    """
+    Routes each request to the key with the most quota headroom for its model
+
+    Quota comes from the x-ratelimit-* headers of each key's responses and
+    is tracked per (key, model), as Groq's limits are. A key answering
+    401/403 is disabled for every model for the life of the process; one
+    that answers 429 is treated as empty for that model until its
+    Retry-After, and after `max_strikes` 429s in a row on the model is
+    quarantined for it for `quarantine_seconds`. If no key is usable for
+    the model, the one that recovers first is used anyway so the caller
+    still sees the real upstream error.
+    """
+
+    def __init__(self, keys: List[str], quarantine_seconds: float = 60.0, max_strikes: int = 3):
+        """
+        Args:
+            keys: API keys, in preference order for ties
+            quarantine_seconds: How long a key that keeps answering 429 for a model is skipped for it
+            max_strikes: Consecutive 429s on one model that quarantine a key for that model
+        """
+        if not keys:
+            raise ValueError("KeyPool needs at least one API key")
+        self.keys = [
+            APIKey(key=key, name=f"key{index + 1}…{key[-4:]}" if len(key) > 8 else f"key{index + 1}")
+            for index, key in enumerate(keys)
+        ]
+        self.quarantine_seconds = quarantine_seconds
+        self.max_strikes = max_strikes
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, model: str) -> APIKey:
+        """Pick the key for the next request to `model` and count it as in flight"""
+        with self._lock:
+            now = time.monotonic()
+            usable = [key for key in self.keys if key.usable(model, now)]
+            if usable:
+                # Most headroom, then fewest in flight, then least recently used
+                chosen = max(usable, key=lambda k: (
+                    k.quota(model).headroom(now), -k.quota(model).in_flight, -k.quota(model).last_used
+                ))
+            else:
+                enabled = [key for key in self.keys if not key.disabled] or self.keys
+                chosen = min(enabled, key=lambda k: k.quota(model).quarantined_until)
+            quota = chosen.quota(model)
+            quota.in_flight += 1
+            quota.requests += 1
+            quota.last_used = now
+            return chosen
+
+    def observe(self, api_key: APIKey, model: str, headers: Mapping[str, str]) -> None:
+        """Update a key's quota for `model` from x-ratelimit-* response headers"""
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers[name])
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        def reset(name: str, now: float) -> Optional[float]:
+            seconds = parse_duration(headers[name]) if headers.get(name) else None
+            return None if seconds is None else now + seconds
+
+        with self._lock:
+            now = time.monotonic()
+            quota = api_key.quota(model)
+            limit_requests, limit_tokens = number("x-ratelimit-limit-requests"), number("x-ratelimit-limit-tokens")
+            if limit_requests:
+                quota.limit_requests = int(limit_requests)
+            if limit_tokens:
+                quota.limit_tokens = int(limit_tokens)
+            remaining_requests = number("x-ratelimit-remaining-requests")
+            if remaining_requests is not None:
+                quota.remaining_requests = remaining_requests
+                quota.reset_requests_at = reset("x-ratelimit-reset-requests", now)
+            remaining_tokens = number("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                quota.remaining_tokens = remaining_tokens
+                quota.reset_tokens_at = reset("x-ratelimit-reset-tokens", now)
+
+    def release(self, api_key: APIKey, model: str, error: Optional[Exception] = None) -> Optional[str]:
+        """
+        Record how a request to `model` on `api_key` ended
+
+        Returns:
+            'disabled' (for every model) or 'quarantined' (for this model)
+            if this error took the key out of rotation, else None
+        """
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers:
+            self.observe(api_key, model, headers)
+
+        with self._lock:
+            quota = api_key.quota(model)
+            quota.in_flight = max(0, quota.in_flight - 1)
+            if error is None:
+                quota.strikes = 0
+                return None
+
+            now = time.monotonic()
+            status = error.status_code if isinstance(error, APIStatusError) else None
+            if status in (401, 403):
+                api_key.last_error = f"HTTP {status}"
+                if not api_key.disabled:
+                    api_key.disabled = True
+                    return "disabled"
+                return None
+
+            if classify(error) != "rate_limit":
+                return None
+            hint = retry_after(error) or 1.0
+            quota.rate_limited += 1
+            quota.strikes += 1
+            api_key.last_error = f"HTTP 429 ({model})"
+            # Empty for this model until the server says otherwise
+            quota.remaining_requests = 0
+            quota.reset_requests_at = now + hint
+            if quota.strikes >= self.max_strikes and now >= quota.quarantined_until:
+                quota.quarantined_until = now + max(self.quarantine_seconds, hint)
+                quota.strikes = 0
+                return "quarantined"
+            return None
+
+    def has_headroom(self, model: str) -> bool:
+        """True if some key could take a request to `model` right now"""
+        with self._lock:
+            now = time.monotonic()
+            return any(key.usable(model, now) and key.quota(model).headroom(now) > 0 for key in self.keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-key state and per-model quota and counters (keys are shown by name only)"""
+        with self._lock:
+            now = time.monotonic()
+            keys = {}
+            for key in self.keys:
+                models = {}
+                for model, quota in key.quotas.items():
+                    models[model] = {
+                        "state": "quarantined" if now < quota.quarantined_until else "active",
+                        "headroom": round(quota.headroom(now), 3),
+                        "remaining_requests": quota.remaining_requests,
+                        "remaining_tokens": quota.remaining_tokens,
+                        "limit_requests": quota.limit_requests,
+                        "limit_tokens": quota.limit_tokens,
+                        "in_flight": quota.in_flight,
+                        "requests": quota.requests,
+                        "rate_limited": quota.rate_limited,
+                        "quarantined_for": max(0.0, quota.quarantined_until - now)
+                    }
+                keys[key.name] = {
+                    "state": "disabled" if key.disabled else "active",
+                    "models": models,
+                    "requests": sum(quota.requests for quota in key.quotas.values()),
+                    "rate_limited": sum(quota.rate_limited for quota in key.quotas.values()),
+                    "last_error": key.last_error
+                }
+            return {
+                "keys": keys,
+                "usable": sum(1 for key in self.keys if not key.disabled)
+            }
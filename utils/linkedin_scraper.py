@@ -11,15 +11,18 @@ from fake_useragent import UserAgent
 import streamlit as st
 
 from utils.groq_client import get_groq_client
+from utils.model_policy import get_model_policy, ModelPolicy
 from utils.validators import ProfileSchema, LinkedInValidator
+from utils.prompt_budget import fit_resume_text, prompt_budget
 from prompts.prompts import LINKEDIN_PARSER_PROMPT
 
 
 class LinkedInScraper:
     """Scrape LinkedIn profiles (with legal/ethical considerations)"""
 
-    def __init__(self):
+    def __init__(self, policy: Optional[ModelPolicy] = None):
         self.groq_client = get_groq_client()
+        self.policy = policy or get_model_policy()
         self.ua = UserAgent()
 
     def scrape_profile(self, linkedin_url: str) -> Tuple[bool, Optional[str], Optional[str]]:
@@ -140,27 +143,37 @@ class LinkedInScraper:
         except Exception as e:
             return False, None, f"Error extracting profile data: {str(e)}"
 
-    def parse_with_ai(self, profile_text: str, linkedin_url: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    def parse_with_ai(
+        self,
+        profile_text: str,
+        linkedin_url: str,
+        policy: Optional[ModelPolicy] = None
+    ) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
         Parse LinkedIn profile text using Groq AI
 
+        Args:
+            profile_text: Scraped or pasted profile text
+            linkedin_url: Profile URL stored with the result
+            policy: Model policy for this call (defaults to the scraper's)
+
         Returns:
             (success, parsed_data, error_message)
         """
         try:
-            # Truncate if too long
-            if len(profile_text) > 12000:
-                profile_text = profile_text[:12000] + "\n\n[Truncated for length]"
+            # Fit the token budget, trimming the least useful sections first
+            profile_text, _ = fit_resume_text(profile_text, prompt_budget("linkedin_parse"))
 
-            # Call Groq API
-            parsed_json = self.groq_client.call_api_json(
+            # Call Groq API (checked against ProfileSchema as it streams)
+            response = self.groq_client.call_api_structured(
                 system_prompt=LINKEDIN_PARSER_PROMPT,
                 user_prompt=f"LinkedIn profile content:\n\n{profile_text}",
-                model="8b",
-                temperature=0.2,
-                max_tokens=2048
+                schema=ProfileSchema,
+                task="linkedin_parse",
+                **(policy or self.policy).params("linkedin_parse")
             )
 
+            parsed_json = response.get("data")
             if not parsed_json:
                 return False, None, "AI parsing failed - no response"
 
@@ -182,10 +195,14 @@ class LinkedInScraper:
         except Exception as e:
             return False, None, f"Error during AI parsing: {str(e)}"
 
-    def scrape_and_parse(self, linkedin_url: str) -> Dict[str, Any]:
+    def scrape_and_parse(self, linkedin_url: str, policy: Optional[ModelPolicy] = None) -> Dict[str, Any]:
         """
         Main scraping and parsing function
 
+        Args:
+            linkedin_url: Public profile URL
+            policy: Model policy for the AI step (defaults to the scraper's)
+
         Returns:
             {
                 "success": bool,
@@ -235,7 +252,7 @@ class LinkedInScraper:
             }
 
         # Parse with AI
-        success, parsed_data, error = self.parse_with_ai(profile_text, linkedin_url)
+        success, parsed_data, error = self.parse_with_ai(profile_text, linkedin_url, policy)
 
         if not success:
             return {
@@ -265,13 +282,19 @@ class LinkedInScraper:
             "blocked": False
         }
 
-    def parse_manual_text(self, profile_text: str, linkedin_url: str = "") -> Dict[str, Any]:
+    def parse_manual_text(
+        self,
+        profile_text: str,
+        linkedin_url: str = "",
+        policy: Optional[ModelPolicy] = None
+    ) -> Dict[str, Any]:
         """
         Parse manually provided LinkedIn profile text (no scraping)
 
         Args:
             profile_text: User-provided LinkedIn profile text
             linkedin_url: Optional LinkedIn URL for reference
+            policy: Model policy for the AI step (defaults to the scraper's)
 
         Returns:
             Same format as scrape_and_parse() for consistency
@@ -295,7 +318,7 @@ class LinkedInScraper:
             profile_text = f"LinkedIn Profile URL: {linkedin_url}\n\n{profile_text}"
 
         # Parse with AI
-        success, parsed_data, error = self.parse_with_ai(profile_text, linkedin_url)
+        success, parsed_data, error = self.parse_with_ai(profile_text, linkedin_url, policy)
 
         if not success:
             return {
@@ -0,0 +1,192 @@
+"""
+Persistent content-addressed cache for LLM responses
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, Any, Set
+
+
+def make_cache_key(**request: Any) -> str:
+    """
+    Build a stable hash for an LLM request
+
+    Every field that can change the completion (model, prompts, temperature,
+    max_tokens, response_format, ...) must be passed in.
+    """
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL and size-bounded LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = ".cache/llm_cache.sqlite3",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 2000,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_temperature: float = 0.3,
+        bypass_tasks: Optional[Set[str]] = None
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self.bypass_tasks = set(bypass_tasks or ())
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+
+    def is_cacheable(self, temperature: float, task: Optional[str] = None) -> bool:
+        """Only near-deterministic calls are worth caching"""
+        if task and task in self.bypass_tasks:
+            return False
+        return temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached response or None (expired entries count as misses)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response and evict least-recently-used entries over budget"""
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self.stores += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop expired rows, then LRU rows until entry and byte budgets fit"""
+        cutoff = time.time() - self.ttl_seconds
+        cursor = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,))
+        self.evictions += max(cursor.rowcount, 0)
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access ASC"
+        ).fetchall()
+
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def clear(self) -> None:
+        """Remove all cached responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current size"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total
+        }
+
+
+# Singleton instance
+_llm_cache = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Get or create the LLM cache singleton
+
+    Returns None unless LLM_CACHE_ENABLED is set (the cache is opt-in).
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        if os.getenv("LLM_CACHE_ENABLED", "").lower() not in ("1", "true", "yes"):
+            return None
+
+        bypass = os.getenv("LLM_CACHE_BYPASS_TASKS", "")
+        _llm_cache = LLMCache(
+            path=os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3"),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2000)),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024)),
+            max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.3)),
+            bypass_tasks={t.strip() for t in bypass.split(",") if t.strip()}
+        )
+    return _llm_cache
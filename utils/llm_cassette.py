@@ -0,0 +1,188 @@
+"""
+Record/replay cassettes for LLM calls
+
+A cassette is a JSON-lines file (gzip-compressed if the path ends in .gz)
+with one entry per completion: the request hash, model, response content,
+usage, finish reason and measured latency. Record once against Groq or the
+local stand-in, then replay for deterministic, network-free benchmarks.
+"""
+
+import os
+import gzip
+import json
+import time
+import asyncio
+import threading
+from typing import Optional, Dict, Any, List, Iterator
+
+from utils.llm_cache import make_cache_key
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request has no recording"""
+
+
+class Cassette:
+    """
+    Records or replays completions keyed by the full request hash
+
+    Callers pass the request as asked for, before adaptive max_tokens
+    sizing, so a replay matches its recording however the budget was sized.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 0.0):
+        """
+        Args:
+            path: Cassette file (.jsonl or .jsonl.gz)
+            mode: 'record' or 'replay'
+            latency_scale: In replay, sleep this fraction of the recorded
+                latency (0 = instant, 1 = original timing)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    @staticmethod
+    def request_key(params: Dict[str, Any]) -> str:
+        """Hash of the request, ignoring transport-only options like stream"""
+        return make_cache_key(**{k: v for k, v in params.items() if k != "stream"})
+
+    def record(self, params: Dict[str, Any], result: Dict[str, Any], latency: float,
+               ttft: Optional[float] = None) -> None:
+        """Append one completion to the cassette"""
+        entry = {
+            "key": self.request_key(params),
+            "model": params["model"],
+            "content": result["content"],
+            "usage": result["usage"],
+            "finish_reason": result.get("finish_reason"),
+            "latency": round(latency, 4),
+            "ttft": round(ttft, 4) if ttft is not None else None,
+            "recorded_at": time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with self._open("a") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def lookup(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Next recording for a request (repeats cycle through all takes)
+
+        Raises:
+            CassetteMiss if the request was never recorded
+        """
+        key = self.request_key(params)
+        with self._lock:
+            takes = self._entries.get(key)
+            if not takes:
+                self.misses += 1
+                raise CassetteMiss(f"No cassette recording for {params['model']} request {key[:12]}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self.replayed += 1
+            return takes[index % len(takes)]
+
+    def replay(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Serve a recording, optionally sleeping for its recorded latency"""
+        entry = self.lookup(params)
+        if self.latency_scale:
+            time.sleep(entry["latency"] * self.latency_scale)
+        return self._result(entry)
+
+    async def areplay(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self.lookup(params)
+        if self.latency_scale:
+            await asyncio.sleep(entry["latency"] * self.latency_scale)
+        return self._result(entry)
+
+    def replay_stream(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Serve a recording in _send_stream's event format"""
+        entry = self.lookup(params)
+        words = entry["content"].split(" ")
+        ttft = entry.get("ttft") or 0.0
+        per_word = max(0.0, entry["latency"] - ttft) / max(len(words), 1)
+
+        if self.latency_scale:
+            time.sleep(ttft * self.latency_scale)
+        for i, word in enumerate(words):
+            yield {"delta": word if i == 0 else " " + word}
+            if self.latency_scale:
+                time.sleep(per_word * self.latency_scale)
+        yield {"usage": entry["usage"], "finish_reason": entry.get("finish_reason")}
+
+    @staticmethod
+    def _result(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "content": entry["content"],
+            "usage": entry["usage"],
+            "finish_reason": entry.get("finish_reason")
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "recordings": sum(len(takes) for takes in self._entries.values())
+        }
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    Build a cassette from GROQ_CASSETTE_MODE / GROQ_CASSETTE_PATH
+
+    Returns None unless GROQ_CASSETTE_MODE is 'record' or 'replay'.
+    """
+    mode = os.getenv("GROQ_CASSETTE_MODE", "").lower()
+    if mode not in Cassette.MODES:
+        return None
+
+    return Cassette(
+        path=os.getenv("GROQ_CASSETTE_PATH", ".cache/llm_cassette.jsonl.gz"),
+        mode=mode,
+        latency_scale=float(os.getenv("GROQ_CASSETTE_LATENCY_SCALE", 0))
+    )
@@ -0,0 +1,111 @@
+"""
+Event sinks for reporting LLM retries, errors and rate-limit waits
+"""
+
+import abc
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger("portfolioai.llm")
+
+
+class EventSink(abc.ABC):
+    """Receives events from GroqClient; subclasses decide how to surface them"""
+
+    @abc.abstractmethod
+    def emit(self, event: str, level: str, message: str, **fields: Any) -> None:
+        """
+        Args:
+            event: Machine-readable name, e.g. 'rate_limit_retry'
+            level: 'debug', 'info', 'warning' or 'error'
+            message: Human-readable text
+            fields: Extra structured data (model, attempt, wait, ...)
+        """
+
+
+class LoggingEventSink(EventSink):
+    """Send events to the standard logging module (headless default)"""
+
+    LEVELS = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "warning": logging.WARNING,
+        "error": logging.ERROR
+    }
+
+    def emit(self, event: str, level: str, message: str, **fields: Any) -> None:
+        logger.log(self.LEVELS.get(level, logging.INFO), "%s: %s %s", event, message, fields or "")
+
+
+class StreamlitEventSink(EventSink):
+    """
+    Show warnings/errors in the Streamlit page
+
+    Falls back to logging when called off the script thread (worker
+    threads have no ScriptRunContext and st.* calls would be dropped).
+    """
+
+    def __init__(self):
+        self._fallback = LoggingEventSink()
+
+    def emit(self, event: str, level: str, message: str, **fields: Any) -> None:
+        if level not in ("info", "warning", "error"):
+            self._fallback.emit(event, level, message, **fields)
+            return
+
+        try:
+            import streamlit as st
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+        except ImportError:
+            self._fallback.emit(event, level, message, **fields)
+            return
+
+        if get_script_run_ctx() is None:
+            self._fallback.emit(event, level, message, **fields)
+            return
+
+        getattr(st, level)(message)
+
+
+class CallbackEventSink(EventSink):
+    """Forward events as dicts to a callable (progress bars, queues, tests)"""
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None]):
+        self.callback = callback
+
+    def emit(self, event: str, level: str, message: str, **fields: Any) -> None:
+        self.callback({
+            "event": event,
+            "level": level,
+            "message": message,
+            "time": time.time(),
+            **fields
+        })
+
+
+class RecordingEventSink(EventSink):
+    """Keep events in memory, e.g. for batch jobs and benchmarks"""
+
+    def __init__(self, max_events: Optional[int] = 1000):
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, level: str, message: str, **fields: Any) -> None:
+        with self._lock:
+            self.events.append({
+                "event": event,
+                "level": level,
+                "message": message,
+                "time": time.time(),
+                **fields
+            })
+            if self.max_events and len(self.events) > self.max_events:
+                del self.events[0]
+
+    def count(self, event: str) -> int:
+        with self._lock:
+            return sum(1 for e in self.events if e["event"] == event)
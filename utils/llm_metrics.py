@@ -0,0 +1,274 @@
+"""
+Process-wide LLM metrics: counters and latency histograms with Prometheus text exposition
+"""
+
+import os
+import math
+import bisect
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger("portfolioai.llm")
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+QUEUE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# name: (type, help, buckets for histograms)
+METRICS = {
+    "llm_requests_total": ("counter", "LLM calls by task, model and outcome", None),
+    "llm_request_duration_seconds": ("histogram", "End-to-end LLM call latency incl. queueing and retries", LATENCY_BUCKETS),
+    "llm_ttft_seconds": ("histogram", "Time to first streamed token", TTFT_BUCKETS),
+    "llm_prompt_tokens_total": ("counter", "Prompt tokens sent", None),
+    "llm_completion_tokens_total": ("counter", "Completion tokens received", None),
+    "llm_upstream_errors_total": ("counter", "Failed attempts by kind (rate_limit = HTTP 429)", None),
+    "llm_retries_total": ("counter", "Attempts retried after a failure", None),
+    "llm_fallbacks_total": ("counter", "Escalations, hedges, repairs, aborts and template fallbacks", None),
+    "llm_queue_wait_seconds": ("histogram", "Time waiting for a scheduler slot by priority class", QUEUE_BUCKETS),
+    "llm_queue_depth": ("gauge", "Requests waiting for a scheduler slot by priority class", None),
+    "llm_quota_rejections_total": ("counter", "Calls refused for exceeding a per-user token budget", None),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, "" if value is None else str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    """Cumulative-bucket histogram for one label set"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms keyed by metric name and labels
+
+    Labels are kept to task, model and a small set of outcome/kind values,
+    so the number of series stays bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], Iterable[Tuple[Dict[str, Any], float]]]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def register_gauge(self, name: str, collect: Callable[[], Iterable[Tuple[Dict[str, Any], float]]]) -> None:
+        """Read a gauge from `collect()` -> [(labels, value), ...] whenever metrics are rendered"""
+        with self._lock:
+            self._gauges[name] = collect
+
+    def _collect_gauges(self) -> Dict[str, Dict[LabelKey, float]]:
+        with self._lock:
+            collectors = dict(self._gauges)
+        # Called without the lock: collectors take their owners' locks
+        return {
+            name: {_label_key(labels): value for labels, value in collect()}
+            for name, collect in collectors.items()
+        }
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(METRICS[name][2] or LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        gauges = self._collect_gauges()
+        with self._lock:
+            for name, (kind, help_text, _) in METRICS.items():
+                scalars = self._counters if kind == "counter" else gauges
+                if kind in ("counter", "gauge") and name in scalars:
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                    for key, value in sorted(scalars[name].items()):
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                elif kind == "histogram" and name in self._histograms:
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                    for key, histogram in sorted(self._histograms[name].items()):
+                        cumulative = 0
+                        for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts):
+                            cumulative += count
+                            labels = _format_labels(key, ("le", _format_value(bound)))
+                            lines.append(f"{name}_bucket{labels} {cumulative}")
+                        lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                        lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Dashboard view: one row per task/model, totals of the event counters
+        and queue wait per priority class
+
+        Returns:
+            {"calls": [row, ...], "counters": {metric: {label string: value}},
+             "queue": {priority: {"waiting", "p50_s", "p95_s"}}}
+        """
+        gauges = self._collect_gauges()
+        with self._lock:
+            rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+            def row(labels: Dict[str, str]) -> Dict[str, Any]:
+                ident = (labels.get("task", ""), labels.get("model", ""))
+                return rows.setdefault(ident, {
+                    "task": ident[0] or "(untagged)",
+                    "model": ident[1],
+                    "calls": 0,
+                    "errors": 0,
+                    "cached": 0,
+                    "p50_s": None,
+                    "p95_s": None,
+                    "ttft_p50_s": None,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0
+                })
+
+            for key, value in self._counters.get("llm_requests_total", {}).items():
+                labels = dict(key)
+                entry = row(labels)
+                entry["calls"] += int(value)
+                if labels.get("outcome") == "cached":
+                    entry["cached"] += int(value)
+                elif labels.get("outcome") != "success":
+                    entry["errors"] += int(value)
+            for name, column in (("llm_prompt_tokens_total", "prompt_tokens"),
+                                 ("llm_completion_tokens_total", "completion_tokens")):
+                for key, value in self._counters.get(name, {}).items():
+                    row(dict(key))[column] += int(value)
+            for key, histogram in self._histograms.get("llm_request_duration_seconds", {}).items():
+                entry = row(dict(key))
+                entry["p50_s"], entry["p95_s"] = histogram.quantile(0.5), histogram.quantile(0.95)
+            for key, histogram in self._histograms.get("llm_ttft_seconds", {}).items():
+                row(dict(key))["ttft_p50_s"] = histogram.quantile(0.5)
+
+            counters = {
+                name: {
+                    ",".join(f"{k}={v}" for k, v in key) or "total": value
+                    for key, value in sorted(self._counters.get(name, {}).items())
+                }
+                for name in ("llm_upstream_errors_total", "llm_retries_total", "llm_fallbacks_total",
+                             "llm_quota_rejections_total")
+            }
+
+            queue: Dict[str, Dict[str, Any]] = {}
+            for key, value in gauges.get("llm_queue_depth", {}).items():
+                queue.setdefault(dict(key).get("priority", ""), {})["waiting"] = int(value)
+            for key, histogram in self._histograms.get("llm_queue_wait_seconds", {}).items():
+                entry = queue.setdefault(dict(key).get("priority", ""), {})
+                entry["p50_s"], entry["p95_s"] = histogram.quantile(0.5), histogram.quantile(0.95)
+        return {
+            "calls": sorted(rows.values(), key=lambda r: (r["task"], r["model"])),
+            "counters": counters,
+            "queue": queue
+        }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics for `registry` from a daemon thread"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-metrics-server", daemon=True).start()
+    return server
+
+
+# Singleton instances
+_metrics_registry = None
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Get or create the process-wide registry
+
+    Also starts the Prometheus endpoint on GROQ_METRICS_PORT (bound to
+    GROQ_METRICS_HOST, default 127.0.0.1) the first time, if the port is set.
+    """
+    global _metrics_registry, _metrics_server
+    with _metrics_lock:
+        if _metrics_registry is None:
+            _metrics_registry = MetricsRegistry()
+            port = os.getenv("GROQ_METRICS_PORT")
+            if port:
+                try:
+                    _metrics_server = start_metrics_server(
+                        _metrics_registry, int(port), os.getenv("GROQ_METRICS_HOST", "127.0.0.1")
+                    )
+                except OSError as e:
+                    logger.warning("metrics_server: could not listen on port %s: %s", port, e)
+        return _metrics_registry
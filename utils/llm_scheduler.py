@@ -0,0 +1,325 @@
+"""
+Priority scheduler for LLM calls: interactive before blocking before background
+"""
+
+import os
+import time
+import threading
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+# Lower rank is served first
+PRIORITIES = {
+    "interactive": 0,  # Chat-style turns a user is actively waiting on
+    "blocking": 1,     # Generations behind a spinner (portfolio, parsing, cover letter)
+    "background": 2    # Batch jobs and regenerations nobody is watching
+}
+
+DEFAULT_TASK_PRIORITIES = {
+    "career_coach": "interactive",
+    "interview_feedback": "interactive",
+    "interview_questions": "blocking",
+    "cover_letter": "blocking",
+    "optimizer": "blocking",
+    "resume_parse": "blocking",
+    "linkedin_parse": "blocking",
+    "portfolio": "blocking"
+}
+
+_session_id: ContextVar[Optional[str]] = ContextVar("llm_session_id", default=None)
+_priority: ContextVar[Optional[str]] = ContextVar("llm_priority", default=None)
+_user_id: ContextVar[Optional[str]] = ContextVar("llm_user_id", default=None)
+
+
+@contextmanager
+def llm_context(
+    session_id: Optional[str] = None,
+    priority: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> Iterator[None]:
+    """
+    Attribute LLM calls made inside the block to a session, user and/or priority
+
+    Token usage is billed to `user_id` if set, else to the session.
+
+    Example:
+        with llm_context(priority="background"):
+            generator.generate_portfolio_with_fallback(profile)
+    """
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+    tokens = []
+    if session_id is not None:
+        tokens.append((_session_id, _session_id.set(session_id)))
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    if user_id is not None:
+        tokens.append((_user_id, _user_id.set(user_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_session() -> Optional[str]:
+    return _session_id.get()
+
+
+def current_priority() -> Optional[str]:
+    return _priority.get()
+
+
+def current_user() -> Optional[str]:
+    return _user_id.get()
+
+
+@dataclass
+class Ticket:
+    """One request waiting for (or holding) a scheduler slot"""
+    priority: str
+    session: str
+    model: str
+    cost: float
+    finish: float
+    seq: int
+    enqueued: float
+    has_capacity: Optional[Callable[[], bool]] = None
+    admitted: Optional[float] = None
+    wait: float = field(default=0.0)
+
+
+class LLMScheduler:
+    """
+    Admits LLM requests by priority class, fairly across sessions
+
+    Requests wait here instead of in the rate limiter, so a late interactive
+    message can overtake a queue of large background calls. Within a class,
+    sessions share service by weighted fair queueing: each request gets a
+    virtual finish tag of max(class clock, session's last tag) + cost, where
+    cost is its estimated tokens, so one session's 8000-token generations
+    don't crowd out another session's short calls.
+
+    Non-interactive requests are also held while the rate limiter has no
+    headroom for them (up to `max_hold` seconds), and `reserved_slots` slots
+    are only ever given to interactive requests. A waiter is promoted one
+    class for every `aging_seconds` it has waited, so nothing starves.
+    """
+
+    def __init__(
+        self,
+        slots: int = 8,
+        reserved_slots: int = 2,
+        aging_seconds: float = 20.0,
+        max_hold: float = 30.0,
+        poll_interval: float = 0.25
+    ):
+        """
+        Args:
+            slots: Max requests in flight across all classes
+            reserved_slots: Slots kept free for interactive requests
+            aging_seconds: Wait after which a request is promoted one class
+            max_hold: Max seconds a request is held back for rate-limit headroom
+            poll_interval: How often waiters re-check headroom
+        """
+        self.slots = max(1, slots)
+        self.reserved_slots = min(max(0, reserved_slots), self.slots - 1)
+        self.aging_seconds = aging_seconds
+        self.max_hold = max_hold
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: List[Ticket] = []
+        self._active = 0
+        self._clock = {name: 0.0 for name in PRIORITIES}
+        self._last_finish: Dict[tuple, float] = {}
+        self._counts = {
+            name: {"admitted": 0, "timed_out": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for name in PRIORITIES
+        }
+
+    def acquire(
+        self,
+        priority: str,
+        session: Optional[str],
+        model: str,
+        cost_tokens: int,
+        has_capacity: Optional[Callable[[], bool]] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Ticket]:
+        """
+        Block until the request may be sent
+
+        Args:
+            priority: 'interactive', 'blocking' or 'background'
+            session: Session the request belongs to (None = shared)
+            model: Model name, for stats
+            cost_tokens: Estimated tokens (prompt + max_tokens)
+            has_capacity: Returns True if the rate limiter can take the request now
+            timeout: Give up after this many seconds
+
+        Returns:
+            Ticket to pass to release(), or None on timeout
+        """
+        if priority not in PRIORITIES:
+            priority = "blocking"
+        session = session or "-"
+        cost = max(1, cost_tokens) / 1000.0
+
+        with self._cond:
+            start = max(self._clock[priority], self._last_finish.get((priority, session), 0.0))
+            ticket = Ticket(
+                priority=priority, session=session, model=model, cost=cost,
+                finish=start + cost, seq=next(self._seq), enqueued=time.monotonic(),
+                has_capacity=has_capacity
+            )
+            self._last_finish[(priority, session)] = ticket.finish
+            self._waiting.append(ticket)
+            deadline = None if timeout is None else ticket.enqueued + timeout
+
+            while self._next() is not ticket:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    self._waiting.remove(ticket)
+                    self._counts[priority]["timed_out"] += 1
+                    self._cond.notify_all()
+                    return None
+                wait = self.poll_interval
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                self._cond.wait(wait)
+
+            self._waiting.remove(ticket)
+            self._active += 1
+            ticket.admitted = time.monotonic()
+            ticket.wait = ticket.admitted - ticket.enqueued
+            self._clock[priority] = max(self._clock[priority], ticket.finish - ticket.cost)
+            if len(self._last_finish) > 1000:
+                # Sessions whose tags are behind the clock get no head start; forget them
+                self._last_finish = {
+                    key: finish for key, finish in self._last_finish.items() if finish > self._clock[key[0]]
+                }
+            counts = self._counts[priority]
+            counts["admitted"] += 1
+            counts["total_wait"] += ticket.wait
+            counts["max_wait"] = max(counts["max_wait"], ticket.wait)
+            # Others may now be admissible too (a free slot for another class)
+            self._cond.notify_all()
+        return ticket
+
+    def release(self, ticket: Optional[Ticket]) -> None:
+        """Free the slot held by an admitted ticket"""
+        if ticket is None or ticket.admitted is None:
+            return
+        with self._cond:
+            ticket.admitted = None
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _rank(self, ticket: Ticket, now: float) -> int:
+        promotions = int((now - ticket.enqueued) // self.aging_seconds) if self.aging_seconds > 0 else 0
+        return max(0, PRIORITIES[ticket.priority] - promotions)
+
+    def _admissible(self, ticket: Ticket, rank: int, now: float) -> bool:
+        if rank == 0 and ticket.priority == "interactive":
+            return self._active < self.slots
+        if self._active >= self.slots - self.reserved_slots:
+            return False
+        if ticket.has_capacity is None or now - ticket.enqueued >= self.max_hold:
+            return True
+        return ticket.has_capacity()
+
+    def _next(self) -> Optional[Ticket]:
+        """The waiter to admit now, if any (called with the lock held)"""
+        if self._active >= self.slots:
+            return None
+        now = time.monotonic()
+        ranked = sorted(self._waiting, key=lambda t: (self._rank(t, now), t.finish, t.seq))
+        for ticket in ranked:
+            if self._admissible(ticket, self._rank(ticket, now), now):
+                return ticket
+        return None
+
+    def depths(self) -> Dict[str, int]:
+        """Requests waiting per priority class"""
+        with self._cond:
+            depths = {name: 0 for name in PRIORITIES}
+            for ticket in self._waiting:
+                depths[ticket.priority] += 1
+            return depths
+
+    def stats(self) -> Dict[str, Any]:
+        """Slots in use, queue depth and wait times per priority class"""
+        depths = self.depths()
+        with self._cond:
+            classes = {
+                name: {
+                    "waiting": depths[name],
+                    "admitted": counts["admitted"],
+                    "timed_out": counts["timed_out"],
+                    "avg_wait": counts["total_wait"] / counts["admitted"] if counts["admitted"] else 0.0,
+                    "max_wait": counts["max_wait"]
+                }
+                for name, counts in self._counts.items()
+            }
+            return {
+                "slots": self.slots,
+                "reserved_slots": self.reserved_slots,
+                "active": self._active,
+                "sessions_waiting": len({ticket.session for ticket in self._waiting}),
+                "classes": classes
+            }
+
+
+def parse_task_priorities(spec: str) -> Dict[str, str]:
+    """Parse GROQ_TASK_PRIORITIES, e.g. "portfolio=background,optimizer=interactive" """
+    priorities = {}
+    for item in spec.split(","):
+        if "=" in item:
+            task, priority = (part.strip() for part in item.split("=", 1))
+            if task and priority in PRIORITIES:
+                priorities[task] = priority
+    return priorities
+
+
+# Singleton instance
+_scheduler = None
+_task_priorities = None
+
+
+def task_priority(task: Optional[str]) -> str:
+    """
+    Priority class of a call: the enclosing llm_context if set, else the
+    task's default (GROQ_TASK_PRIORITIES overrides), else 'blocking'
+    """
+    global _task_priorities
+    priority = current_priority()
+    if priority:
+        return priority
+    if _task_priorities is None:
+        _task_priorities = {**DEFAULT_TASK_PRIORITIES, **parse_task_priorities(os.getenv("GROQ_TASK_PRIORITIES", ""))}
+    return _task_priorities.get(task or "", "blocking")
+
+
+def get_scheduler() -> Optional[LLMScheduler]:
+    """
+    Get or create the process-wide scheduler
+
+    Returns None if GROQ_SCHEDULER_ENABLED is set to a false value.
+    """
+    global _scheduler
+    if os.getenv("GROQ_SCHEDULER_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            slots=int(os.getenv("GROQ_SCHEDULER_SLOTS", 8)),
+            reserved_slots=int(os.getenv("GROQ_SCHEDULER_RESERVED", 2)),
+            aging_seconds=float(os.getenv("GROQ_SCHEDULER_AGING", 20)),
+            max_hold=float(os.getenv("GROQ_SCHEDULER_MAX_HOLD", 30))
+        )
+    return _scheduler
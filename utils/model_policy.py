@@ -0,0 +1,121 @@
+"""
+Per-task model policy: which model, token budget and temperature each LLM task uses
+"""
+
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional
+
+
+@dataclass(frozen=True)
+class TaskModel:
+    """Model settings for one task"""
+    model: str
+    max_tokens: int
+    temperature: float
+
+
+# Defaults match what each call site used before the policy existed
+DEFAULT_TASK_MODELS = {
+    "resume_parse": TaskModel("8b", 2048, 0.2),
+    "linkedin_parse": TaskModel("8b", 2048, 0.2),
+    "portfolio": TaskModel("70b", 8000, 0.7),
+    "cover_letter": TaskModel("70b", 800, 0.7),
+    "optimizer": TaskModel("70b", 1500, 0.3),
+    "interview_questions": TaskModel("70b", 2048, 0.3),
+    "interview_feedback": TaskModel("70b", 2048, 0.3),
+    "career_coach": TaskModel("70b", 2048, 0.7),
+}
+
+# Tasks that follow the dashboard's model selector; parsing stays on the
+# operator's choice since it is extraction rather than writing
+GENERATION_TASKS = frozenset({
+    "portfolio",
+    "cover_letter",
+    "optimizer",
+    "interview_questions",
+    "interview_feedback",
+    "career_coach"
+})
+
+MODEL_KEYS = ("8b", "70b", "mixtral")
+
+
+def parse_task_models(spec: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse GROQ_TASK_MODELS, e.g. "portfolio=8b:6000,cover_letter=8b"
+
+    Returns:
+        {task: {"model": str, "max_tokens": int (optional)}}
+    """
+    overrides = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        task, value = (part.strip() for part in item.split("=", 1))
+        model, _, max_tokens = value.partition(":")
+        if not task or model not in MODEL_KEYS:
+            continue
+        overrides[task] = {"model": model}
+        if max_tokens.strip().isdigit():
+            overrides[task]["max_tokens"] = int(max_tokens)
+    return overrides
+
+
+class ModelPolicy:
+    """
+    Resolves the model settings for each task
+
+    The operator's policy (GROQ_TASK_MODELS) is process-wide; a session can
+    derive a copy with with_model() that points every generation task at
+    the model picked in the dashboard.
+    """
+
+    def __init__(self, tasks: Dict[str, TaskModel], selected_model: Optional[str] = None):
+        """
+        Args:
+            tasks: Settings per task
+            selected_model: Model key overriding GENERATION_TASKS, or None
+        """
+        self.tasks = tasks
+        self.selected_model = selected_model
+
+    def with_model(self, model: Optional[str]) -> "ModelPolicy":
+        """Copy of this policy with the user's model choice ('auto'/None keeps per-task defaults)"""
+        if model not in MODEL_KEYS:
+            model = None
+        return ModelPolicy(self.tasks, selected_model=model)
+
+    def for_task(self, task: str) -> TaskModel:
+        settings = self.tasks.get(task) or TaskModel("8b", 2048, 0.3)
+        if self.selected_model and task in GENERATION_TASKS:
+            settings = replace(settings, model=self.selected_model)
+        return settings
+
+    def model(self, task: str) -> str:
+        return self.for_task(task).model
+
+    def params(self, task: str) -> Dict[str, Any]:
+        """Keyword arguments for GroqClient calls: model, max_tokens, temperature"""
+        settings = self.for_task(task)
+        return {
+            "model": settings.model,
+            "max_tokens": settings.max_tokens,
+            "temperature": settings.temperature
+        }
+
+
+# Singleton instance
+_model_policy = None
+
+
+def get_model_policy() -> ModelPolicy:
+    """Get or create the operator's policy (defaults plus GROQ_TASK_MODELS)"""
+    global _model_policy
+    if _model_policy is None:
+        tasks = dict(DEFAULT_TASK_MODELS)
+        for task, override in parse_task_models(os.getenv("GROQ_TASK_MODELS", "")).items():
+            base = tasks.get(task, TaskModel("8b", 2048, 0.3))
+            tasks[task] = replace(base, **override)
+        _model_policy = ModelPolicy(tasks)
+    return _model_policy
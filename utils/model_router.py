@@ -0,0 +1,195 @@
+"""
+Model cascade routing: try the fast model first, escalate when its output fails validation
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+
+# A validator returns an error message, or None if the output is acceptable
+Validator = Callable[[Any], Optional[str]]
+
+# Tasks whose callers ask for 70b but whose output is checked before use
+DEFAULT_CASCADES = {
+    task: ["8b", "70b"]
+    for task in (
+        "optimizer",
+        "interview_questions",
+        "interview_feedback",
+        "career_coach",
+        "cover_letter",
+        "portfolio"
+    )
+}
+
+
+def schema_validator(schema: type) -> Validator:
+    """Validate parsed JSON against a Pydantic model"""
+    def validate(data: Any) -> Optional[str]:
+        if not isinstance(data, dict):
+            return f"Expected a JSON object for {schema.__name__}"
+        try:
+            schema(**data)
+        except ValidationError as e:
+            return f"{schema.__name__}: {e.error_count()} validation error(s)"
+        return None
+    return validate
+
+
+def text_validator(min_chars: int = 1) -> Validator:
+    """Reject empty or suspiciously short free-text answers"""
+    def validate(content: Any) -> Optional[str]:
+        if not isinstance(content, str) or len(content.strip()) < min_chars:
+            return f"Response shorter than {min_chars} characters"
+        return None
+    return validate
+
+
+def parse_cascades(spec: str) -> Dict[str, List[str]]:
+    """
+    Parse GROQ_CASCADE_TASKS, e.g. "portfolio=8b>70b,optimizer=8b>mixtral>70b"
+    """
+    cascades = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        task, chain = item.split("=", 1)
+        models = [model.strip() for model in chain.split(">") if model.strip()]
+        if task.strip() and models:
+            cascades[task.strip()] = models
+    return cascades
+
+
+class ModelRouter:
+    """
+    Per-task model cascades with escalation-rate tracking
+
+    route() returns the models to try in order: the cheaper models of the
+    task's cascade up to and including the one the caller asked for. If the
+    first model has failed validation for at least `skip_rate` of recent
+    calls, the router goes straight to the next model (probing the fast one
+    every `probe_every` calls so it can recover).
+    """
+
+    def __init__(
+        self,
+        cascades: Dict[str, List[str]],
+        skip_rate: float = 0.5,
+        min_samples: int = 10,
+        probe_every: int = 10,
+        window: int = 50
+    ):
+        self.cascades = cascades
+        self.skip_rate = skip_rate
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self.window = window
+        self._lock = threading.Lock()
+        self._outcomes: Dict[str, deque] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _task_stats(self, task: str) -> Dict[str, Any]:
+        stats = self._stats.get(task)
+        if stats is None:
+            stats = self._stats[task] = {
+                "calls": 0,
+                "escalations": 0,
+                "skipped": 0,
+                "by_model": {},
+                "last_errors": deque(maxlen=5)
+            }
+        return stats
+
+    def _failure_rate(self, task: str) -> Optional[float]:
+        outcomes = self._outcomes.get(task)
+        if not outcomes or len(outcomes) < self.min_samples:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+    def route(self, task: Optional[str], model: str) -> List[str]:
+        """Models to try for a call that asked for `model`"""
+        cascade = self.cascades.get(task) if task else None
+        if not cascade or model not in cascade:
+            return [model]
+
+        models = cascade[:cascade.index(model) + 1]
+        if len(models) == 1:
+            return models
+
+        with self._lock:
+            stats = self._task_stats(task)
+            stats["calls"] += 1
+            rate = self._failure_rate(task)
+            if rate is not None and rate >= self.skip_rate and stats["calls"] % self.probe_every:
+                stats["skipped"] += 1
+                return models[1:]
+        return models
+
+    def record(self, task: Optional[str], model: str, error: Optional[str]) -> None:
+        """Record whether `model`'s output for `task` passed validation"""
+        cascade = self.cascades.get(task) if task else None
+        if not cascade:
+            return
+
+        with self._lock:
+            stats = self._task_stats(task)
+            by_model = stats["by_model"].setdefault(model, {"attempts": 0, "failures": 0})
+            by_model["attempts"] += 1
+            if error:
+                by_model["failures"] += 1
+                stats["last_errors"].append(f"{model}: {error}")
+
+            if model == cascade[0]:
+                outcomes = self._outcomes.get(task)
+                if outcomes is None:
+                    outcomes = self._outcomes[task] = deque(maxlen=self.window)
+                outcomes.append(bool(error))
+                if error:
+                    stats["escalations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-task calls, escalation rate and per-model failure counts"""
+        with self._lock:
+            result = {}
+            for task, stats in self._stats.items():
+                first = stats["by_model"].get(self.cascades[task][0], {"attempts": 0})
+                result[task] = {
+                    "cascade": self.cascades[task],
+                    "calls": stats["calls"],
+                    "escalations": stats["escalations"],
+                    "escalation_rate": stats["escalations"] / first["attempts"] if first["attempts"] else 0.0,
+                    "recent_failure_rate": self._failure_rate(task),
+                    "skipped": stats["skipped"],
+                    "by_model": {model: dict(counts) for model, counts in stats["by_model"].items()},
+                    "last_errors": list(stats["last_errors"])
+                }
+            return result
+
+
+# Singleton instance
+_model_router = None
+
+
+def get_model_router() -> Optional[ModelRouter]:
+    """
+    Get or create the process-wide router
+
+    Returns None unless GROQ_MODEL_CASCADE is set (cascading is opt-in).
+    """
+    global _model_router
+    if os.getenv("GROQ_MODEL_CASCADE", "").lower() not in ("1", "true", "yes"):
+        return None
+
+    if _model_router is None:
+        cascades = dict(DEFAULT_CASCADES)
+        cascades.update(parse_cascades(os.getenv("GROQ_CASCADE_TASKS", "")))
+        _model_router = ModelRouter(
+            cascades,
+            skip_rate=float(os.getenv("GROQ_CASCADE_SKIP_RATE", 0.5)),
+            min_samples=int(os.getenv("GROQ_CASCADE_MIN_SAMPLES", 10))
+        )
+    return _model_router
@@ -0,0 +1,561 @@
+"""
+Tiered PDF text extraction: a fast pass, a quality gate, then layout analysis
+
+Most résumés are single-column PDFs whose text PyPDF2 reads straight from the
+content streams in a few milliseconds per page. pdfplumber's layout analysis
+is 20-30x slower and only pays off when that fast text is bad (glued or
+letter-spaced words, broken ligatures, interleaved columns, missing glyphs),
+so it runs only when the fast pass fails the quality check.
+
+Uploads may be 80-page portfolios, but the résumé parser only needs the
+first few thousand tokens. Both tiers stop at a page/character budget, and
+pdfplumber pages are closed as soon as their text is read so their parsed
+objects and layout don't accumulate for the whole document. Each
+extraction's peak resident memory is sampled and reported.
+
+pdfplumber is pure Python and CPU-bound, so threads don't help; long CVs and
+portfolio PDFs are split into page ranges that worker processes extract
+independently, and the text is reassembled in page order. This module is
+kept free of Streamlit and app imports because every worker process
+imports it.
+"""
+
+import io
+import os
+import re
+import math
+import sys
+import time
+import threading
+import multiprocessing
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+import PyPDF2
+import pdfplumber
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Words PyPDF2 splits where a font maps fi/fl/ff ligatures to nothing
+# ("e cient", "o ce", "pro le", "con g", "work ow", "speci c")
+_BROKEN_LIGATURE = re.compile(
+    r"\b(?:e|su|o|di|pro|speci|signi|certi|identi|modi|quali|con|work|over)\s"
+    r"(?:cient|ciency|ce|ces|cial|erent|ective|ort|orts|le|les|c|cant|cation|cations|ed|g|ow|ows|ered)\b",
+    re.IGNORECASE
+)
+_BAD_GLYPH = re.compile(r"\ufffd|\(cid:\d+\)|/uni[0-9A-F]{4}")
+_COLUMN_GAP = re.compile(r"\S {3,}\S")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_pages(pages, read, max_pages: int = 0, max_chars: int = 0) -> Tuple[List[str], bool]:
+    """
+    Text of `pages` in order until a budget is reached (0 = no limit)
+
+    The budget is checked before each page, so the page that crosses
+    `max_chars` is kept whole.
+
+    Returns:
+        (one string per page read, whether pages were left unread)
+    """
+    texts: List[str] = []
+    chars = 0
+    for page in pages:
+        if (max_pages and len(texts) >= max_pages) or (max_chars and chars >= max_chars):
+            return texts, True
+        text = read(page)
+        texts.append(text)
+        chars += len(text)
+    return texts, False
+
+
+def _layout_text(page) -> str:
+    try:
+        return page.extract_text() or ""
+    finally:
+        # Drops the page's parsed objects, edges and layout; pdfplumber
+        # otherwise keeps them until the whole document is closed
+        page.close()
+
+
+def extract_page_range(
+    file_bytes: bytes,
+    start: int = 0,
+    stop: Optional[int] = None,
+    max_chars: int = 0
+) -> List[str]:
+    """Text of pages [start, stop), '' for pages without text (runs in workers)"""
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return _read_pages(pdf.pages[start:stop], _layout_text, max_chars=max_chars)[0]
+
+
+def extract_layout(file_bytes: bytes, max_pages: int = 0, max_chars: int = 0) -> Tuple[List[str], bool]:
+    """Text of pages in order with pdfplumber, within budget; (pages, truncated)"""
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return _read_pages(pdf.pages, _layout_text, max_pages, max_chars)
+
+
+def extract_fast(file_bytes: bytes, max_pages: int = 0, max_chars: int = 0) -> Tuple[List[str], bool]:
+    """Text of pages straight from the content streams (PyPDF2, no layout analysis); (pages, truncated)"""
+    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+    # NFKC turns ligature glyphs (U+FB01 "ﬁ") back into letters
+    return _read_pages(
+        reader.pages, lambda page: unicodedata.normalize("NFKC", page.extract_text() or ""),
+        max_pages, max_chars
+    )
+
+
+def current_rss() -> Optional[int]:
+    """Resident memory of this process in bytes (None where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss() -> int:
+    """Lifetime peak RSS in bytes (ru_maxrss is KiB on Linux, bytes on macOS; 0 on Windows)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRSS:
+    """
+    Samples this process's resident memory while a block runs
+
+    pdfplumber allocates in bursts while laying out a page and frees them
+    when the page is closed, so before/after readings miss the peak; a
+    background thread polls /proc/self/statm instead. Without /proc, the
+    lifetime ru_maxrss high-water mark is used, which only moves when the
+    block sets a new process-wide peak. RSS is per process: other threads'
+    allocations count, and pool workers' memory does not.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start: Optional[int] = None
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "PeakRSS":
+        self.start = current_rss()
+        if self.start is None:
+            self.start = self.peak = _max_rss()
+        else:
+            self.peak = self.start
+            self._thread = threading.Thread(target=self._sample, name="pdf-rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._observe(current_rss())
+
+    def _observe(self, rss: Optional[int]) -> None:
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def __exit__(self, *exc_info) -> None:
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._observe(current_rss())
+        else:
+            self._observe(_max_rss())
+
+    def report(self) -> Dict[str, float]:
+        """{"peak_rss_mb": float, "rss_delta_mb": float} (delta = peak above the starting RSS)"""
+        return {
+            "peak_rss_mb": round(self.peak / 2 ** 20, 1),
+            "rss_delta_mb": round((self.peak - self.start) / 2 ** 20, 1)
+        }
+
+
+def assess_text_quality(pages: List[str]) -> Dict[str, Any]:
+    """
+    Score extracted text from 0 (garbage) to 1 (clean)
+
+    Each problem found multiplies the score down:
+    sparse (little text per page: scanned or image-based), symbols (few
+    letters), glued_words / spaced_letters (word boundaries lost),
+    bad_glyphs (unmapped characters), broken_ligatures, and
+    interleaved_columns (lines that jump across a column gap).
+
+    Returns:
+        {"score": float, "reasons": [str, ...], "chars_per_page": float}
+    """
+    text = "\n".join(pages)
+    visible = sum(1 for char in text if not char.isspace())
+    chars_per_page = visible / max(1, len(pages))
+    score = 1.0
+    reasons = []
+
+    def penalize(reason: str, factor: float) -> None:
+        nonlocal score
+        score *= factor
+        reasons.append(reason)
+
+    if chars_per_page < 100:
+        penalize("sparse", 0.3)
+    if visible:
+        letters = sum(1 for char in text if char.isalpha())
+        if letters / visible < 0.6:
+            penalize("symbols", 0.5)
+
+    words = text.split()
+    if words:
+        average = sum(len(word) for word in words) / len(words)
+        if average > 10:
+            penalize("glued_words", 0.4)
+        if sum(1 for word in words if len(word) == 1 and word.isalpha()) / len(words) > 0.3:
+            penalize("spaced_letters", 0.4)
+
+    if visible and len(_BAD_GLYPH.findall(text)) / visible > 0.001:
+        penalize("bad_glyphs", 0.3)
+    if len(_BROKEN_LIGATURE.findall(text)) >= 2:
+        penalize("broken_ligatures", 0.6)
+
+    lines = [line for line in text.split("\n") if line.strip()]
+    if lines and sum(1 for line in lines if _COLUMN_GAP.search(line)) / len(lines) > 0.25:
+        penalize("interleaved_columns", 0.5)
+
+    return {"score": round(score, 3), "reasons": reasons, "chars_per_page": round(chars_per_page, 1)}
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class PDFPageExtractor:
+    """
+    Extracts PDF text page by page, in parallel for long documents
+
+    Documents shorter than `min_pages` are extracted in the calling thread
+    (a one-page résumé costs less than shipping it to a worker). Longer ones
+    are cut into about two page ranges per worker so a few slow pages don't
+    leave other workers idle. If the pool breaks or times out, the document
+    is extracted sequentially instead.
+
+    Workers are started with forkserver/spawn rather than fork: the app
+    process is multi-threaded (Streamlit, the Groq client), and forking it
+    can deadlock on locks held by other threads.
+    """
+
+    def __init__(self, workers: int, min_pages: int = 8, timeout: float = 120.0):
+        """
+        Args:
+            workers: Worker processes in the pool
+            min_pages: Smallest document extracted in parallel
+            timeout: Seconds to wait for all ranges before falling back
+        """
+        self.workers = max(1, workers)
+        self.min_pages = max(2, min_pages)
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counts = {"sequential": 0, "parallel": 0, "fallbacks": 0, "pages": 0}
+
+    def extract(self, file_bytes: bytes, max_pages: int = 0, max_chars: int = 0) -> Tuple[List[str], bool]:
+        """
+        Text of pages in order, up to `max_pages` pages / about `max_chars`
+        characters (0 = no limit)
+
+        Returns:
+            (one string per page read, '' for pages without text; whether pages were left unread)
+        """
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            page_count = len(pdf.pages)
+            if page_count < self.min_pages or self.workers == 1:
+                pages, truncated = _read_pages(pdf.pages, _layout_text, max_pages, max_chars)
+                self._count("sequential", len(pages))
+                return pages, truncated
+
+        wanted = min(page_count, max_pages) if max_pages else page_count
+        try:
+            pages = self._extract_parallel(file_bytes, wanted, max_chars)
+        except (BrokenProcessPool, FutureTimeoutError, OSError):
+            self._reset_pool()
+            self._count("fallbacks", 0)
+            return extract_layout(file_bytes, max_pages, max_chars)
+        self._count("parallel", len(pages))
+        return pages, len(pages) < page_count
+
+    def _extract_parallel(self, file_bytes: bytes, page_count: int, max_chars: int = 0) -> List[str]:
+        pool = self._get_pool()
+        futures = [
+            pool.submit(extract_page_range, file_bytes, start, stop, max_chars)
+            for start, stop in self.page_ranges(page_count)
+        ]
+        try:
+            pages: List[str] = []
+            chars = 0
+            for future in futures:
+                if max_chars and chars >= max_chars:
+                    # Enough text: ranges not yet started are cancelled below
+                    break
+                texts = future.result(timeout=self.timeout)
+                pages.extend(texts)
+                chars += sum(len(text) for text in texts)
+            return pages
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """[start, stop) ranges covering the document, about two per worker"""
+        size = max(1, math.ceil(page_count / (self.workers * 2)))
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, mode: str, pages: int) -> None:
+        with self._lock:
+            self._counts[mode] += 1
+            self._counts["pages"] += pages
+
+    def warm_up(self) -> None:
+        """Start the worker processes now instead of on the first long PDF"""
+        pool = self._get_pool()
+        for future in [pool.submit(available_cpus) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        self._reset_pool()
+
+    def stats(self) -> Dict[str, Any]:
+        """Documents extracted per mode, pages seen and pool settings"""
+        with self._lock:
+            return {
+                **self._counts,
+                "workers": self.workers,
+                "min_pages": self.min_pages,
+                "pool_started": self._pool is not None
+            }
+
+
+class TieredPDFExtractor:
+    """
+    Fast pass first, layout analysis only when the fast text looks bad
+
+    Keeps per-tier run counts and timings, estimates the time the fast path
+    saved from the layout tier's observed seconds per page, and tracks how
+    many documents hit the page/character budget and their peak memory.
+    """
+
+    def __init__(
+        self,
+        parallel: Optional[PDFPageExtractor] = None,
+        fast_path: bool = True,
+        min_quality: float = 0.7,
+        max_pages: int = 0,
+        max_chars: int = 0
+    ):
+        """
+        Args:
+            parallel: Page-parallel pool for the layout tier (None = sequential)
+            fast_path: Try PyPDF2 first; if False, pdfplumber runs first and
+                PyPDF2 is only a fallback for documents it finds no text in
+            min_quality: Lowest assess_text_quality score accepted from the fast pass
+            max_pages / max_chars: Stop reading once this many pages or
+                characters have been extracted (0 = no limit)
+        """
+        self.parallel = parallel
+        self.fast_path = fast_path
+        self.min_quality = min_quality
+        self.max_pages = max(0, max_pages)
+        self.max_chars = max(0, max_chars)
+        self._lock = threading.Lock()
+        self._tiers = {tier: {"runs": 0, "seconds": 0.0, "pages": 0} for tier in ("fast", "layout")}
+        self._accepted = 0
+        self._rejected: Counter = Counter()
+        self._saved_pages = 0
+        self._saved_fast_seconds = 0.0
+        self._documents = 0
+        self._truncated = 0
+        self._memory: Dict[str, Optional[float]] = {
+            "last_peak_rss_mb": None, "last_rss_delta_mb": None, "max_rss_delta_mb": None
+        }
+
+    def extract(self, file_bytes: bytes) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Text of pages in order, within the page/character budget
+
+        Returns:
+            (one string per page read, {"tier": 'fast' or 'layout', "quality": dict or None,
+             "seconds": {tier: float}, "pages": int, "truncated": bool,
+             "peak_rss_mb": float, "rss_delta_mb": float})
+        """
+        report: Dict[str, Any] = {"tier": None, "quality": None, "seconds": {}}
+        with PeakRSS() as rss:
+            pages, truncated = self._extract(file_bytes, report)
+        report.update(pages=len(pages), truncated=truncated, **rss.report())
+        self._record_document(report)
+        return pages, report
+
+    def _extract(self, file_bytes: bytes, report: Dict[str, Any]) -> Tuple[List[str], bool]:
+        fast: Tuple[List[str], bool] = ([], False)
+
+        if self.fast_path:
+            try:
+                fast = self._timed("fast", report, extract_fast, file_bytes)
+            except Exception:
+                fast = ([], False)
+            if fast[0]:
+                report["quality"] = assess_text_quality(fast[0])
+                if report["quality"]["score"] >= self.min_quality:
+                    self._record_accepted(len(fast[0]), report["seconds"]["fast"])
+                    report["tier"] = "fast"
+                    return fast
+                self._record_rejected(report["quality"]["reasons"] or ["low_score"])
+
+        layout = self.parallel.extract if self.parallel else extract_layout
+        pages, truncated = self._timed("layout", report, layout, file_bytes)
+        report["tier"] = "layout"
+
+        if not any(page.strip() for page in pages):
+            # Layout analysis found nothing: keep whatever the content streams had
+            if not self.fast_path:
+                fast = self._timed("fast", report, extract_fast, file_bytes)
+            if any(page.strip() for page in fast[0]):
+                report["tier"] = "fast"
+                return fast
+        return pages, truncated
+
+    def _timed(self, tier: str, report: Dict[str, Any], extract, file_bytes: bytes) -> Tuple[List[str], bool]:
+        start = time.perf_counter()
+        try:
+            pages, truncated = extract(file_bytes, self.max_pages, self.max_chars)
+        finally:
+            seconds = time.perf_counter() - start
+            report["seconds"][tier] = seconds
+            with self._lock:
+                counts = self._tiers[tier]
+                counts["runs"] += 1
+                counts["seconds"] += seconds
+        with self._lock:
+            self._tiers[tier]["pages"] += len(pages)
+        return pages, truncated
+
+    def _record_document(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self._documents += 1
+            self._truncated += report["truncated"]
+            self._memory["last_peak_rss_mb"] = report["peak_rss_mb"]
+            self._memory["last_rss_delta_mb"] = report["rss_delta_mb"]
+            self._memory["max_rss_delta_mb"] = max(self._memory["max_rss_delta_mb"] or 0.0, report["rss_delta_mb"])
+
+    def _record_accepted(self, pages: int, seconds: float) -> None:
+        with self._lock:
+            self._accepted += 1
+            self._saved_pages += pages
+            self._saved_fast_seconds += seconds
+
+    def _record_rejected(self, reasons: List[str]) -> None:
+        with self._lock:
+            self._rejected.update(reasons)
+            self._rejected["documents"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Runs, seconds and pages per tier, fast-path acceptance, estimated time
+        saved, budget truncations and peak memory
+        """
+        with self._lock:
+            tiers = {
+                tier: {
+                    **counts,
+                    "ms_per_page": 1000 * counts["seconds"] / counts["pages"] if counts["pages"] else None
+                }
+                for tier, counts in self._tiers.items()
+            }
+            layout_per_page = tiers["layout"]["ms_per_page"]
+            saved = None
+            if layout_per_page is not None:
+                saved = self._saved_pages * layout_per_page / 1000 - self._saved_fast_seconds
+            documents = self._accepted + self._rejected["documents"]
+            return {
+                "tiers": tiers,
+                "fast_path": self.fast_path,
+                "min_quality": self.min_quality,
+                "fast_accepted": self._accepted,
+                "fast_accept_rate": self._accepted / documents if documents else None,
+                "fast_rejected_reasons": {k: v for k, v in self._rejected.items() if k != "documents"},
+                "estimated_seconds_saved": saved,
+                "max_pages": self.max_pages,
+                "max_chars": self.max_chars,
+                "documents": self._documents,
+                "truncated": self._truncated,
+                **self._memory,
+                "parallel": self.parallel.stats() if self.parallel else None
+            }
+
+
+# Singleton instances
+_parallel_extractor = None
+_pdf_extractor = None
+
+
+def get_parallel_extractor() -> Optional[PDFPageExtractor]:
+    """
+    Get or create the page-parallel extractor
+
+    Returns None if PDF_EXTRACT_WORKERS (default: CPUs, at most 4) is 1 or
+    less; callers then extract sequentially.
+    """
+    global _parallel_extractor
+    workers = int(os.getenv("PDF_EXTRACT_WORKERS", min(4, available_cpus())))
+    if workers <= 1:
+        return None
+
+    if _parallel_extractor is None:
+        _parallel_extractor = PDFPageExtractor(
+            workers=workers,
+            min_pages=int(os.getenv("PDF_PARALLEL_MIN_PAGES", 8)),
+            timeout=float(os.getenv("PDF_EXTRACT_TIMEOUT", 120))
+        )
+    return _parallel_extractor
+
+
+def get_pdf_extractor() -> TieredPDFExtractor:
+    """
+    Get or create the tiered extractor (PDF_FAST_PATH, PDF_FAST_PATH_MIN_QUALITY,
+    PDF_MAX_PAGES, PDF_MAX_CHARS)
+    """
+    global _pdf_extractor
+    if _pdf_extractor is None:
+        _pdf_extractor = TieredPDFExtractor(
+            parallel=get_parallel_extractor(),
+            fast_path=os.getenv("PDF_FAST_PATH", "true").lower() not in ("0", "false", "no"),
+            min_quality=float(os.getenv("PDF_FAST_PATH_MIN_QUALITY", 0.7)),
+            max_pages=int(os.getenv("PDF_MAX_PAGES", 30)),
+            max_chars=int(os.getenv("PDF_MAX_CHARS", 60000))
+        )
+    return _pdf_extractor
@@ -9,6 +9,7 @@ import streamlit as st
 import bleach
 
 from utils.groq_client import get_groq_client
+from utils.model_policy import get_model_policy, ModelPolicy
 from prompts.prompts import PORTFOLIO_GENERATOR_PROMPT
 
 
@@ -35,8 +36,9 @@ class PortfolioGenerator:
         'path': ['d', 'fill', 'stroke']
     }
 
-    def __init__(self):
+    def __init__(self, policy: Optional[ModelPolicy] = None):
         self.groq_client = get_groq_client()
+        self.policy = policy or get_model_policy()
 
     def generate_subdomain(self, name: str, user_id: Optional[str] = None) -> str:
         """
@@ -145,6 +147,14 @@ class PortfolioGenerator:
             st.warning(f"HTML sanitization warning: {e}")
             return html_content
 
+    def extract_html(self, content: str) -> str:
+        """Strip markdown code fences the model may wrap HTML in"""
+        if "```html" in content:
+            return content.split("```html")[1].split("```")[0].strip()
+        elif "```" in content:
+            return content.split("```")[1].split("```")[0].strip()
+        return content
+
     def validate_html(self, html_content: str) -> Tuple[bool, Optional[str]]:
         """
         Basic HTML validation
@@ -171,10 +181,18 @@ class PortfolioGenerator:
 
         return True, None
 
-    def generate_portfolio(self, profile_data: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[str]]:
+    def generate_portfolio(
+        self,
+        profile_data: Dict[str, Any],
+        policy: Optional[ModelPolicy] = None
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Generate HTML portfolio using AI
 
+        Args:
+            profile_data: Parsed profile
+            policy: Model policy for this call (defaults to the generator's)
+
         Returns:
             (success, html_content, error_message)
         """
@@ -182,25 +200,21 @@ class PortfolioGenerator:
             # Format profile data for prompt
             formatted_profile = self.format_profile_for_prompt(profile_data)
 
-            # Call Groq API
-            response = self.groq_client.call_api(
+            # Call Groq API (70b with 8000 tokens for the full CSS template by
+            # default); with cascading enabled, cheaper models are tried first
+            # and kept if their HTML validates
+            response = self.groq_client.call_api_routed(
                 system_prompt=PORTFOLIO_GENERATOR_PROMPT,
                 user_prompt=f"Generate a portfolio website for:\n\n{formatted_profile}",
-                model="70b",  # Need powerful model for complex CSS template
-                temperature=0.7,  # Some creativity for design
-                max_tokens=8000  # Need more tokens for full HTML with complete CSS
+                task="portfolio",
+                validator=lambda content: self.validate_html(self.extract_html(content))[1],
+                **(policy or self.policy).params("portfolio")
             )
 
             if not response.get("success"):
                 return False, None, response.get("error", "Portfolio generation failed")
 
-            html_content = response["content"]
-
-            # Clean up any markdown code blocks
-            if "```html" in html_content:
-                html_content = html_content.split("```html")[1].split("```")[0].strip()
-            elif "```" in html_content:
-                html_content = html_content.split("```")[1].split("```")[0].strip()
+            html_content = self.extract_html(response["content"])
 
             # Validate HTML
             is_valid, error = self.validate_html(html_content)
@@ -219,10 +233,18 @@ class PortfolioGenerator:
         except Exception as e:
             return False, None, f"Error generating portfolio: {str(e)}"
 
-    def generate_portfolio_with_fallback(self, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_portfolio_with_fallback(
+        self,
+        profile_data: Dict[str, Any],
+        policy: Optional[ModelPolicy] = None
+    ) -> Dict[str, Any]:
         """
         Generate portfolio with fallback to template if AI fails
 
+        Args:
+            profile_data: Parsed profile
+            policy: Model policy for this call (defaults to the generator's)
+
         Returns:
             {
                 "success": bool,
@@ -237,8 +259,20 @@ class PortfolioGenerator:
             profile_data.get("user_id")
         )
 
+        # Skip straight to the template while Groq's circuit breaker is open
+        model = (policy or self.policy).model("portfolio")
+        if not self.groq_client.model_available(model):
+            st.warning("AI generation is temporarily unavailable. Using template fallback.")
+            self.groq_client.record_fallback("template", "portfolio")
+            return {
+                "success": True,
+                "html_content": self.generate_template_portfolio(profile_data),
+                "subdomain": subdomain,
+                "error": f"Used template fallback. Groq ({model}) is temporarily unavailable"
+            }
+
         # Try AI generation
-        success, html_content, error = self.generate_portfolio(profile_data)
+        success, html_content, error = self.generate_portfolio(profile_data, policy)
 
         if success and html_content:
             return {
@@ -250,6 +284,7 @@ class PortfolioGenerator:
 
         # Fallback to simple template
         st.warning("AI generation failed. Using template fallback.")
+        self.groq_client.record_fallback("template", "portfolio")
         template_html = self.generate_template_portfolio(profile_data)
 
         return {
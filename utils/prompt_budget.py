@@ -0,0 +1,258 @@
+"""
+Token-budgeted prompt assembly: fit prompt sections into a budget by priority
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.token_estimate import estimate_token_count, get_token_estimator
+
+
+# Input token budgets per task; prompt + max_tokens must also fit the
+# model's TPM limit, or the call can never be sent
+DEFAULT_PROMPT_BUDGETS = {
+    "resume_parse": 3000,
+    "linkedin_parse": 3500,
+    "cover_letter": 2500,
+    "optimizer": 3000,
+    "interview_questions": 2000,
+    "interview_feedback": 2000,
+    "career_coach": 2500,
+    "portfolio": 3000
+}
+
+# Resume headings by how much the parser needs them (0 = most)
+RESUME_SECTION_PRIORITIES = {
+    "experience": 0,
+    "skills": 0,
+    "education": 1,
+    "projects": 1,
+    "summary": 2,
+    "certifications": 2,
+    "other": 3
+}
+
+_RESUME_HEADINGS = {
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history"),
+    "skills": ("skills", "technical skills", "core competencies", "technologies", "tech stack"),
+    "education": ("education", "academic background", "qualifications"),
+    "projects": ("projects", "personal projects", "selected projects", "open source"),
+    "summary": ("summary", "professional summary", "profile", "about", "about me", "objective"),
+    "certifications": ("certifications", "certificates", "licenses", "awards", "achievements"),
+    "other": ("interests", "hobbies", "references", "volunteering", "volunteer experience",
+              "languages", "publications", "activities", "additional information")
+}
+_HEADING_KINDS = {heading: kind for kind, headings in _RESUME_HEADINGS.items() for heading in headings}
+
+
+@dataclass
+class Section:
+    """
+    One part of a prompt
+
+    Attributes:
+        name: Label used in the assembly report
+        text: Section content
+        priority: 0 is kept longest; higher numbers are trimmed first
+        min_tokens: Trim no further than this before touching more important sections
+        keep: 'head' keeps the start (documents), 'tail' the end (chat history)
+    """
+    name: str
+    text: str
+    priority: int = 1
+    min_tokens: int = 0
+    keep: str = "head"
+
+
+def _slice_line(line: str, max_tokens: int, keep: str) -> str:
+    """
+    Part of one line within `max_tokens`: cut at a pre-token boundary, or
+    mid-word when the line has none (e.g. a long URL or base64 blob)
+    """
+    estimator = get_token_estimator()
+    if estimator:
+        part = estimator.truncate(line, max_tokens, keep=keep)
+        if part:
+            return part
+
+    def cut(length: int) -> str:
+        return line[:length] if keep == "head" else line[len(line) - length:]
+
+    # Longest slice the estimator accepts
+    low, high = 0, min(len(line), max_tokens * 8)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_token_count(cut(middle)) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return cut(low)
+
+
+def _trim(text: str, max_tokens: int, keep: str) -> str:
+    """Cut `text` to `max_tokens` at line boundaries, marking what was dropped"""
+    if max_tokens <= 0:
+        return ""
+    lines = text.split("\n")
+    marker = "[…trimmed]"
+    budget = max_tokens - estimate_token_count(marker) - 1
+    ordered = lines if keep == "head" else list(reversed(lines))
+
+    kept: List[str] = []
+    used = 0
+    for line in ordered:
+        cost = estimate_token_count(line) + 1
+        if used + cost > budget:
+            if not kept and budget > 0:
+                # A single oversized line: keep what fits of it
+                kept.append(_slice_line(line, budget, keep))
+            break
+        kept.append(line)
+        used += cost
+
+    if keep == "head":
+        return "\n".join(kept + [marker])
+    return "\n".join([marker] + list(reversed(kept)))
+
+
+def _allocate(needs: List[int], sections: List[Section], budget: int) -> List[int]:
+    """
+    Tokens granted to each section
+
+    Least important priority levels give up tokens first, down to their
+    min_tokens and proportionally within a level; if that is not enough,
+    the minimums are given up in the same order.
+    """
+    grants = list(needs)
+    over = sum(grants) - budget
+    levels = sorted({section.priority for section in sections}, reverse=True)
+
+    for respect_minimum in (True, False):
+        for level in levels:
+            if over <= 0:
+                return grants
+            members = [i for i, section in enumerate(sections) if section.priority == level]
+            floors = {i: min(sections[i].min_tokens, needs[i]) if respect_minimum else 0 for i in members}
+            reducible = {i: grants[i] - floors[i] for i in members if grants[i] > floors[i]}
+            total = sum(reducible.values())
+            if not total:
+                continue
+            cut = min(over, total)
+            for i, amount in reducible.items():
+                share = -(-cut * amount // total)  # Ceiling division so the cut is complete
+                grants[i] -= min(share, amount)
+            over = sum(grants) - budget
+    return grants
+
+
+def assemble(sections: List[Section], budget: int, separator: str = "\n\n") -> Dict[str, Any]:
+    """
+    Join sections into a prompt of at most ~`budget` tokens
+
+    Sections that fit are kept verbatim; otherwise the least important are
+    trimmed at line boundaries (from the end, or the start for keep='tail')
+    so the most relevant content survives whole. Token counts are offline
+    estimates (utils/token_estimate.py).
+
+    Returns:
+        {"text": str, "tokens": int, "budget": int, "truncated": bool,
+         "sections": {name: {"tokens": int, "original": int, "trimmed": bool}}}
+    """
+    present = [section for section in sections if section.text and section.text.strip()]
+    separator_cost = estimate_token_count(separator) * max(0, len(present) - 1)
+    needs = [estimate_token_count(section.text) for section in present]
+    grants = _allocate(needs, present, max(0, budget - separator_cost))
+
+    parts = []
+    report = {}
+    for section, need, grant in zip(present, needs, grants):
+        text = section.text if grant >= need else _trim(section.text, grant, section.keep)
+        tokens = need if grant >= need else estimate_token_count(text)
+        if text:
+            parts.append(text)
+        report[section.name] = {"tokens": tokens, "original": need, "trimmed": grant < need}
+
+    text = separator.join(parts)
+    return {
+        "text": text,
+        "tokens": estimate_token_count(text),
+        "budget": budget,
+        "truncated": any(entry["trimmed"] for entry in report.values()),
+        "sections": report
+    }
+
+
+def compact_whitespace(text: str) -> str:
+    """Drop trailing spaces, runs of spaces and repeated blank lines (free token savings)"""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def split_resume_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split résumé text at recognised headings
+
+    Returns:
+        [(kind, text), ...] in document order; text before the first
+        heading (name, contact details) is kind 'header'
+    """
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in text.split("\n"):
+        heading = re.sub(r"[^a-z ]", "", line.lower()).strip()
+        if heading in _HEADING_KINDS and len(line) <= 40:
+            sections.append((_HEADING_KINDS[heading], [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(kind, "\n".join(lines)) for kind, lines in sections if any(line.strip() for line in lines)]
+
+
+def fit_resume_text(text: str, budget: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Résumé (or LinkedIn profile) text trimmed to `budget` tokens
+
+    Interests, references and other unrecognised sections go first, then
+    the long tail of less important sections; the header, experience and
+    skills are kept whole as long as possible.
+
+    Returns:
+        (text, assembly report)
+    """
+    text = compact_whitespace(text)
+    sections = [
+        Section(
+            name=f"{index}:{kind}",
+            text=chunk,
+            priority=0 if kind == "header" else RESUME_SECTION_PRIORITIES[kind],
+            # Short sections survive whole; long ones give way above this floor
+            min_tokens=0 if kind == "other" else 150
+        )
+        for index, (kind, chunk) in enumerate(split_resume_sections(text))
+    ]
+    result = assemble(sections, budget, separator="\n")
+    return result["text"], result
+
+
+def parse_prompt_budgets(spec: str) -> Dict[str, int]:
+    """Parse GROQ_PROMPT_BUDGETS, e.g. "resume_parse=4000,career_coach=1500" """
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            task, value = (part.strip() for part in item.split("=", 1))
+            if task and value.isdigit():
+                budgets[task] = int(value)
+    return budgets
+
+
+_prompt_budgets: Optional[Dict[str, int]] = None
+
+
+def prompt_budget(task: str) -> int:
+    """Input token budget for a task (defaults plus GROQ_PROMPT_BUDGETS)"""
+    global _prompt_budgets
+    if _prompt_budgets is None:
+        _prompt_budgets = {**DEFAULT_PROMPT_BUDGETS, **parse_prompt_budgets(os.getenv("GROQ_PROMPT_BUDGETS", ""))}
+    return _prompt_budgets.get(task, 3000)
@@ -0,0 +1,216 @@
+"""
+Process-wide token-bucket rate limiter for Groq RPM/TPM limits
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Tuple, Optional
+
+
+# Groq free-tier limits per model key: (requests/minute, tokens/minute), used
+# only when the limiter is enabled without GROQ_RATE_LIMITS; paid plans
+# allow far more, so enforcing these by default would throttle them
+DEFAULT_LIMITS = {
+    "8b": (30, 6000),
+    "70b": (30, 12000),
+    "mixtral": (30, 5000)
+}
+
+
+class TokenBucket:
+    """
+    Token bucket that allows reservations past zero
+
+    A reservation always succeeds and returns how long the caller must wait
+    for the bucket to refill; because later reservations see the deficit
+    left by earlier ones, waiting callers are served in arrival order.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.rate = refill_per_second
+        self.available = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` and return seconds until it is actually available"""
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+        return max(0.0, -self.available / self.rate)
+
+    def refund(self, amount: float, now: float) -> None:
+        """Return unused capacity"""
+        self._refill(now)
+        self.available = min(self.capacity, self.available + amount)
+
+    def level(self, now: float) -> float:
+        self._refill(now)
+        return self.available
+
+
+@dataclass
+class Reservation:
+    """Capacity reserved for one request"""
+    model: str
+    tokens: int
+    delay: float
+
+
+class RateLimiter:
+    """Tracks requests-per-minute and tokens-per-minute for each model"""
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]]):
+        """
+        Args:
+            limits: {model_name: (requests_per_minute, tokens_per_minute)}
+        """
+        self.limits = dict(limits)
+        self._lock = threading.Lock()
+        self._buckets = {
+            model: (TokenBucket(rpm, rpm / 60.0), TokenBucket(tpm, tpm / 60.0))
+            for model, (rpm, tpm) in self.limits.items()
+        }
+        self.reservations = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.penalties = 0
+
+    def reserve(self, model: str, tokens: int) -> Optional[Reservation]:
+        """
+        Reserve one request and `tokens` tokens for `model`
+
+        Returns:
+            Reservation (sleep for `.delay` before sending), or None if the
+            model has no configured limits
+        """
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            return None
+
+        requests_bucket, tokens_bucket = buckets
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                requests_bucket.reserve(1, now),
+                tokens_bucket.reserve(tokens, now)
+            )
+            self.reservations += 1
+            if delay > 0:
+                self.delayed += 1
+                self.total_wait += delay
+
+        return Reservation(model=model, tokens=tokens, delay=delay)
+
+    def settle(self, reservation: Optional[Reservation], actual_tokens: int) -> None:
+        """Refund the difference between reserved and actually used tokens"""
+        if reservation is None:
+            return
+        unused = reservation.tokens - actual_tokens
+        if unused > 0:
+            with self._lock:
+                self._buckets[reservation.model][1].refund(unused, time.monotonic())
+
+    def cancel(self, reservation: Optional[Reservation]) -> None:
+        """Give back a reservation that was never sent"""
+        if reservation is None:
+            return
+        requests_bucket, tokens_bucket = self._buckets[reservation.model]
+        with self._lock:
+            now = time.monotonic()
+            requests_bucket.refund(1, now)
+            tokens_bucket.refund(reservation.tokens, now)
+
+    def penalize(self, model: str, seconds: float) -> None:
+        """
+        Hold back all callers for `model` after an upstream 429
+
+        Drains the request bucket so every session backs off together
+        instead of each discovering the limit with its own failed call.
+        """
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            return
+        requests_bucket = buckets[0]
+        with self._lock:
+            now = time.monotonic()
+            requests_bucket._refill(now)
+            # One request's worth becomes available exactly `seconds` from now
+            requests_bucket.available = min(requests_bucket.available, 1.0 - seconds * requests_bucket.rate)
+            self.penalties += 1
+
+    def headroom(self, model: str) -> Optional[Dict[str, float]]:
+        """Currently available requests/tokens for `model` (negative = queue backlog)"""
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            return None
+        requests_bucket, tokens_bucket = buckets
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "requests": requests_bucket.level(now),
+                "tokens": tokens_bucket.level(now),
+                "rpm": requests_bucket.capacity,
+                "tpm": tokens_bucket.capacity
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for reservations that had to queue"""
+        with self._lock:
+            return {
+                "reservations": self.reservations,
+                "delayed": self.delayed,
+                "total_wait_seconds": self.total_wait,
+                "penalties": self.penalties
+            }
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse GROQ_RATE_LIMITS, e.g. "8b=30/6000,70b=30/12000"
+    """
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        key, value = item.split("=", 1)
+        rpm, tpm = value.split("/", 1)
+        limits[key.strip()] = (int(rpm), int(tpm))
+    return limits
+
+
+# Singleton instance
+_rate_limiter = None
+
+
+def get_rate_limiter(models: Dict[str, str], scale: int = 1) -> Optional[RateLimiter]:
+    """
+    Get or create the process-wide rate limiter
+
+    Args:
+        models: GroqClient.MODELS mapping of model key -> model name
+        scale: Number of API keys; limits are per key, so the process
+            may use this multiple of them
+
+    Returns None unless GROQ_RATE_LIMIT_ENABLED is set to a true value
+    (it defaults to on only when GROQ_RATE_LIMITS gives the account's
+    limits). Without the limiter, 429s are still handled by key rotation
+    and the retry policy.
+    """
+    global _rate_limiter
+    configured = bool(os.getenv("GROQ_RATE_LIMITS", "").strip())
+    if os.getenv("GROQ_RATE_LIMIT_ENABLED", str(configured)).lower() not in ("1", "true", "yes"):
+        return None
+
+    if _rate_limiter is None:
+        limits = dict(DEFAULT_LIMITS)
+        limits.update(parse_limits(os.getenv("GROQ_RATE_LIMITS", "")))
+        _rate_limiter = RateLimiter({
+            models[key]: (rpm * scale, tpm * scale) for key, (rpm, tpm) in limits.items() if key in models
+        })
+    return _rate_limiter
@@ -0,0 +1,220 @@
+"""
+Two-tier cache of parsed résumés, keyed by the uploaded file's content hash
+"""
+
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def resume_cache_key(kind: str, file_bytes: bytes, **version: Any) -> str:
+    """
+    Key for a cached result derived from `file_bytes`
+
+    Args:
+        kind: What is cached, e.g. 'text' (extraction) or 'parse' (AI output)
+        version: Everything else the result depends on (parser version,
+            prompt digest, model settings, ...)
+    """
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    variant = json.dumps(version, sort_keys=True, default=str)
+    return f"{kind}:{digest}:{hashlib.sha256(variant.encode('utf-8')).hexdigest()[:16]}"
+
+
+class ResumeCache:
+    """
+    LRU memory tier in front of a SQLite tier with TTL and size-bounded eviction
+
+    Repeat uploads of the same file are served from memory within a process,
+    and from disk across restarts and processes. Values are deep-copied in
+    and out, so callers may mutate what they get back.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = ".cache/resume_cache.sqlite3",
+        memory_entries: int = 64,
+        ttl_seconds: float = 24 * 3600,
+        max_entries: int = 1000,
+        max_bytes: int = 100 * 1024 * 1024
+    ):
+        """
+        Args:
+            path: SQLite file for the persistent tier (None = memory only)
+            memory_entries: Entries kept in process memory
+            ttl_seconds: Age after which an entry is dropped from both tiers
+            max_entries / max_bytes: LRU eviction limits of the persistent tier
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resume_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_resume_cache_access ON resume_cache(last_access)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached value or None (expired entries count as misses)"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+            row = None
+            if self._conn:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM resume_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE resume_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self.disk_hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value in both tiers, evicting least-recently-used entries over budget"""
+        data = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        with self._lock:
+            # Round-trip through JSON so both tiers hand back the same thing
+            self._remember(key, now, json.loads(data))
+            self.stores += 1
+            if self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO resume_cache (key, value, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), now, now)
+                )
+                self._evict()
+                self._conn.commit()
+
+    def _remember(self, key: str, created_at: float, value: Dict[str, Any]) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        """Drop expired rows, then LRU rows until entry and byte budgets fit"""
+        cutoff = time.time() - self.ttl_seconds
+        cursor = self._conn.execute("DELETE FROM resume_cache WHERE created_at < ?", (cutoff,))
+        self.evictions += max(cursor.rowcount, 0)
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM resume_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        stale = []
+        rows = self._conn.execute("SELECT key, size FROM resume_cache ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM resume_cache WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def clear(self) -> None:
+        """Remove every cached entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn:
+                self._conn.execute("DELETE FROM resume_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits per tier, misses and current size"""
+        with self._lock:
+            count, total = 0, 0
+            if self._conn:
+                count, total = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM resume_cache"
+                ).fetchone()
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": count,
+                "disk_bytes": total
+            }
+
+
+# Singleton instance
+_resume_cache = None
+
+
+def get_resume_cache() -> Optional[ResumeCache]:
+    """
+    Get or create the résumé cache singleton
+
+    Returns None if RESUME_CACHE_ENABLED is set to a false value. Entries
+    hold résumé text and parsed profiles (names, contact details, work
+    history), so they stay in process memory unless RESUME_CACHE_PERSIST
+    opts in to the SQLite tier at RESUME_CACHE_PATH.
+    """
+    global _resume_cache
+    if os.getenv("RESUME_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    if _resume_cache is None:
+        persist = os.getenv("RESUME_CACHE_PERSIST", "").lower() in ("1", "true", "yes")
+        _resume_cache = ResumeCache(
+            path=(os.getenv("RESUME_CACHE_PATH", ".cache/resume_cache.sqlite3") or None) if persist else None,
+            memory_entries=int(os.getenv("RESUME_CACHE_MEMORY_ENTRIES", 64)),
+            ttl_seconds=float(os.getenv("RESUME_CACHE_TTL_SECONDS", 24 * 3600)),
+            max_entries=int(os.getenv("RESUME_CACHE_MAX_ENTRIES", 1000)),
+            max_bytes=int(os.getenv("RESUME_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+        )
+    return _resume_cache
@@ -2,28 +2,45 @@
 Resume parser - PDF/DOCX extraction + AI parsing
 """
 
-import io
 import re
+import json
+import hashlib
 from typing import Dict, Any, Optional, Tuple
 import streamlit as st
 
-# PDF parsing
-try:
-    import PyPDF2
-    import pdfplumber
-except ImportError:
-    st.error("PDF libraries not installed. Run: pip install pypdf2 pdfplumber")
-
 from utils.groq_client import get_groq_client
+from utils.model_policy import get_model_policy, ModelPolicy
 from utils.validators import ProfileSchema
+from utils.prompt_budget import fit_resume_text, prompt_budget
+from utils.resume_cache import get_resume_cache, resume_cache_key
+from utils.pdf_extraction import get_pdf_extractor
+from utils.docx_extraction import get_docx_extractor
 from prompts.prompts import RESUME_PARSER_PROMPT
 
 
+# Bump when extraction or cleaning changes what text a file yields
+EXTRACTOR_VERSION = 4
+# Bump when parse_resume's post-processing of the AI output changes
+PARSER_VERSION = 1
+# Cached parses are invalidated whenever the prompt or schema changes
+_PROMPT_DIGEST = hashlib.sha256(
+    (RESUME_PARSER_PROMPT + json.dumps(ProfileSchema.model_json_schema(), sort_keys=True)).encode("utf-8")
+).hexdigest()[:16]
+
+
 class ResumeParser:
     """Parse resumes from PDF/DOCX files"""
 
-    def __init__(self):
+    def __init__(self, policy: Optional[ModelPolicy] = None):
         self.groq_client = get_groq_client()
+        self.policy = policy or get_model_policy()
+        # Repeat uploads of the same file skip extraction and the LLM
+        self.cache = get_resume_cache()
+        # PyPDF2 fast pass, pdfplumber (page-parallel for long PDFs) if its text
+        # looks bad; both stop at the PDF_MAX_PAGES / PDF_MAX_CHARS budget
+        self.pdf_extractor = get_pdf_extractor()
+        # word/document.xml streamed from the zip in document order, python-docx as fallback
+        self.docx_extractor = get_docx_extractor()
 
     def extract_text_from_pdf(self, file_bytes: bytes) -> Tuple[bool, str, Optional[str]]:
         """
@@ -33,29 +50,8 @@ class ResumeParser:
             (success, extracted_text, error_message)
         """
         try:
-            # Try pdfplumber first (better for complex layouts)
-            pdf_file = io.BytesIO(file_bytes)
-            text_parts = []
-
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-
-            if text_parts:
-                full_text = "\n\n".join(text_parts)
-                return True, full_text, None
-
-            # Fallback to PyPDF2
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text_parts = []
-
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
+            pages, _ = self.pdf_extractor.extract(file_bytes)
+            text_parts = [text for text in pages if text.strip()]
 
             if text_parts:
                 full_text = "\n\n".join(text_parts)
@@ -74,22 +70,8 @@ class ResumeParser:
             (success, extracted_text, error_message)
         """
         try:
-            from docx import Document
-
-            docx_file = io.BytesIO(file_bytes)
-            doc = Document(docx_file)
-
-            text_parts = []
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text)
-
-            # Also extract from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text_parts.append(cell.text)
+            blocks, _ = self.docx_extractor.extract(file_bytes)
+            text_parts = [text for text in blocks if text.strip()]
 
             if text_parts:
                 full_text = "\n".join(text_parts)
@@ -138,64 +120,77 @@ class ResumeParser:
 
         return min(score, 1.0)
 
-    def parse_with_ai(self, resume_text: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    def parse_with_ai(
+        self,
+        resume_text: str,
+        policy: Optional[ModelPolicy] = None
+    ) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
         Parse resume text using Groq AI
 
+        Args:
+            resume_text: Cleaned resume text
+            policy: Model policy for this call (defaults to the parser's)
+
         Returns:
             (success, parsed_data, error_message)
         """
         try:
-            # Truncate if too long
-            if len(resume_text) > 10000:
-                resume_text = resume_text[:10000] + "\n\n[Truncated for length]"
+            # Fit the token budget, trimming the least useful sections first
+            resume_text, _ = fit_resume_text(resume_text, prompt_budget("resume_parse"))
 
-            # Call Groq API
-            parsed_json = self.groq_client.call_api_json(
+            # Call Groq API (8b at low temperature unless the policy says otherwise);
+            # the response is checked against ProfileSchema as it streams
+            response = self.groq_client.call_api_structured(
                 system_prompt=RESUME_PARSER_PROMPT,
                 user_prompt=f"Resume text:\n\n{resume_text}",
-                model="8b",  # Fast model for parsing
-                temperature=0.2,  # Low temperature for consistency
-                max_tokens=2048
+                schema=ProfileSchema,
+                task="resume_parse",
+                **(policy or self.policy).params("resume_parse")
             )
 
+            parsed_json = response.get("data")
             if not parsed_json:
                 return False, None, "AI parsing failed - no response"
 
-            # Validate with Pydantic
-            try:
-                profile = ProfileSchema(**parsed_json)
-                validated_data = profile.model_dump()
-                return True, validated_data, None
-            except Exception as validation_error:
-                # Return partial data even if validation fails
-                st.warning(f"Validation warning: {validation_error}")
-                return True, parsed_json, None
+            if response.get("parsed") is not None:
+                return True, response["parsed"].model_dump(), None
+
+            # Return partial data even if validation fails
+            st.warning(f"Validation warning: {response.get('validation_error')}")
+            return True, parsed_json, None
 
         except Exception as e:
             return False, None, f"Error during AI parsing: {str(e)}"
 
-    def parse_resume(self, file_bytes: bytes, filename: str) -> Dict[str, Any]:
+    def parse_resume(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        policy: Optional[ModelPolicy] = None
+    ) -> Dict[str, Any]:
         """
         Main parsing function
 
+        Args:
+            file_bytes: Uploaded file contents
+            filename: Original filename (used for the file type)
+            policy: Model policy for the AI step (defaults to the parser's)
+
         Returns:
             {
                 "success": bool,
                 "profile_data": dict or None,
                 "raw_text": str,
                 "confidence": float,
-                "error": str or None
+                "error": str or None,
+                "cached": bool  # True if served from the résumé cache
             }
         """
         # Extract text based on file type
         file_ext = filename.lower().split('.')[-1]
 
-        if file_ext == 'pdf':
-            success, raw_text, error = self.extract_text_from_pdf(file_bytes)
-        elif file_ext in ['docx', 'doc']:
-            success, raw_text, error = self.extract_text_from_docx(file_bytes)
-        else:
+        if file_ext not in ['pdf', 'docx', 'doc']:
             return {
                 "success": False,
                 "profile_data": None,
@@ -204,17 +199,48 @@ class ResumeParser:
                 "error": f"Unsupported file type: {file_ext}"
             }
 
-        if not success:
-            return {
-                "success": False,
-                "profile_data": None,
-                "raw_text": "",
-                "confidence": 0.0,
-                "error": error
-            }
+        policy = policy or self.policy
+        parse_key = text_key = None
+        if self.cache:
+            parse_key = resume_cache_key(
+                "parse", file_bytes,
+                file_type=file_ext, extractor=EXTRACTOR_VERSION, limits=self._extraction_limits(),
+                parser=PARSER_VERSION, prompt=_PROMPT_DIGEST,
+                params=policy.params("resume_parse"), budget=prompt_budget("resume_parse")
+            )
+            cached = self.cache.get(parse_key)
+            if cached is not None:
+                return {**cached, "success": True, "error": None, "cached": True}
+            text_key = resume_cache_key(
+                "text", file_bytes,
+                file_type=file_ext, extractor=EXTRACTOR_VERSION, limits=self._extraction_limits()
+            )
+            cached = self.cache.get(text_key)
+        else:
+            cached = None
 
-        # Clean text
-        cleaned_text = self.clean_text(raw_text)
+        if cached is not None:
+            # Same file parsed with other model settings: only the AI step reruns
+            cleaned_text = cached["text"]
+        else:
+            if file_ext == 'pdf':
+                success, raw_text, error = self.extract_text_from_pdf(file_bytes)
+            else:
+                success, raw_text, error = self.extract_text_from_docx(file_bytes)
+
+            if not success:
+                return {
+                    "success": False,
+                    "profile_data": None,
+                    "raw_text": "",
+                    "confidence": 0.0,
+                    "error": error
+                }
+
+            # Clean text
+            cleaned_text = self.clean_text(raw_text)
+            if text_key and len(cleaned_text) >= 100:
+                self.cache.set(text_key, {"text": cleaned_text})
 
         if len(cleaned_text) < 100:
             return {
@@ -226,7 +252,7 @@ class ResumeParser:
             }
 
         # Parse with AI
-        success, parsed_data, error = self.parse_with_ai(cleaned_text)
+        success, parsed_data, error = self.parse_with_ai(cleaned_text, policy)
 
         if not success:
             return {
@@ -246,13 +272,44 @@ class ResumeParser:
             parsed_data["parsing_confidence"] = confidence
             parsed_data["parsing_method"] = "pdf" if file_ext == "pdf" else "docx"
 
-        return {
+        result = {
             "success": True,
             "profile_data": parsed_data,
             "raw_text": cleaned_text,
             "confidence": confidence,
-            "error": None
+            "error": None,
+            "cached": False
         }
+        if parse_key and self._is_valid_profile(parsed_data):
+            self.cache.set(parse_key, {
+                "profile_data": parsed_data, "raw_text": cleaned_text, "confidence": confidence
+            })
+        return result
+
+    @staticmethod
+    def _is_valid_profile(parsed_data: Optional[Dict]) -> bool:
+        """Only output that passed ProfileSchema is cached; partial parses are retried"""
+        try:
+            ProfileSchema.model_validate(parsed_data)
+            return True
+        except Exception:
+            return False
+
+    def _extraction_limits(self) -> Tuple[int, int, int]:
+        """The PDF page/character and DOCX character budgets, which decide how much text a file yields"""
+        return self.pdf_extractor.max_pages, self.pdf_extractor.max_chars, self.docx_extractor.max_chars
+
+    def extraction_stats(self) -> Dict[str, Any]:
+        """Runs and timings per PDF extraction tier, fast-path acceptance, budget truncations and peak RSS"""
+        return self.pdf_extractor.stats()
+
+    def docx_extraction_stats(self) -> Dict[str, Any]:
+        """Runs and timings per DOCX extraction method, fallbacks and budget truncations"""
+        return self.docx_extractor.stats()
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit/miss counters of the résumé cache (None if RESUME_CACHE_ENABLED is off)"""
+        return self.cache.stats() if self.cache else None
 
 
 # Singleton instance
@@ -0,0 +1,273 @@
+"""
+Retry policy for Groq calls: error classification, Retry-After, jitter and a circuit breaker
+"""
+
+import os
+import re
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Tuple
+
+from groq import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+
+# Failure kinds that say the upstream is unhealthy (a 429 only means we are busy)
+UNHEALTHY = frozenset({"timeout", "connection", "server_error"})
+RETRYABLE = frozenset({"rate_limit"}) | UNHEALTHY
+
+
+def classify(error: Exception) -> str:
+    """
+    Classify an exception from the Groq SDK
+
+    Returns:
+        'rate_limit', 'timeout', 'connection', 'server_error' or 'api_error'
+    """
+    if isinstance(error, RateLimitError):
+        return "rate_limit"
+    if isinstance(error, APITimeoutError):
+        return "timeout"
+    if isinstance(error, APIConnectionError):
+        return "connection"
+    if isinstance(error, APIStatusError):
+        if error.status_code == 429:
+            return "rate_limit"
+        if error.status_code >= 500 or error.status_code == 498:  # 498: capacity exceeded
+            return "server_error"
+        return "api_error"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    return "api_error"
+
+
+_DURATION = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$")
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse Groq reset durations such as '7.66s', '2m59.56s' or '120ms' into seconds"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    match = _DURATION.match(value)
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds, millis = (float(group) if group else 0.0 for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds + millis / 1000
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds the server asked us to wait, from Retry-After or x-ratelimit-reset-* headers
+
+    Returns None if the error carries no usable hint.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after")
+    if value:
+        seconds = parse_duration(value)
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(0.0, seconds)
+
+    # Without Retry-After, wait for whichever budget (requests/tokens) is exhausted
+    resets = []
+    for limit in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{limit}")
+        reset = headers.get(f"x-ratelimit-reset-{limit}")
+        if reset and remaining is not None and remaining.strip() in ("0", "0.0"):
+            seconds = parse_duration(reset)
+            if seconds is not None:
+                resets.append(seconds)
+    return max(resets) if resets else None
+
+
+class RetryPolicy:
+    """
+    Backoff with decorrelated jitter, honoring server hints
+
+    Each wait is drawn from [base, 3 * previous wait] (capped), so sessions
+    that failed together drift apart instead of retrying in lockstep. A
+    Retry-After hint is used as the floor, plus a little jitter.
+    """
+
+    def __init__(self, max_delay: float = 30.0, rng: Optional[random.Random] = None):
+        """
+        Args:
+            max_delay: Longest single wait; a server asking for more fails fast
+            rng: Random source (for reproducible benchmarks)
+        """
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def next_delay(
+        self,
+        base: float,
+        previous: Optional[float],
+        hint: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt
+
+        Args:
+            base: Smallest wait (the caller's retry_delay)
+            previous: Previous wait for this call, None on the first retry
+            hint: Server-provided Retry-After, if any
+
+        Returns:
+            None if the server wants us to wait longer than max_delay
+        """
+        if hint is not None:
+            if hint > self.max_delay:
+                return None
+            return hint + self.rng.uniform(0, max(0.1, 0.1 * hint))
+
+        upper = max(base, (previous or base) * 3)
+        return min(self.max_delay, self.rng.uniform(base, upper))
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker
+
+    After `threshold` consecutive unhealthy failures (timeouts, connection
+    errors, 5xx) a model's circuit opens and calls fail fast for `cooldown`
+    seconds. Then one probe request is let through (half-open): success
+    closes the circuit, failure re-opens it with a doubled cooldown.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    def _state(self, model: str) -> Dict[str, Any]:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = {
+                "failures": 0,
+                "opened_at": None,
+                "cooldown": self.cooldown,
+                "probing": False,
+                "trips": 0,
+                "rejected": 0
+            }
+        return state
+
+    def allow(self, model: str) -> Tuple[bool, float]:
+        """
+        Whether a request to `model` may be sent now
+
+        Returns:
+            (allowed, seconds until the circuit may close if not allowed)
+        """
+        with self._lock:
+            state = self._state(model)
+            if state["opened_at"] is None:
+                return True, 0.0
+
+            remaining = state["opened_at"] + state["cooldown"] - time.monotonic()
+            if remaining <= 0 and not state["probing"]:
+                state["probing"] = True
+                return True, 0.0
+
+            state["rejected"] += 1
+            return False, max(remaining, 0.0)
+
+    def available(self, model: str) -> bool:
+        """True unless the circuit is open and still cooling down (does not take the probe)"""
+        with self._lock:
+            state = self._state(model)
+            if state["opened_at"] is None:
+                return True
+            return time.monotonic() >= state["opened_at"] + state["cooldown"] and not state["probing"]
+
+    def record_success(self, model: str) -> None:
+        with self._lock:
+            state = self._state(model)
+            state.update(failures=0, opened_at=None, cooldown=self.cooldown, probing=False)
+
+    def record_failure(self, model: str) -> bool:
+        """Count an unhealthy failure; returns True if this opened the circuit"""
+        with self._lock:
+            state = self._state(model)
+            state["failures"] += 1
+
+            if state["probing"]:
+                state.update(
+                    opened_at=time.monotonic(),
+                    cooldown=min(self.max_cooldown, state["cooldown"] * 2),
+                    probing=False
+                )
+                return True
+
+            if state["opened_at"] is None and state["failures"] >= self.threshold:
+                state["opened_at"] = time.monotonic()
+                state["trips"] += 1
+                return True
+            return False
+
+    def release_probe(self, model: str) -> None:
+        """The probe ended without a health verdict (e.g. a 400); let another through"""
+        with self._lock:
+            self._state(model)["probing"] = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                model: {
+                    "state": "closed" if state["opened_at"] is None
+                    else "half_open" if state["probing"] or now >= state["opened_at"] + state["cooldown"]
+                    else "open",
+                    "consecutive_failures": state["failures"],
+                    "trips": state["trips"],
+                    "rejected": state["rejected"]
+                }
+                for model, state in self._models.items()
+            }
+
+
+# Singleton instances
+_retry_policy = None
+_circuit_breaker = None
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Get or create the process-wide retry policy"""
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy(max_delay=float(os.getenv("GROQ_RETRY_MAX_DELAY", 30)))
+    return _retry_policy
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """
+    Get or create the process-wide circuit breaker
+
+    Returns None if GROQ_CIRCUIT_BREAKER is set to a false value.
+    """
+    global _circuit_breaker
+    if os.getenv("GROQ_CIRCUIT_BREAKER", "true").lower() in ("0", "false", "no"):
+        return None
+
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker(
+            threshold=int(os.getenv("GROQ_BREAKER_THRESHOLD", 5)),
+            cooldown=float(os.getenv("GROQ_BREAKER_COOLDOWN", 30))
+        )
+    return _circuit_breaker
@@ -0,0 +1,105 @@
+"""
+Single-flight coalescing of identical in-flight calls
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    """A call that is in progress"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution
+
+    The first caller (the leader) runs the function; callers arriving while
+    it is still running wait for and share its result instead of starting
+    a duplicate. Works across threads, and across sync and async callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[_Call, bool]:
+        """Register interest in `key`; returns (call, is_leader)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.executed += 1
+            return call, True
+
+    def _complete(self, key: str, call: _Call) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        call.done.set()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per concurrent `key`
+
+        Returns:
+            (result, shared) - shared is True if another caller's result was reused
+        """
+        call, leader = self._join(key)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._complete(key, call)
+        return call.result, False
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async version of do(); `fn` returns an awaitable"""
+        call, leader = self._join(key)
+
+        if not leader:
+            # The leader may be on another thread or loop, so wait off-loop
+            await asyncio.get_running_loop().run_in_executor(None, call.done.wait)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = await fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._complete(key, call)
+        return call.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        """How many calls ran versus piggybacked on an in-flight call"""
+        with self._lock:
+            in_flight = len(self._calls)
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesce_rate": self.coalesced / total if total else 0.0,
+            "in_flight": in_flight
+        }
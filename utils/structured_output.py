@@ -0,0 +1,276 @@
+"""
+Schema-constrained JSON output: schema prompts and an incremental parser for streamed JSON
+"""
+
+import json
+from functools import lru_cache
+from typing import Annotated, Any, Dict, Optional, Tuple, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+
+@lru_cache(maxsize=None)
+def schema_instructions(schema: type) -> str:
+    """
+    System message telling the model which JSON object to produce
+
+    Groq's JSON mode only guarantees *some* object, so the schema itself is
+    sent as an instruction. Titles and examples are dropped to save tokens.
+    """
+    def strip(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {
+                key: strip(value) for key, value in node.items()
+                if key not in ("title", "example", "examples")
+            }
+        if isinstance(node, list):
+            return [strip(item) for item in node]
+        return node
+
+    compact = json.dumps(strip(schema.model_json_schema()), separators=(",", ":"))
+    return (
+        "Respond with a single JSON object that conforms to this JSON Schema. "
+        "Output the JSON only, with no surrounding text.\n"
+        f"{compact}"
+    )
+
+
+# Pydantic error types that expect a JSON object or array
+_OBJECT_ERRORS = {"model_type", "model_attributes_type", "dict_type", "dataclass_type"}
+_ARRAY_ERRORS = {"list_type", "tuple_type", "set_type", "frozen_set_type", "iterable_type"}
+
+
+def _json_kind(value: Any) -> str:
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    return "scalar"
+
+
+def _is_structural_error(error: ValidationError) -> bool:
+    """
+    True if a value has the wrong JSON shape: an object, array or scalar
+    where another kind belongs
+
+    Nulls for missing fields (the prompts ask for them), scalars of the
+    wrong type ("2020" vs 2020, a numeric phone) and constraint failures
+    still leave usable data, so they are warnings, not divergence.
+    """
+    for item in error.errors():
+        if item["type"] == "json_invalid":
+            return True
+        value = item.get("input")
+        if value is None:
+            continue
+        if item["type"] in _OBJECT_ERRORS:
+            expected = "object"
+        elif item["type"] in _ARRAY_ERRORS:
+            expected = "array"
+        elif item["type"].endswith(("_type", "_parsing")):
+            expected = "scalar"
+        else:
+            continue
+        if _json_kind(value) != expected:
+            return True
+    return False
+
+
+def validate_schema(schema: type, data: Any) -> Tuple[Optional[BaseModel], Optional[str]]:
+    """Validate a parsed object; returns (model instance or None, error or None)"""
+    try:
+        return schema.model_validate(data), None
+    except ValidationError as e:
+        return None, f"{schema.__name__}: {e.error_count()} validation error(s)"
+
+
+@lru_cache(maxsize=None)
+def _field_adapters(schema: type) -> Dict[str, Tuple[TypeAdapter, Optional[TypeAdapter]]]:
+    """Per top-level field: (adapter for the value, adapter for list items or None)"""
+    adapters = {}
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        item_adapter = None
+        if get_origin(annotation) is list and get_args(annotation):
+            item_adapter = TypeAdapter(get_args(annotation)[0])
+        adapters[field.alias or name] = (TypeAdapter(Annotated[annotation, field]), item_adapter)
+    return adapters
+
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON object as it streams in and checks fields as they complete
+
+    Each top-level field is validated against the schema as soon as its
+    value closes, and elements of top-level lists (work_history, questions,
+    ...) as soon as each element closes. The parser stops at the first sign
+    that the output can't become a usable object: text instead of JSON,
+    malformed JSON, or a value of the wrong shape (object vs. array vs.
+    scalar). Nulls, mistyped scalars and constraint failures are collected
+    in `warnings` and left to the final validation.
+    """
+
+    def __init__(self, schema: type):
+        self.schema = schema
+        self.fields: Dict[str, Any] = {}
+        self.warnings: Dict[str, str] = {}
+        self.error: Optional[str] = None
+        self.text = ""
+        self._adapters = _field_adapters(schema)
+        self._pos = 0
+        self._stack = []
+        self._started = False
+        self._start = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+
+    @property
+    def complete(self) -> bool:
+        return self._started and not self._stack
+
+    def feed(self, delta: str) -> Optional[str]:
+        """
+        Consume streamed text
+
+        Returns:
+            Error message once the output has diverged from the schema,
+            else None
+        """
+        if self.error or self.complete:
+            return self.error
+        self.text += delta
+
+        text = self.text
+        while self._pos < len(text) and not self.error and not self.complete:
+            if not self._started and text[self._pos] == "`":
+                # Tolerate a ```json fence: skip to the end of its line
+                newline = text.find("\n", self._pos)
+                if newline == -1:
+                    break  # Wait for the rest of the fence line
+                self._pos = newline + 1
+                continue
+            self._step(text, self._pos)
+            self._pos += 1
+        return self.error
+
+    def _step(self, text: str, i: int) -> None:
+        char = text[i]
+
+        if not self._started:
+            if char.isspace():
+                return
+            if char != "{":
+                self.error = f"Expected a JSON object, got {text[i:i + 20]!r}"
+                return
+            self._started = True
+            self._start = i
+            self._stack.append("{")
+            self._expect_key = True
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._key_start is not None:
+                    self._key = json.loads(text[self._key_start:i + 1])
+                    self._key_start = None
+            return
+
+        depth = len(self._stack)
+        if char == '"':
+            self._in_string = True
+            if depth == 1 and self._expect_key:
+                self._key_start = i
+        elif char == ":" and depth == 1:
+            self._expect_key = False
+            self._value_start = i + 1
+        elif char in "{[":
+            self._stack.append(char)
+            if depth == 1 and char == "[":
+                self._item_start = i + 1
+                self._item_index = 0
+        elif char in "}]":
+            if self._stack[-1] != ("{" if char == "}" else "["):
+                self.error = f"Malformed JSON: unexpected {char!r}"
+                return
+            if depth == 2 and char == "]":
+                self._finish_item(text, i)
+            elif depth == 1:
+                self._finish_field(text, i)
+            self._stack.pop()
+        elif char == ",":
+            if depth == 1:
+                self._finish_field(text, i)
+                self._expect_key = True
+            elif depth == 2 and self._stack[1] == "[":
+                self._finish_item(text, i)
+                self._item_start = i + 1
+                self._item_index += 1
+
+    def _finish_field(self, text: str, end: int) -> None:
+        if self._key is None or self._value_start is None:
+            return  # Empty object or a trailing comma
+        key, raw = self._key, text[self._value_start:end].strip()
+        self._key = self._value_start = None
+
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self.error = f"Malformed JSON in field '{key}'"
+            return
+        self.fields[key] = value
+
+        if key in self._adapters:
+            self._check(key, self._adapters[key][0], value)
+
+    def _finish_item(self, text: str, end: int) -> None:
+        raw = text[self._item_start:end].strip() if self._item_start is not None else ""
+        if not raw or self._key not in self._adapters:
+            return
+        item_adapter = self._adapters[self._key][1]
+        if item_adapter is None:
+            return
+
+        label = f"{self._key}[{self._item_index}]"
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self.error = f"Malformed JSON in {label}"
+            return
+        self._check(label, item_adapter, value)
+
+    def _check(self, label: str, adapter: TypeAdapter, value: Any) -> None:
+        try:
+            adapter.validate_python(value)
+        except ValidationError as e:
+            message = f"{label}: {e.errors()[0]['msg']}"
+            if _is_structural_error(e):
+                self.error = message
+            else:
+                self.warnings[label] = message
+
+    def result(self) -> Tuple[Optional[Dict[str, Any]], Optional[BaseModel], Optional[str]]:
+        """
+        Parse and validate the whole object once the stream has ended
+
+        Returns:
+            (data, validated model or None, error or None); data is the raw
+            object (extra keys kept) if it is at least well-formed JSON
+        """
+        if self.error:
+            return None, None, self.error
+        if not self.complete:
+            return None, None, "Response ended before the JSON object was complete"
+
+        data = json.loads(self.text[self._start:self._pos])
+        return (data, *validate_schema(self.schema, data))
@@ -25,6 +25,10 @@ class SupabaseClient:
         self.client: Client = create_client(url, key)
         self.storage = self.client.storage
 
+        # Server-side writes that clients must not make (LLM usage ledger)
+        service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        self.service_client: Optional[Client] = create_client(url, service_key) if service_key else None
+
     # ========================================
     # AUTH OPERATIONS
     # ========================================
@@ -335,6 +339,38 @@ class SupabaseClient:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def record_llm_usage(self, user_id: str, day: str, prompt_tokens: int,
+                         completion_tokens: int, requests: int) -> Dict[str, Any]:
+        """
+        Add LLM token usage to a user's daily totals (llm_usage table)
+
+        increment_llm_usage is only executable by the service role, so this
+        needs SUPABASE_SERVICE_ROLE_KEY.
+        """
+        if not self.service_client:
+            return {"success": False, "error": "SUPABASE_SERVICE_ROLE_KEY is not set"}
+        try:
+            self.service_client.rpc("increment_llm_usage", {
+                "p_user_id": user_id,
+                "p_day": day,
+                "p_prompt_tokens": prompt_tokens,
+                "p_completion_tokens": completion_tokens,
+                "p_requests": requests
+            }).execute()
+            return {"success": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def get_llm_usage(self, user_id: str, days: int = 30) -> List[Dict[str, Any]]:
+        """A user's daily LLM token usage, most recent first"""
+        try:
+            response = self.client.table("llm_usage").select("*").eq(
+                "user_id", user_id
+            ).order("day", desc=True).limit(days).execute()
+            return response.data if response.data else []
+        except:
+            return []
+
     # ========================================
     # STORAGE OPERATIONS
     # ========================================
@@ -0,0 +1,288 @@
+"""
+Offline token estimates for Llama 3 prompts
+
+This is not Llama 3's tokenizer. Its BPE ranks aren't shipped; instead
+the estimator reproduces the tokenizer's pre-tokenization split and prices
+each piece against a compact vocabulary of whole words and frequent word
+fragments, built from the local Python installation's sources and docs
+and shipped in utils/data/token_vocab.txt.gz. Pieces found in the
+vocabulary cost one token; other words are segmented greedily into known
+fragments, which overestimates rare words, URLs and identifiers.
+
+Estimates have no guaranteed error bound. Measure it against the
+prompt_tokens Groq reports with benchmarks/token_estimate_check.py;
+at run time TokenCalibration tracks the same ratio, and rate-limit
+reservations, which must not undercount, scale estimates by its safety
+factor.
+
+Rebuild the vocabulary (from the local Python installation's sources and
+package docs, which cover English prose and technical terms):
+
+    python -m utils.token_estimate build
+"""
+
+import os
+import re
+import sys
+import glob
+import gzip
+import threading
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+
+VOCAB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "token_vocab.txt.gz")
+
+# Llama 3 / cl100k pre-tokenizer pattern, with \p{L} and \p{N} spelled for `re`
+_PRETOKENIZE = re.compile(
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)"
+    r"|(?:[^\r\n\w]|_)?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+_MAX_PIECE = 12
+
+
+class TokenEstimator:
+    """
+    Estimates Llama 3 token counts without the real tokenizer
+
+    Unknown words are segmented into short fragments, which tends to
+    overestimate rare words; how far estimates drift from Groq's counts is
+    measured (TokenCalibration, benchmarks/token_estimate_check.py), not
+    assumed.
+    """
+
+    def __init__(self, vocabulary: Iterable[str]):
+        self.vocabulary = frozenset(vocabulary)
+        self._word_cost = lru_cache(maxsize=65536)(self._segment)
+
+    def estimate(self, text: str) -> int:
+        """Estimated number of tokens `text` encodes to"""
+        if not text:
+            return 0
+        return sum(self._piece_cost(piece) for piece in _PRETOKENIZE.findall(text))
+
+    def _piece_cost(self, piece: str) -> int:
+        if piece.isspace():
+            return 1
+        if piece[-1].isalpha():
+            lead = piece[0]
+            if lead.isalpha() or lead == " ":
+                return self._word_cost(piece.lstrip())
+            # Punctuation glued to a word, e.g. "(Python" or "_name"
+            return 1 + self._word_cost(piece[1:])
+        if piece[0].isdigit() or piece[0] == "'":
+            return 1  # Digit groups of up to three; contractions
+        # Punctuation runs: common ones ("```", "---", "**") are single tokens
+        return max(1, (len(piece.strip()) + 2) // 3)
+
+    def _segment(self, word: str) -> int:
+        lower = word.lower()
+        if lower in self.vocabulary:
+            # Title case shares the token; long all-caps words usually split
+            return 1 if not (word.isupper() and len(word) > 3) else 1 + len(word) // 4
+        tokens = 0
+        index = 0
+        while index < len(lower):
+            for end in range(min(len(lower), index + _MAX_PIECE), index + 1, -1):
+                if lower[index:end] in self.vocabulary:
+                    index = end
+                    break
+            else:
+                index += 2  # Unknown byte pairs
+            tokens += 1
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        """
+        Longest prefix (keep='head') or suffix (keep='tail') of `text`
+        within `max_tokens`, cut at a pre-token boundary
+        """
+        pieces = _PRETOKENIZE.findall(text)
+        if keep == "tail":
+            pieces.reverse()
+        kept: List[str] = []
+        used = 0
+        for piece in pieces:
+            cost = self._piece_cost(piece)
+            if used + cost > max_tokens:
+                break
+            kept.append(piece)
+            used += cost
+        if keep == "tail":
+            kept.reverse()
+        return "".join(kept)
+
+
+class TokenCalibration:
+    """
+    Offline estimates vs. the prompt_tokens Groq reports for the same messages
+
+    `factor` is the safety multiplier for uses that must not undercount
+    (rate-limit reservations): `margin`, raised to the observed p95
+    actual/estimated ratio once `min_samples` responses have been seen.
+    """
+
+    # Chat template tokens per message (header ids, role, eot) and per request
+    MESSAGE_OVERHEAD = 4
+    REQUEST_OVERHEAD = 1
+
+    def __init__(self, margin: float = 1.1, window: int = 500, min_samples: int = 20):
+        self.margin = max(1.0, margin)
+        self.min_samples = min_samples
+        self._ratios: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def estimate_messages(self, contents: List[str]) -> int:
+        """Offline estimate of a chat request's prompt, template overhead included"""
+        return sum(estimate_token_count(text) + self.MESSAGE_OVERHEAD for text in contents) + self.REQUEST_OVERHEAD
+
+    def observe(self, estimated: int, actual: int) -> None:
+        """Record one response's reported prompt_tokens against our estimate"""
+        if estimated > 0 and actual > 0:
+            with self._lock:
+                self._ratios.append(actual / estimated)
+
+    def _p95(self) -> Optional[float]:
+        if len(self._ratios) < self.min_samples:
+            return None
+        ordered = sorted(self._ratios)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def factor(self) -> float:
+        with self._lock:
+            p95 = self._p95()
+        return max(self.margin, p95) if p95 else self.margin
+
+    def stats(self) -> Dict[str, Any]:
+        """Samples, observed actual/estimated ratios and whether the margin covers them"""
+        with self._lock:
+            ratios = sorted(self._ratios)
+            p95 = self._p95()
+        return {
+            "samples": len(ratios),
+            "ratio_p50": ratios[len(ratios) // 2] if ratios else None,
+            "ratio_p95": p95,
+            "margin": self.margin,
+            "factor": max(self.margin, p95) if p95 else self.margin,
+            "margin_covers_p95": p95 <= self.margin if p95 else None
+        }
+
+
+def load_vocabulary(path: str = VOCAB_PATH) -> List[str]:
+    """Read a vocabulary file (one entry per line, optionally gzipped)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def build_vocabulary(paths: Iterable[str], words: int = 20000, fragments: int = 6000) -> List[str]:
+    """
+    Build a vocabulary from text files
+
+    Args:
+        paths: Files to read
+        words: Most frequent whole words to keep
+        fragments: Most frequent 3-8 letter fragments of the remaining words
+
+    Returns:
+        Entries ordered by frequency (whole words first)
+    """
+    counts: Counter = Counter()
+    word_pattern = re.compile(r"[A-Za-z]+")
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        except OSError:
+            continue
+        # Split camelCase so identifiers count as the words they are made of
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+        counts.update(word.lower() for word in word_pattern.findall(text))
+
+    # Skip test-data noise such as "aaaaaaa" or "xyzzy"-style strings with no vowel
+    plausible = re.compile(r"^(?!.*(.)\1\1)[a-z]*[aeiouy][a-z]*$")
+    ranked = [word for word, _ in counts.most_common() if len(word) > 1 and plausible.match(word)]
+    vocabulary = ranked[:words]
+    known = set(vocabulary)
+
+    pieces: Counter = Counter()
+    for word in ranked[words:words * 5]:
+        frequency = counts[word]
+        for size in range(3, 9):
+            for start in range(0, len(word) - size + 1):
+                piece = word[start:start + size]
+                if plausible.match(piece):
+                    pieces[piece] += frequency * size
+    vocabulary += [piece for piece, _ in pieces.most_common() if piece not in known][:fragments]
+    return vocabulary
+
+
+def _default_corpus() -> List[str]:
+    import sysconfig
+    paths = sysconfig.get_paths()
+    files = glob.glob(os.path.join(paths["stdlib"], "**", "*.py"), recursive=True)
+    for extension in ("md", "rst", "txt"):
+        files += glob.glob(os.path.join(paths["purelib"], "**", f"*.{extension}"), recursive=True)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    files += glob.glob(os.path.join(root, "prompts", "*.py")) + [os.path.join(root, "README.md")]
+    return files
+
+
+# Singleton instance
+_token_estimator = None
+_token_estimator_lock = threading.Lock()
+
+
+def get_token_estimator() -> Optional[TokenEstimator]:
+    """
+    Get or create the process-wide estimator
+
+    Returns None if the vocabulary file is missing (callers fall back to
+    ~4 characters per token).
+    """
+    global _token_estimator
+    with _token_estimator_lock:
+        if _token_estimator is None and os.path.exists(VOCAB_PATH):
+            _token_estimator = TokenEstimator(load_vocabulary())
+        return _token_estimator
+
+
+def estimate_token_count(text: str) -> int:
+    """Estimated token count of `text` (len/4 without the vocabulary)"""
+    estimator = get_token_estimator()
+    return estimator.estimate(text) if estimator else len(text) // 4
+
+
+_token_calibration = None
+
+
+def get_token_calibration() -> TokenCalibration:
+    """Get or create the process-wide calibration (GROQ_TOKEN_SAFETY_MARGIN, default 1.1)"""
+    global _token_calibration
+    with _token_estimator_lock:
+        if _token_calibration is None:
+            _token_calibration = TokenCalibration(margin=float(os.getenv("GROQ_TOKEN_SAFETY_MARGIN", 1.1)))
+        return _token_calibration
+
+
+def main():
+    if sys.argv[1:2] != ["build"]:
+        print(__doc__)
+        return
+    vocabulary = build_vocabulary(_default_corpus())
+    os.makedirs(os.path.dirname(VOCAB_PATH), exist_ok=True)
+    # mtime=0 keeps the archive byte-identical across rebuilds of the same corpus
+    with open(VOCAB_PATH, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write("\n".join(vocabulary).encode("utf-8") + b"\n")
+    print(f"Wrote {len(vocabulary)} entries to {VOCAB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Per-user LLM token accounting with per-minute and daily budgets
+"""
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.llm_scheduler import current_session, current_user
+
+
+# Receives (user_id, day, prompt_tokens, completion_tokens, requests) deltas
+UsageSink = Callable[[str, str, int, int, int], Any]
+
+
+def current_account() -> str:
+    """Who the enclosing llm_context's calls are billed to: user, else session"""
+    return current_user() or current_session() or "anonymous"
+
+
+def _utc_day(now: float) -> str:
+    return datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_to_midnight(now: float) -> float:
+    today = datetime.fromtimestamp(now, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today + timedelta(days=1)).timestamp() - now
+
+
+@dataclass
+class UsageHold:
+    """Tokens set aside for one call until its real usage is known"""
+    user_id: str
+    tokens: int
+
+
+class UsageTracker:
+    """
+    Rolling per-user token counters with budget enforcement
+
+    Usage is kept in SQLite (shared by every process on the host): one row
+    per user and minute for the rolling per-minute window, and one row per
+    user and UTC day. The per-minute window slides: the previous minute's
+    tokens are weighted by how much of it still overlaps the last 60
+    seconds. Calls in flight count against the budget with their estimate,
+    so a burst of concurrent requests can't overshoot it.
+
+    A request bigger than the per-minute budget is still let through when
+    the user's window is empty; otherwise it could never be sent.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tokens_per_minute: int = 0,
+        tokens_per_day: int = 0,
+        retention_days: int = 30,
+        sink: Optional[UsageSink] = None,
+        sync_interval: float = 60.0
+    ):
+        """
+        Args:
+            path: SQLite file for the counters
+            tokens_per_minute: Per-user rolling 60s budget (0 = unlimited)
+            tokens_per_day: Per-user budget per UTC day (0 = unlimited)
+            retention_days: Daily rows kept for reporting
+            sink: Optional durable ledger (e.g. Supabase) that receives
+                batched daily deltas every `sync_interval` seconds, from
+                settle() or a background timer while idle, and at exit
+        """
+        self.path = path
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self.tokens_per_day = max(0, tokens_per_day)
+        self.retention_days = retention_days
+        self.sink = sink
+        self.sync_interval = sync_interval
+        self.rejections = {"minute": 0, "day": 0}
+        self.sync_errors = 0
+
+        self._lock = threading.Lock()
+        self._held: Dict[str, int] = {}
+        self._pending: Dict[Tuple[str, str], List[int]] = {}
+        self._last_sync = time.monotonic()
+        self._pruned_day = ""
+        self._closed = threading.Event()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_usage_minute ("
+            "user_id TEXT NOT NULL, minute INTEGER NOT NULL, tokens INTEGER NOT NULL, "
+            "PRIMARY KEY (user_id, minute))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_usage_daily ("
+            "user_id TEXT NOT NULL, day TEXT NOT NULL, "
+            "prompt_tokens INTEGER NOT NULL DEFAULT 0, completion_tokens INTEGER NOT NULL DEFAULT 0, "
+            "requests INTEGER NOT NULL DEFAULT 0, rejected INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (user_id, day))"
+        )
+        self._conn.commit()
+
+        if sink:
+            # settle() only syncs when calls come in; the timer covers idle
+            # periods and atexit the last batch before a restart
+            threading.Thread(target=self._sync_loop, name="llm-usage-sync", daemon=True).start()
+            atexit.register(self.close)
+
+    def reserve(self, user_id: str, tokens: int) -> Tuple[Optional[UsageHold], Optional[Dict[str, Any]]]:
+        """
+        Check a call of ~`tokens` against the user's budgets and hold them
+
+        Returns:
+            (hold to pass to settle(), None) if within budget, else
+            (None, {"scope": 'minute' or 'day', "limit", "used", "retry_after"})
+        """
+        with self._lock:
+            now = time.time()
+            held = self._held.get(user_id, 0)
+            denial = None
+
+            if self.tokens_per_minute:
+                previous, current, elapsed = self._minute_usage(user_id, now)
+                current += held
+                used = previous * (1 - elapsed / 60) + current
+                if used > 0 and used + tokens > self.tokens_per_minute:
+                    denial = {
+                        "scope": "minute",
+                        "limit": self.tokens_per_minute,
+                        "used": int(used),
+                        "retry_after": self._minute_retry(previous, current, tokens, elapsed)
+                    }
+
+            if denial is None and self.tokens_per_day:
+                used = self._day_tokens(user_id, _utc_day(now)) + held
+                if used > 0 and used + tokens > self.tokens_per_day:
+                    denial = {
+                        "scope": "day",
+                        "limit": self.tokens_per_day,
+                        "used": used,
+                        "retry_after": _seconds_to_midnight(now)
+                    }
+
+            if denial:
+                self.rejections[denial["scope"]] += 1
+                self._conn.execute(
+                    "INSERT INTO llm_usage_daily (user_id, day, rejected) VALUES (?, ?, 1) "
+                    "ON CONFLICT (user_id, day) DO UPDATE SET rejected = rejected + 1",
+                    (user_id, _utc_day(now))
+                )
+                self._conn.commit()
+                return None, denial
+
+            self._held[user_id] = held + tokens
+            return UsageHold(user_id=user_id, tokens=tokens), None
+
+    def settle(self, hold: Optional[UsageHold], usage: Optional[Dict[str, int]]) -> None:
+        """Release a hold and record what the call really used (nothing if it failed)"""
+        if hold is None:
+            return
+        sync = None
+        with self._lock:
+            remaining = self._held.get(hold.user_id, 0) - hold.tokens
+            if remaining > 0:
+                self._held[hold.user_id] = remaining
+            else:
+                self._held.pop(hold.user_id, None)
+
+            if usage:
+                self._record(hold.user_id, usage)
+            sync = self._due_for_sync()
+
+        if sync:
+            threading.Thread(target=self._flush, args=(sync,), daemon=True).start()
+
+    def _record(self, user_id: str, usage: Dict[str, int]) -> None:
+        now = time.time()
+        prompt = usage.get("prompt_tokens") or 0
+        completion = usage.get("completion_tokens") or 0
+        total = usage.get("total_tokens") or prompt + completion
+        day = _utc_day(now)
+
+        self._conn.execute(
+            "INSERT INTO llm_usage_minute (user_id, minute, tokens) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, minute) DO UPDATE SET tokens = tokens + excluded.tokens",
+            (user_id, int(now // 60), total)
+        )
+        self._conn.execute(
+            "INSERT INTO llm_usage_daily (user_id, day, prompt_tokens, completion_tokens, requests) "
+            "VALUES (?, ?, ?, ?, 1) ON CONFLICT (user_id, day) DO UPDATE SET "
+            "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens, "
+            "requests = requests + 1",
+            (user_id, day, prompt, completion)
+        )
+        self._prune(now, day)
+        self._conn.commit()
+
+        if self.sink:
+            pending = self._pending.setdefault((user_id, day), [0, 0, 0])
+            pending[0] += prompt
+            pending[1] += completion
+            pending[2] += 1
+
+    def _prune(self, now: float, day: str) -> None:
+        """Drop minute rows outside the window; daily rows past retention once a day"""
+        self._conn.execute("DELETE FROM llm_usage_minute WHERE minute < ?", (int(now // 60) - 1,))
+        if day != self._pruned_day:
+            self._pruned_day = day
+            self._conn.execute(
+                "DELETE FROM llm_usage_daily WHERE day < ?",
+                (_utc_day(now - self.retention_days * 86400),)
+            )
+
+    def _minute_usage(self, user_id: str, now: float) -> Tuple[int, int, float]:
+        """(previous minute's tokens, this minute's tokens, seconds into this minute)"""
+        minute = int(now // 60)
+        rows = dict(self._conn.execute(
+            "SELECT minute, tokens FROM llm_usage_minute WHERE user_id = ? AND minute >= ?",
+            (user_id, minute - 1)
+        ).fetchall())
+        return rows.get(minute - 1, 0), rows.get(minute, 0), now - minute * 60
+
+    def _minute_retry(self, previous: float, current: float, tokens: int, elapsed: float) -> float:
+        """Seconds until the sliding window has room for `tokens` more"""
+        limit = self.tokens_per_minute
+        if current + tokens <= limit:
+            # Fits once enough of the previous minute has slid out of the window
+            wait = 60 * (1 - (limit - current - tokens) / previous) - elapsed if previous else 0.0
+        else:
+            # Wait for the next minute, then for this one to slide out
+            share = 1.0 if tokens >= limit else 1 - (limit - tokens) / current
+            wait = (60 - elapsed) + 60 * share
+        return max(1.0, wait)
+
+    def _day_tokens(self, user_id: str, day: str) -> int:
+        row = self._conn.execute(
+            "SELECT prompt_tokens + completion_tokens FROM llm_usage_daily WHERE user_id = ? AND day = ?",
+            (user_id, day)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _due_for_sync(self) -> Optional[Dict[Tuple[str, str], List[int]]]:
+        """Take the pending deltas if a sync is due (called with the lock held)"""
+        if not self.sink or not self._pending or time.monotonic() - self._last_sync < self.sync_interval:
+            return None
+        self._last_sync = time.monotonic()
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def _flush(self, pending: Dict[Tuple[str, str], List[int]]) -> None:
+        """Send deltas to the sink; failed ones are kept for the next sync"""
+        for (user_id, day), (prompt, completion, requests) in pending.items():
+            try:
+                result = self.sink(user_id, day, prompt, completion, requests)
+                if isinstance(result, dict) and not result.get("success", True):
+                    raise RuntimeError(result.get("error"))
+            except Exception:
+                with self._lock:
+                    self.sync_errors += 1
+                    merged = self._pending.setdefault((user_id, day), [0, 0, 0])
+                    merged[0] += prompt
+                    merged[1] += completion
+                    merged[2] += requests
+
+    def _sync_loop(self) -> None:
+        while not self._closed.wait(self.sync_interval):
+            with self._lock:
+                sync = self._due_for_sync()
+            if sync:
+                self._flush(sync)
+
+    def close(self) -> None:
+        """Stop the sync timer and send what is still pending"""
+        self._closed.set()
+        self.flush()
+
+    def flush(self) -> None:
+        """Send pending deltas to the sink now (e.g. at shutdown)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_sync = time.monotonic()
+        if self.sink and pending:
+            self._flush(pending)
+
+    def usage(self, user_id: str) -> Dict[str, Any]:
+        """One user's rolling-minute and today's usage against their budgets"""
+        with self._lock:
+            now = time.time()
+            previous, current, elapsed = self._minute_usage(user_id, now)
+            row = self._conn.execute(
+                "SELECT prompt_tokens, completion_tokens, requests, rejected FROM llm_usage_daily "
+                "WHERE user_id = ? AND day = ?",
+                (user_id, _utc_day(now))
+            ).fetchone() or (0, 0, 0, 0)
+            return {
+                "user_id": user_id,
+                "minute_tokens": int(previous * (1 - elapsed / 60) + current),
+                "day_tokens": row[0] + row[1],
+                "prompt_tokens": row[0],
+                "completion_tokens": row[1],
+                "requests": row[2],
+                "rejected": row[3],
+                "in_flight_tokens": self._held.get(user_id, 0),
+                "tokens_per_minute": self.tokens_per_minute or None,
+                "tokens_per_day": self.tokens_per_day or None
+            }
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """Budgets, rejection counts and today's heaviest users"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, prompt_tokens, completion_tokens, requests, rejected FROM llm_usage_daily "
+                "WHERE day = ? ORDER BY prompt_tokens + completion_tokens DESC",
+                (_utc_day(time.time()),)
+            ).fetchall()
+            return {
+                "tokens_per_minute": self.tokens_per_minute or None,
+                "tokens_per_day": self.tokens_per_day or None,
+                "rejections": dict(self.rejections),
+                "users_today": len(rows),
+                "tokens_today": sum(row[1] + row[2] for row in rows),
+                "top_users": [
+                    {"user_id": user_id, "tokens": prompt + completion, "requests": requests, "rejected": rejected}
+                    for user_id, prompt, completion, requests, rejected in rows[:top]
+                ],
+                "pending_sync": len(self._pending),
+                "sync_errors": self.sync_errors
+            }
+
+
+def _supabase_sink() -> Optional[UsageSink]:
+    """SupabaseClient.record_llm_usage, or None without Supabase or its service role key"""
+    try:
+        from utils.supabase_client import get_supabase_client
+        client = get_supabase_client()
+    except Exception:
+        return None
+    return client.record_llm_usage if client.service_client else None
+
+
+# Singleton instance
+_usage_tracker = None
+_usage_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> Optional[UsageTracker]:
+    """
+    Get or create the process-wide usage tracker
+
+    Returns None if GROQ_USAGE_TRACKING is set to a false value. Budgets
+    come from GROQ_USER_TPM and GROQ_USER_DAILY_TOKENS (0 = unlimited);
+    GROQ_USAGE_SUPABASE mirrors daily totals to the llm_usage table.
+    """
+    global _usage_tracker
+    if os.getenv("GROQ_USAGE_TRACKING", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _usage_tracker_lock:
+        if _usage_tracker is None:
+            sink = None
+            if os.getenv("GROQ_USAGE_SUPABASE", "").lower() in ("1", "true", "yes"):
+                sink = _supabase_sink()
+            _usage_tracker = UsageTracker(
+                path=os.getenv("GROQ_USAGE_PATH", ".cache/llm_usage.sqlite3"),
+                tokens_per_minute=int(os.getenv("GROQ_USER_TPM", 0)),
+                tokens_per_day=int(os.getenv("GROQ_USER_DAILY_TOKENS", 0)),
+                retention_days=int(os.getenv("GROQ_USAGE_RETENTION_DAYS", 30)),
+                sink=sink,
+                sync_interval=float(os.getenv("GROQ_USAGE_SYNC_INTERVAL", 60))
+            )
+        return _usage_tracker
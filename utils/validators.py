@@ -65,8 +65,9 @@ class ProfileSchema(BaseModel):
 
     @validator('skills')
     def validate_skills(cls, v):
-        # Remove duplicates and clean
-        return list(set(skill.strip() for skill in v if skill.strip()))
+        # Remove duplicates and clean, keeping the original order so prompts
+        # built from the profile are stable across runs
+        return list(dict.fromkeys(skill.strip() for skill in v if skill.strip()))
 
     @validator('phone')
     def validate_phone(cls, v):
@@ -136,8 +137,15 @@ class OptimizerResult(BaseModel):
 
 class MockInterviewQuestion(BaseModel):
     """Mock interview question"""
-    type: str = Field(..., pattern="^(technical|behavioral)$")
+    type: str = Field(..., pattern="^(technical|behavioral|system_design)$")
     question: str = Field(..., min_length=10)
+    key_points: List[str] = Field(default_factory=list)
+    mistakes: List[str] = Field(default_factory=list)
+
+
+class MockInterviewQuestionSet(BaseModel):
+    """Generated mock interview questions"""
+    questions: List[MockInterviewQuestion] = Field(..., min_length=1)
 
 
 class MockInterviewFeedback(BaseModel):